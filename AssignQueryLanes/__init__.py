@@ -0,0 +1,76 @@
+import logging
+import os
+
+from typing import Dict, List
+from Helpers.SendEmails import sendEmail
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.CosmosBulkWriter import bulkUpsertItems
+from Helpers.CosmosRateController import getRuRateController
+from Helpers.QueryLanes import assignReposToLanes, assignReposToShards
+from Helpers.RunInfoStore import readRunDetailRepos, createLaneReposDocuments
+
+
+def main(laneAssignment: Dict) -> List:
+    """
+    Takes in current run id, individual repos from source.json, number of lanes and how to assign owners to lanes
+    Reads the repos discovered for orgs in this run, appends the individual repos and splits them into query lanes
+    Writes the repos of each lane as lane run detail documents in run info container, each lane reads its own repos page by page
+
+        Parameters
+            laneAssignment (Dict) - Dict containing current run id, individual repos, number of lanes to query in parallel
+                                    and sharding, balanced or hash
+
+        Returns
+            List of Dicts containing the number of repos and pages of each lane, lanes are identified by their index in the list
+    """
+
+    try:
+        currentRunId = laneAssignment["currentRunId"]
+
+        endpoint = os.environ["CosmosDB_Endpoint"]
+        key = os.environ["CosmosDB_PrimaryKey"]
+        databaseName = os.environ["CosmosDB_DBName"]
+        containerName = os.environ["CosmosDB_RunInfoContainerName"]
+        container  = cosmosDbContainer(endpoint, key, databaseName, containerName, throttleRetries= False)
+
+        rateController = None
+
+        if os.environ["CosmosDB_ServerlessMode"].lower() != "true":
+            rateController = getRuRateController(containerName)
+
+        # Detail documents are read back in any order, sort so a retried call assigns the same lanes
+
+        reposToGetStats = sorted(readRunDetailRepos(container, currentRunId, "discovered")) + laneAssignment["individualRepos"]
+
+        if laneAssignment["sharding"] == "hash":
+            queryLanes = assignReposToShards(reposToGetStats, laneAssignment["numberOfLanes"])
+        else:
+            queryLanes = assignReposToLanes(reposToGetStats, laneAssignment["numberOfLanes"])
+
+        lanes = []
+        laneDocuments = []
+
+        for laneIndex, laneRepos in enumerate(queryLanes):
+            laneReposDocuments = createLaneReposDocuments(currentRunId, laneIndex, laneRepos)
+
+            laneDocuments.extend(laneReposDocuments)
+            lanes.append({
+                "repoCount": len(laneRepos),
+                "pageCount": len(laneReposDocuments)
+            })
+
+        detailStatuses = bulkUpsertItems(container, laneDocuments, rateController= rateController)
+        failedDetailStatuses = [detailStatus for detailStatus in detailStatuses if not detailStatus["success"]]
+
+        if len(failedDetailStatuses) > 0:
+            raise Exception("Unable to write " + str(len(failedDetailStatuses)) + " run detail documents")
+
+        return lanes
+
+    except:
+        # Log error and send email in case of exception
+
+        logging.error("Error- Unable to assign repos to query lanes for run " + str(laneAssignment["currentRunId"]))
+
+        sendEmail("Error- Unable to assign repos to query lanes for run " + str(laneAssignment["currentRunId"]))
+        raise
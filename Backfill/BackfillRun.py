@@ -0,0 +1,468 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from Backfill.Checkpoint import latestCheckpoint, loadCheckpoint, saveRun, appendBatch, finishedRepos
+
+
+# Backfill runs the steps of GetRepoStatsOrchestrator and its lanes in one process with asyncio, outside Azure Functions
+# Activities are the real activity functions called in worker threads, the rate governor entity is replaced by
+# governor state kept in memory per credential and durable timers by asyncio sleeps
+# Progress is checkpointed after every batch so an interrupted backfill picks up where it stopped
+
+
+def runInThread(activity, activityInput):
+    """
+    Takes in an activity function and its input
+    Returns an awaitable of the result of the activity, run in a worker thread of the event loop
+    so lanes go on while it waits on github or Cosmos DB
+    """
+
+    return asyncio.get_running_loop().run_in_executor(None, activity, activityInput)
+
+
+def loadLocalSettings(settingsFile: str):
+    """
+    Takes in the path of a local.settings.json file
+    Sets the values in it as environment variables, settings already set in the environment are kept
+
+        Parameters
+            settingsFile (str) - Path of local.settings.json, the file is skipped if it doesn't exist
+    """
+
+    if not settingsFile or not os.path.exists(settingsFile):
+        return
+
+    with open(settingsFile) as settings:
+        values = json.load(settings).get("Values", {})
+
+    for name, value in values.items():
+        os.environ.setdefault(name, str(value))
+
+
+async def runBackfill(options: Dict) -> Dict:
+    """
+    Takes in the backfill options
+    Discovers the repos in sources.json, queries their stats and uploads them to Cosmos DB, resuming an interrupted backfill if there is one
+
+        Parameters
+            options (Dict) - Dict containing sources file, checkpoint directory, run id to resume (None for latest),
+                             whether to start a new run, number of lanes, uploads in flight and whether to send emails
+
+        Returns
+            Dict containing run id, number of repos created, failed and dropped
+    """
+
+    import CreateRunId
+    import GetReposFromSource
+    import AppendIndividualRepos
+    import GetQueryCostModel
+
+    from Helpers.GithubCredentials import githubCredentialIds
+    from Helpers.RateGovernor import newGovernorState
+
+    # Everything stays in this process, so payloads are never offloaded to the payload store
+
+    os.environ["PayloadStore_Type"] = "none"
+
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers= options["lanes"] + options["concurrency"] + 4))
+
+    credentialIds = githubCredentialIds()
+    governorStates = {credentialId: newGovernorState() for credentialId in credentialIds}
+
+    checkpoint = None
+
+    if options["runId"] is not None:
+        checkpoint = loadCheckpoint(options["checkpointDirectory"], options["runId"])
+
+        if checkpoint is None:
+            raise ValueError("No checkpoint found for run id " + str(options["runId"]))
+
+    elif not options["newRun"]:
+        checkpoint = latestCheckpoint(options["checkpointDirectory"])
+
+    if checkpoint is None:
+        currentRunId = await runInThread(CreateRunId.main, "")
+
+        if currentRunId <= 0:
+            raise RuntimeError("Failed to obtain runId for current run")
+
+        await sendNotification(options, "Backfill started with run id: " + str(currentRunId))
+
+        sourceData = await runInThread(GetReposFromSource.main, options["sourcesFile"])
+        orgDiscovery = await discoverOrgRepos(sourceData["fullOrgs"], credentialIds, governorStates)
+
+        allReposToGetStats = await runInThread(AppendIndividualRepos.main, {
+            "reposForOrgs": orgDiscovery["reposForOrgs"],
+            "individualRepos": sourceData.get("individualRepos", [])
+        })
+
+        checkpoint = {
+            "run": {
+                "runId": currentRunId,
+                "repos": allReposToGetStats,
+                "droppedOrgs": orgDiscovery["droppedOrgs"],
+                "completed": False
+            },
+            "batches": []
+        }
+
+        saveRun(options["checkpointDirectory"], checkpoint["run"])
+
+    else:
+        currentRunId = checkpoint["run"]["runId"]
+        logging.info("Resuming backfill " + str(currentRunId) + " after " + str(len(checkpoint["batches"])) + " finished batches")
+
+    # Repos created, failed to upload or dropped in an earlier attempt are not queried again
+
+    skippedRepos = finishedRepos(checkpoint["batches"])
+    reposToGetStats = [repo for repo in checkpoint["run"]["repos"] if repo not in skippedRepos]
+
+    queryCostModel = await runInThread(GetQueryCostModel.main, "")
+
+    laneResults = await runLanes(options, reposToGetStats, currentRunId, credentialIds, governorStates, queryCostModel)
+
+    return await finishRun(options, checkpoint, laneResults)
+
+
+async def runLanes(options: Dict, repos: List, currentRunId: int, credentialIds: List, governorStates: Dict, queryCostModel: Dict) -> List:
+    """
+    Splits the repos into lanes keeping repos of an owner in the same lane and runs the lanes concurrently
+    Uploads of all lanes share 'concurrency' slots, so memory held by fetched batches stays bounded
+
+        Returns
+            List of lane results
+    """
+
+    from Helpers.QueryLanes import assignReposToLanes
+
+    queryLanes = assignReposToLanes(repos, options["lanes"])
+    uploadSlots = asyncio.Semaphore(max(options["concurrency"], 1))
+
+    return await asyncio.gather(*[
+        runLane(options, laneRepos, currentRunId, credentialIds[laneIndex % len(credentialIds)], credentialIds, governorStates, queryCostModel, uploadSlots)
+        for laneIndex, laneRepos in enumerate(queryLanes)
+    ])
+
+
+async def runLane(options: Dict, repos: List, currentRunId: int, credentialId: str, credentialIds: List,
+                  governorStates: Dict, queryCostModel: Dict, uploadSlots: asyncio.Semaphore) -> Dict:
+    """
+    Queries the repos of a lane one batch after other like ExecuteGraphqlQueryLane
+    Each fetched batch is uploaded in a task of its own while the lane goes on to the next batch
+    and is checkpointed once it is uploaded
+
+        Returns
+            Dict containing number of batches uploaded and the cost model learned in the lane
+    """
+
+    import CreateGraphqlQuery
+    import ExecuteGraphqlQuery
+
+    from Helpers.QueryCostModel import nextBatchSize, updateQueryCostModel
+    from Helpers.QueryRetry import planRetry
+    from Helpers.RateGovernor import reportRateLimit, retryBackoffSeconds
+
+    uploadTasks = []
+    reposLeftToQuery = list(repos)
+    batchesToRetry = []
+    retryCounts = {}
+    rateLimit = {}
+    consecutiveFailures = 0
+
+    while len(batchesToRetry) > 0 or len(reposLeftToQuery) > 0:
+        if len(batchesToRetry) > 0:
+            reposSubset = batchesToRetry.pop(0)
+
+        else:
+            batchSize = nextBatchSize(queryCostModel, rateLimit, len(reposLeftToQuery))
+            reposSubset = reposLeftToQuery[:batchSize]
+            reposLeftToQuery = reposLeftToQuery[batchSize:]
+
+        owners = sorted(set(repo.split('/')[0] for repo in reposSubset))
+        estimatedCost = max(round(queryCostModel["pointsPerRepo"] * len(reposSubset)), 1)
+
+        query = await runInThread(CreateGraphqlQuery.main, reposSubset)
+
+        credentialId = await waitForGithubCapacity(governorStates, credentialId, credentialIds, owners, estimatedCost)
+
+        queryResult = await ExecuteGraphqlQuery.main({
+            "query": query["query"],
+            "variables": query["variables"],
+            "credentialId": credentialId,
+            "parseForRunId": currentRunId
+        })
+
+        reportRateLimit(governorStates[credentialId], {
+            "resource": "graphql",
+            "rateLimit": queryResult["rateLimit"],
+            "retryAfterSeconds": queryResult["retryAfterSeconds"],
+            "now": time.time()
+        })
+
+        if queryResult["rateLimit"]:
+            rateLimit = queryResult["rateLimit"]
+
+        if not queryResult["executionFailed"] or queryResult["timedOut"]:
+            queryCostModel = updateQueryCostModel(queryCostModel,
+                                                  len(reposSubset),
+                                                  queryResult["rateLimit"].get("cost", 0),
+                                                  queryResult["elapsedSeconds"],
+                                                  queryResult["executionFailed"])
+
+        retryPlan = planRetry(reposSubset, queryResult, retryCounts)
+        batchesToRetry = retryPlan["batchesToRetry"] + batchesToRetry
+
+        # Wait for a free upload slot before going on, so a slow Cosmos DB holds the lane back instead of piling up batches
+
+        if not queryResult["executionFailed"] or len(retryPlan["droppedRepos"]) > 0:
+            await uploadSlots.acquire()
+            uploadTasks.append(asyncio.create_task(uploadBatch(options, currentRunId, uploadSlots,
+                                                               None if queryResult["executionFailed"] else queryResult["parsedStats"],
+                                                               retryPlan["droppedRepos"])))
+
+        if len(retryPlan["droppedRepos"]) > 0:
+            logging.error("Error- Unable to get stats, dropping repos " + str(retryPlan["droppedRepos"]))
+
+        if queryResult["executionFailed"]:
+            consecutiveFailures += 1
+
+            if not (queryResult["timedOut"] and len(reposSubset) > 1):
+                backoffSeconds = max(retryBackoffSeconds(consecutiveFailures), queryResult["retryAfterSeconds"])
+                logging.error("Error- Graphql query execution failed, retrying the repos after " + str(backoffSeconds) + " seconds")
+
+                await asyncio.sleep(backoffSeconds)
+
+        else:
+            consecutiveFailures = 0
+
+    await asyncio.gather(*uploadTasks)
+
+    return {
+        "batches": len(uploadTasks),
+        "queryCostModel": queryCostModel
+    }
+
+
+async def uploadBatch(options: Dict, currentRunId: int, uploadSlots: asyncio.Semaphore, parsedStats: Dict, droppedRepos: List):
+    """
+    Uploads the parsed stats of a batch to Cosmos DB and checkpoints the batch along with the repos dropped from it
+    Releases the upload slot taken for the batch when done
+    """
+
+    import UploadQueryResultsToCosmosDB
+
+    from Helpers.RepoStatsBatch import repoStatsCount
+
+    try:
+        uploadResults = []
+
+        if parsedStats is not None and repoStatsCount(parsedStats) > 0:
+            uploadResults = (await runInThread(UploadQueryResultsToCosmosDB.main, parsedStats))["uploadResults"]
+
+        # Tasks run on the event loop thread, so appends to the checkpoint never interleave
+
+        appendBatch(options["checkpointDirectory"], currentRunId, {
+            "uploadResults": uploadResults,
+            "droppedRepos": droppedRepos
+        })
+
+    finally:
+        uploadSlots.release()
+
+
+async def waitForGithubCapacity(governorStates: Dict, credentialId: str, credentialIds: List, owners: List, cost: int) -> str:
+    """
+    Acquires capacity from the governor state of the github credential and sleeps if asked to
+    If the credential has to wait, switches to the credential in the pool with the most headroom
+
+        Returns
+            Github credential id to use for the call
+    """
+
+    from Helpers.RateGovernor import acquireCapacity, releaseCapacity, credentialHeadroom
+
+    acquireRequest = {
+        "owners": owners,
+        "resource": "graphql",
+        "cost": cost,
+        "now": time.time()
+    }
+
+    acquireResult = acquireCapacity(governorStates[credentialId], acquireRequest)
+
+    if acquireResult["waitSeconds"] > 0 and len(credentialIds) > 1:
+        headrooms = [credentialHeadroom(governorStates[otherCredentialId], "graphql", acquireRequest["now"]) for otherCredentialId in credentialIds]
+        bestCredentialId = credentialIds[headrooms.index(max(headrooms))]
+
+        if bestCredentialId != credentialId and max(headrooms) >= cost:
+            releaseCapacity(governorStates[credentialId], dict(acquireRequest, reservedPoints= acquireResult["reservedPoints"]))
+
+            credentialId = bestCredentialId
+            acquireResult = acquireCapacity(governorStates[credentialId], acquireRequest)
+
+    if acquireResult["waitSeconds"] > 0:
+        await asyncio.sleep(acquireResult["waitSeconds"])
+
+    return credentialId
+
+
+async def discoverOrgRepos(orgs: List, credentialIds: List, governorStates: Dict) -> Dict:
+    """
+    Gets the repos of all orgs in sources.json in rounds of DiscoverOrgRepos calls, like the orchestrator does
+    Chunks of orgs are queried concurrently in each round
+
+        Returns
+            Dict containing list of repos for each org and orgs that were given up on
+    """
+
+    import DiscoverOrgRepos
+
+    from Helpers.RateGovernor import reportRateLimit, retryBackoffSeconds
+
+    orgsPerQuery = int(os.environ.get("Discovery_OrgsPerQuery", 5))
+    pagesPerCall = int(os.environ.get("Discovery_PagesPerCall", 10))
+    maxRetries = int(os.environ.get("Github_MaxRetriesPerRepo", 3))
+
+    reposForOrgs = {orgInfo["orgName"]: [] for orgInfo in orgs}
+    droppedOrgs = []
+
+    discoveryChunks = []
+
+    for chunkStart in range(0, len(orgs), orgsPerQuery):
+        discoveryChunks.append({
+            "orgs": [dict(orgInfo, cursor= None, hasNextPage= True) for orgInfo in orgs[chunkStart : chunkStart + orgsPerQuery]],
+            "credentialId": credentialIds[(chunkStart // orgsPerQuery) % len(credentialIds)],
+            "failures": 0
+        })
+
+    async def discoverChunk(chunk: Dict) -> Dict:
+        orgNames = [orgInfo["orgName"] for orgInfo in chunk["orgs"]]
+        chunk["credentialId"] = await waitForGithubCapacity(governorStates, chunk["credentialId"], credentialIds, orgNames, pagesPerCall * len(orgNames))
+
+        return await runInThread(DiscoverOrgRepos.main, {
+            "orgs": chunk["orgs"],
+            "credentialId": chunk["credentialId"]
+        })
+
+    activeChunks = discoveryChunks
+
+    while len(activeChunks) > 0:
+        discoveryResults = await asyncio.gather(*[discoverChunk(chunk) for chunk in activeChunks])
+
+        backoffSeconds = 0
+
+        for chunk, discoveryStatus in zip(activeChunks, discoveryResults):
+            reportRateLimit(governorStates[chunk["credentialId"]], {
+                "resource": "graphql",
+                "rateLimit": discoveryStatus["rateLimit"],
+                "retryAfterSeconds": discoveryStatus["retryAfterSeconds"],
+                "now": time.time()
+            })
+
+            if discoveryStatus["executionFailed"]:
+                chunk["failures"] += 1
+                backoffSeconds = max(backoffSeconds, retryBackoffSeconds(chunk["failures"]), discoveryStatus["retryAfterSeconds"])
+
+                if chunk["failures"] > maxRetries:
+                    for orgInfo in chunk["orgs"]:
+                        orgInfo["hasNextPage"] = False
+                        droppedOrgs.append({"repo": orgInfo["orgName"], "reason": "DISCOVERY_FAILED"})
+
+                continue
+
+            chunk["failures"] = 0
+
+            for failedOrg in discoveryStatus["failedOrgs"]:
+                droppedOrgs.append({"repo": failedOrg["orgName"], "reason": failedOrg["reason"]})
+
+            chunk["orgs"] = []
+
+            for orgStatus in discoveryStatus["orgs"]:
+                reposForOrgs[orgStatus["orgName"]].extend(orgStatus.pop("repos"))
+                chunk["orgs"].append(orgStatus)
+
+        activeChunks = [chunk for chunk in discoveryChunks if any(orgInfo["hasNextPage"] for orgInfo in chunk["orgs"])]
+
+        if backoffSeconds > 0 and len(activeChunks) > 0:
+            logging.error("Error- Getting repos for orgs failed, retrying after " + str(backoffSeconds) + " seconds")
+            await asyncio.sleep(backoffSeconds)
+
+    return {
+        "reposForOrgs": [reposForOrgs[orgInfo["orgName"]] for orgInfo in orgs],
+        "droppedOrgs": droppedOrgs
+    }
+
+
+async def finishRun(options: Dict, checkpoint: Dict, laneResults: List) -> Dict:
+    """
+    Forms the run report from all batches checkpointed for the run, including batches of earlier attempts
+    Updates the run info container, saves the learned cost model and marks the checkpoint completed
+
+        Returns
+            Dict containing run id, number of repos created, failed and dropped
+    """
+
+    import ParseCosmosDBResults
+    import SaveDroppedRepos
+    import UpdateRunInfoWithStatus
+    import SaveQueryCostModel
+
+    from Helpers.QueryCostModel import mergeQueryCostModels
+
+    currentRunId = checkpoint["run"]["runId"]
+    batches = loadCheckpoint(options["checkpointDirectory"], currentRunId)["batches"]
+
+    uploadResults = [batch["uploadResults"] for batch in batches if len(batch["uploadResults"]) > 0]
+    droppedRepos = list(checkpoint["run"]["droppedOrgs"])
+
+    for batch in batches:
+        droppedRepos.extend(batch["droppedRepos"])
+
+    if len(laneResults) > 0:
+        await runInThread(SaveQueryCostModel.main, mergeQueryCostModels([laneResult["queryCostModel"] for laneResult in laneResults]))
+
+    # Repos dropped in any attempt are saved and reported as failed along with the item creation statuses
+
+    if len(droppedRepos) > 0:
+        uploadResults.append([await runInThread(SaveDroppedRepos.main, {
+            "currentRunId": currentRunId,
+            "droppedRepos": droppedRepos
+        })])
+
+    runCompletionStatus = await runInThread(ParseCosmosDBResults.main, {
+        "currentRunId": currentRunId,
+        "uploadResults": uploadResults
+    })
+
+    await runInThread(UpdateRunInfoWithStatus.main, runCompletionStatus["status"])
+
+    checkpoint["run"]["completed"] = True
+    saveRun(options["checkpointDirectory"], checkpoint["run"])
+
+    await sendNotification(options, "Backfill completed <br><br>" + runCompletionStatus["emailBody"])
+
+    runStatus = runCompletionStatus["status"]
+
+    return {
+        "runId": currentRunId,
+        "createdCount": runStatus["totalCreatedCount"],
+        "failedCount": runStatus["totalFailedCount"],
+        "droppedCount": len(droppedRepos)
+    }
+
+
+async def sendNotification(options: Dict, notificationText: str):
+    """
+    Sends an email notification unless emails are turned off for the backfill
+    """
+
+    import SendEmailNotifications
+
+    if options["sendEmails"]:
+        await runInThread(SendEmailNotifications.main, notificationText)
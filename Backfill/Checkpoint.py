@@ -0,0 +1,130 @@
+import json
+import os
+
+from typing import Dict, List
+
+
+# Checkpoint of a backfill is a folder per run holding
+#   run.json - run id, repos to process and orgs dropped while discovering, written once
+#   batches.jsonl - one line per finished batch with its upload results and dropped repos, appended as batches finish
+# Appending keeps the cost of a checkpoint the same per batch whatever the number of repos
+
+
+def checkpointPath(checkpointDirectory: str, runId: int) -> str:
+    """
+    Takes in the checkpoint directory and a run id
+    Returns the folder holding the checkpoint of the run
+    """
+
+    return os.path.join(checkpointDirectory, str(runId))
+
+
+def latestCheckpoint(checkpointDirectory: str) -> Dict:
+    """
+    Takes in the checkpoint directory
+    Returns the checkpoint of the latest run that didn't complete, None if there is none
+
+        Parameters
+            checkpointDirectory (str) - Directory holding the checkpoints of backfill runs
+
+        Returns
+            Dict containing the run and its finished batches
+    """
+
+    if not os.path.isdir(checkpointDirectory):
+        return None
+
+    runIds = sorted((int(name) for name in os.listdir(checkpointDirectory) if name.isdigit()), reverse= True)
+
+    for runId in runIds:
+        checkpoint = loadCheckpoint(checkpointDirectory, runId)
+
+        if checkpoint is not None and not checkpoint["run"].get("completed", False):
+            return checkpoint
+
+    return None
+
+
+def loadCheckpoint(checkpointDirectory: str, runId: int) -> Dict:
+    """
+    Takes in the checkpoint directory and a run id
+    Returns the checkpoint of the run, None if the run has no checkpoint
+
+        Returns
+            Dict containing the run and its finished batches
+    """
+
+    runPath = os.path.join(checkpointPath(checkpointDirectory, runId), "run.json")
+
+    if not os.path.exists(runPath):
+        return None
+
+    with open(runPath) as runFile:
+        run = json.load(runFile)
+
+    batches = []
+    batchesPath = os.path.join(checkpointPath(checkpointDirectory, runId), "batches.jsonl")
+
+    if os.path.exists(batchesPath):
+        with open(batchesPath) as batchesFile:
+            for line in batchesFile:
+
+                # A line cut short by a crash is the batch that didn't finish, it is processed again
+
+                try:
+                    batches.append(json.loads(line))
+                except ValueError:
+                    break
+
+    return {
+        "run": run,
+        "batches": batches
+    }
+
+
+def saveRun(checkpointDirectory: str, run: Dict):
+    """
+    Takes in the checkpoint directory and the run
+    Writes run.json of the run, replacing it in one step so a crash never leaves half a file
+    """
+
+    runFolder = checkpointPath(checkpointDirectory, run["runId"])
+    os.makedirs(runFolder, exist_ok= True)
+
+    temporaryPath = os.path.join(runFolder, "run.json.tmp")
+
+    with open(temporaryPath, "w") as runFile:
+        json.dump(run, runFile)
+
+    os.replace(temporaryPath, os.path.join(runFolder, "run.json"))
+
+
+def appendBatch(checkpointDirectory: str, runId: int, batch: Dict):
+    """
+    Takes in the checkpoint directory, run id and a finished batch
+    Appends the batch to batches.jsonl of the run and flushes it to disk
+    """
+
+    with open(os.path.join(checkpointPath(checkpointDirectory, runId), "batches.jsonl"), "a") as batchesFile:
+        batchesFile.write(json.dumps(batch) + "\n")
+        batchesFile.flush()
+        os.fsync(batchesFile.fileno())
+
+
+def finishedRepos(batches: List) -> set:
+    """
+    Takes in the finished batches of a run
+    Returns the repos that don't need to be processed again, created, unchanged, failed to upload or dropped
+    """
+
+    repos = set()
+
+    for batch in batches:
+        for uploadResult in batch["uploadResults"]:
+            repos.update(uploadResult["createdList"])
+            repos.update(uploadResult["failedList"])
+            repos.update(unchangedRepo["repo"] for unchangedRepo in uploadResult.get("unchangedList", []))
+
+        repos.update(droppedRepo["repo"] for droppedRepo in batch["droppedRepos"])
+
+    return repos
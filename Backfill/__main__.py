@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import logging
+import os
+
+from Backfill.BackfillRun import loadLocalSettings, runBackfill
+
+
+# Backfill of repo stats outside Azure Functions, using the same activities, settings and Data/sources.json
+# Run from the project root, Eg: python -m Backfill --lanes 8 --concurrency 16
+# An interrupted backfill is resumed by running the same command again, use --new-run to start over
+
+
+def parseArguments():
+    parser = argparse.ArgumentParser(prog= "python -m Backfill", description= "Backfill repo stats for the repos in sources.json with checkpointing")
+
+    parser.add_argument("--sources", default= "sources.json", help= "Source file in Data folder")
+    parser.add_argument("--settings", default= "local.settings.json", help= "Settings file to read app settings from, environment variables take precedence")
+    parser.add_argument("--checkpoint-dir", default= ".backfill", help= "Directory to save checkpoints to")
+    parser.add_argument("--lanes", type= int, default= None, help= "Number of parallel query lanes, defaults to MaxParallelQueryLanes or the number of credentials")
+    parser.add_argument("--concurrency", type= int, default= 8, help= "Number of batches uploaded to Cosmos DB at a time across all lanes")
+    parser.add_argument("--run-id", type= int, default= None, help= "Run id of the backfill to resume, defaults to the latest backfill that didn't complete")
+    parser.add_argument("--new-run", action= "store_true", help= "Start a new backfill even if an earlier one didn't complete")
+    parser.add_argument("--no-email", action= "store_true", help= "Don't send email notifications")
+
+    return parser.parse_args()
+
+
+def main():
+    arguments = parseArguments()
+
+    logging.basicConfig(level= logging.INFO, format= "%(asctime)s %(levelname)s %(message)s")
+
+    loadLocalSettings(arguments.settings)
+
+    from Helpers.GithubCredentials import githubCredentialIds
+
+    lanes = arguments.lanes or int(os.environ.get("MaxParallelQueryLanes", len(githubCredentialIds())))
+
+    options = {
+        "sourcesFile": arguments.sources,
+        "checkpointDirectory": arguments.checkpoint_dir,
+        "lanes": max(lanes, 1),
+        "concurrency": max(arguments.concurrency, 1),
+        "runId": arguments.run_id,
+        "newRun": arguments.new_run,
+        "sendEmails": not arguments.no_email
+    }
+
+    result = asyncio.run(runBackfill(options))
+
+    print("Run " + str(result["runId"]) + ": " + str(result["createdCount"]) + " created, " + str(result["failedCount"]) + " failed, of which "
+          + str(result["droppedCount"]) + " dropped while querying github")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import resource
+import time
+
+from typing import Dict, List
+from Benchmarks.FakeGithubServer import startFakeGithubServer
+from Benchmarks.FakeCosmosContainer import FakeCosmosContainer
+from Benchmarks.LocalDurableRuntime import LocalDurableRuntime
+
+
+# Settings the activities read, pointing them at the fakes
+# Backoff is kept short so injected failures don't dominate the run time
+
+benchmarkEnvironment = {
+    "CosmosDB_Endpoint": "https://fake-cosmos.local:443/",
+    "CosmosDB_PrimaryKey": "fake-key",
+    "CosmosDB_DBName": "benchmark",
+    "CosmosDB_DataContainerName": "stats",
+    "CosmosDB_RunInfoContainerName": "runinfo",
+    "CosmosDB_RU_NeededForEachWrite": "5",
+    "SendEmailNotifications": "false",
+    "PublishToEventGrid": "false",
+    "Github_Tokens": "fake-token",
+    "NumberOfReposToQueryPerCall": "65",
+    "MaxNumberOfReposToQueryPerCall": "100",
+    "GraphqlQueryTargetSeconds": "6",
+    "Github_RetryBackoffSeconds": "1",
+    "Github_MaxRetryBackoffSeconds": "5",
+    "IncrementalRun_Enabled": "false",
+    "PayloadStore_Type": "none",
+    "FuseFetchAndParse": "true"
+}
+
+
+def runBenchmark(numberOfRepos: int, options: Dict) -> Dict:
+    """
+    Takes in the number of synthetic repos and the benchmark options
+    Runs the pipeline against fake github and Cosmos DB in this process and returns what it measured
+    Run each benchmark in a fresh process so peak memory is measured for that run only
+
+        Parameters
+            numberOfRepos (int) - Number of synthetic repos, spread evenly across the synthetic orgs
+            options (Dict) - Dict containing number of orgs, fake github settings, provisioned throughput (None for serverless),
+                             Cosmos DB latency and settings to override
+
+        Returns
+            Dict containing repos per second, request counts, RU consumed, peak memory, time spent in each activity
+                 and the largest history of each orchestrator function
+    """
+
+    repos = ["bench-org-{0}/repo-{1}".format(index % options["orgs"], index) for index in range(numberOfRepos)]
+
+    from Helpers.QueryLanes import groupReposByOwner
+
+    github = startFakeGithubServer(options["github"], groupReposByOwner(repos))
+
+    os.environ.update(benchmarkEnvironment)
+    os.environ.update({
+        "Github_GraphqlUrl": github["url"],
+        "CosmosDB_ServerlessMode": "true" if options["provisionedThroughput"] is None else "false",
+        "CosmosDB_ProvisionedThroughput": str(options["provisionedThroughput"] or 0)
+    })
+    os.environ.update(options.get("settings", {}))
+
+    containers = registerFakeContainers(options)
+
+    startTime = time.perf_counter()
+
+    runResult = runPipeline(sorted(set(repo.split('/')[0] for repo in repos)), containers[os.environ["CosmosDB_RunInfoContainerName"]])
+
+    elapsedSeconds = time.perf_counter() - startTime
+
+    githubCounters = dict(github["counters"])
+    githubCounters.pop("lock")
+    github["server"].shutdown()
+
+    return {
+        "repos": numberOfRepos,
+        "elapsedSeconds": round(elapsedSeconds, 3),
+        "reposPerSecond": round(runResult["createdCount"] / elapsedSeconds, 1) if elapsedSeconds > 0 else 0,
+        "createdCount": runResult["createdCount"],
+        "failedCount": runResult["failedCount"],
+        "github": githubCounters,
+        "cosmos": {containerName: container.counters for containerName, container in containers.items()},
+        "peakMemoryMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "activities": runResult["activities"],
+        "orchestrations": runResult["orchestrations"],
+        "entityOperations": runResult["entityOperations"]
+    }
+
+
+def registerFakeContainers(options: Dict) -> Dict:
+    """
+    Takes in the benchmark options
+    Registers fake Cosmos DB containers in the client registry, so activities get them instead of real containers
+
+        Returns
+            Dict containing the fake container of each container name
+    """
+
+    from Helpers.ClientRegistry import getClient
+
+    containers = {}
+
+    for containerName in (os.environ["CosmosDB_DataContainerName"], os.environ["CosmosDB_RunInfoContainerName"]):
+        container = FakeCosmosContainer(options["provisionedThroughput"], float(os.environ["CosmosDB_RU_NeededForEachWrite"]), options["cosmosLatencyMs"])
+
+        containers[containerName] = container
+
+        # Same fake for the containers taken with and without SDK throttle retries, the fake never retries
+
+        for throttleRetries in (True, False):
+            getClient("cosmosContainer",
+                      (os.environ["CosmosDB_Endpoint"], os.environ["CosmosDB_PrimaryKey"], os.environ["CosmosDB_DBName"], containerName, throttleRetries),
+                      lambda: container)
+
+    return containers
+
+
+def runPipeline(orgs: List, runInfoContainer: FakeCosmosContainer) -> Dict:
+    """
+    Takes in the synthetic orgs and the fake run info container
+    Runs GetRepoStatsOrchestrator with its discovery, lanes, batch sub orchestrations, rate governor entity, durable timers
+    and continue as new in this process, with the orgs as the full orgs of the sources
+
+        Returns
+            Dict containing number of repos created and failed, time and calls of each activity and the size of the orchestration histories
+    """
+
+    from Helpers.PayloadStore import loadPayload
+
+    runtime = LocalDurableRuntime({"GetReposFromSource": lambda sourceDataFile: {"fullOrgs": [{"orgName": org} for org in orgs], "individualRepos": []}})
+
+    try:
+        runtime.runOrchestration("GetRepoStatsOrchestrator")
+
+    finally:
+        runtime.shutdown()
+
+    # Run status is read back from the run info document, like the downstream processes do
+
+    runIds = [itemId for itemId in runInfoContainer.items if itemId.isdigit()]
+    runStatus = loadPayload(runInfoContainer.items[max(runIds)])
+
+    return {
+        "createdCount": runStatus["totalCreatedCount"],
+        "failedCount": runStatus["totalFailedCount"],
+        "activities": runtime.activities,
+        "orchestrations": runtime.orchestrations,
+        "entityOperations": runtime.entityOperations
+    }
@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+from typing import Dict
+from azure.cosmos.exceptions import CosmosHttpResponseError, CosmosResourceNotFoundError
+
+
+class FakeCosmosContainer:
+    """
+    Stand-in for a Cosmos DB container, registered in the client registry in place of the real container
+    Charges RU by document size, throttles (429) writes above the provisioned throughput
+    and reports the charge in x-ms-request-charge like Cosmos DB does
+
+        Parameters
+            provisionedThroughput (float) - RU per second before writes are throttled, None for serverless
+            ruPerKb (float) - RU charged for each KB written
+            latencyMs (float) - Latency of every operation
+    """
+
+    def __init__(self, provisionedThroughput: float = None, ruPerKb: float = 5, latencyMs: float = 5):
+        self.provisionedThroughput = provisionedThroughput
+        self.ruPerKb = ruPerKb
+        self.latencyMs = latencyMs
+
+        self.lock = threading.Lock()
+        self.items = {}
+        self.windowStart = time.monotonic()
+        self.windowRu = 0.0
+
+        self.counters = {
+            "operations": 0,
+            "writes": 0,
+            "throttled": 0,
+            "requestCharge": 0.0,
+            "bytesWritten": 0
+        }
+
+    def upsert_item(self, body: Dict, response_hook= None, **kwargs) -> Dict:
+        return self.writeItem(body, response_hook)
+
+    def create_item(self, body: Dict, response_hook= None, **kwargs) -> Dict:
+        return self.writeItem(body, response_hook)
+
+    def replace_item(self, item, body: Dict, response_hook= None, **kwargs) -> Dict:
+        return self.writeItem(body, response_hook)
+
+    def read_item(self, item, partition_key, response_hook= None, **kwargs) -> Dict:
+        self.charge(1, response_hook)
+
+        if str(item) not in self.items:
+            raise CosmosResourceNotFoundError(status_code= 404, message= "Entity with the specified id does not exist in the system")
+
+        return self.items[str(item)]
+
+    def query_items(self, query: str, parameters= None, response_hook= None, **kwargs):
+        self.charge(3, response_hook)
+
+        # Only the lookups made by the activities are supported, ids in a list, Eg: ARRAY_CONTAINS(@ids, c.id)
+        # or fields equal to a value named after the field, Eg: c.runId = @runId AND c.status = @status
+
+        ids = None
+        fields = {}
+
+        for parameter in parameters or []:
+            if isinstance(parameter["value"], list):
+                ids = set(parameter["value"])
+            else:
+                fields[parameter["name"][1:]] = parameter["value"]
+
+        with self.lock:
+            items = list(self.items.items())
+
+        return [item for itemId, item in items
+                if (ids is None or itemId in ids) and all(item.get(field) == value for field, value in fields.items())]
+
+    def writeItem(self, body: Dict, response_hook) -> Dict:
+        sizeInBytes = len(json.dumps(body).encode('utf-8'))
+        self.charge(max(self.ruPerKb * sizeInBytes / 1000, 1), response_hook)
+
+        with self.lock:
+            self.items[str(body["id"])] = body
+            self.counters["writes"] += 1
+            self.counters["bytesWritten"] += sizeInBytes
+
+        return body
+
+    def charge(self, requestCharge: float, response_hook):
+        time.sleep(self.latencyMs / 1000)
+
+        with self.lock:
+            self.counters["operations"] += 1
+
+            # Provisioned throughput is enforced per second, like Cosmos DB does
+
+            if self.provisionedThroughput is not None:
+                now = time.monotonic()
+
+                if now - self.windowStart >= 1:
+                    self.windowStart = now
+                    self.windowRu = 0.0
+
+                if self.windowRu + requestCharge > self.provisionedThroughput:
+                    self.counters["throttled"] += 1
+                    retryAfterMs = max((1 - (now - self.windowStart)) * 1000, 1)
+
+                    error = CosmosHttpResponseError(status_code= 429, message= "Request rate is large")
+                    error.headers = {
+                        "x-ms-retry-after-ms": str(round(retryAfterMs)),
+                        "x-ms-request-charge": "0"
+                    }
+                    raise error
+
+                self.windowRu += requestCharge
+
+            self.counters["requestCharge"] += requestCharge
+
+        if response_hook is not None:
+            response_hook({"x-ms-request-charge": str(requestCharge)}, None)
@@ -0,0 +1,272 @@
+import json
+import random
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+
+# Stand-in for the github graphql api, answers the batch queries built by GraphqlQueryBuilder
+# Repos are aliased r0 to rN and passed as ownerN and nameN variables, the fragment name tells which fields to return
+# Discovery queries page through the repos of the orgs the server is started with, orgs are passed as loginN and afterN variables
+
+
+def newFakeGithubSettings(**overrides) -> Dict:
+    """
+    Returns the settings of the fake github server, Eg: newFakeGithubSettings(error502Rate= 0.05)
+
+        Parameters
+            baseLatencyMs (float) - Latency of every request
+            perRepoLatencyMs (float) - Latency added for each repo in the query
+            pointsPerRepo (float) - Rate limit points each repo in the query costs
+            pointsPerHour (int) - Rate limit points available per hour
+            error502Rate (float) - Share of requests that fail with 502 Bad gateway, as github does for slow queries
+            error429Rate (float) - Share of requests that hit the secondary rate limit
+            retryAfterSeconds (int) - Seconds sent in retry-after header of secondary rate limit responses
+            notFoundRate (float) - Share of repos that are not found (deleted or renamed)
+            seed (int) - Seed of the random failures so runs can be compared
+    """
+
+    settings = {
+        "baseLatencyMs": 50,
+        "perRepoLatencyMs": 5,
+        "pointsPerRepo": 1,
+        "pointsPerHour": 5000,
+        "error502Rate": 0,
+        "error429Rate": 0,
+        "retryAfterSeconds": 1,
+        "notFoundRate": 0,
+        "seed": 42
+    }
+
+    settings.update(overrides)
+
+    return settings
+
+
+def newFakeGithubCounters() -> Dict:
+    """
+    Returns the counters the fake github server updates while serving requests
+    """
+
+    return {
+        "lock": threading.Lock(),
+        "requests": 0,
+        "repos": 0,
+        "errors502": 0,
+        "errors429": 0,
+        "notFound": 0,
+        "pointsSpent": 0,
+        "requestBytes": 0,
+        "responseBytes": 0
+    }
+
+
+def startFakeGithubServer(settings: Dict, orgRepos: Dict = None) -> Dict:
+    """
+    Takes in the settings of the fake github server and the repos of each org it serves
+    Starts the server on a free local port in a background thread
+
+        Parameters
+            settings (Dict) - Settings as returned by newFakeGithubSettings
+            orgRepos (Dict) - Repos with owner of each org, by org name, for discovery queries
+
+        Returns
+            Dict containing the server, its graphql url and counters
+    """
+
+    orgRepos = orgRepos or {}
+    counters = newFakeGithubCounters()
+    randomGenerator = random.Random(settings["seed"])
+    rateLimit = {"remaining": settings["pointsPerHour"]}
+
+    class FakeGithubHandler(BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            requestBody = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            request = json.loads(requestBody)
+            variables = request.get("variables") or {}
+            numberOfRepos = len([name for name in variables if name.startswith("owner")])
+
+            with counters["lock"]:
+                counters["requests"] += 1
+                counters["requestBytes"] += len(requestBody)
+                failure = randomGenerator.random()
+
+            time.sleep((settings["baseLatencyMs"] + settings["perRepoLatencyMs"] * numberOfRepos) / 1000)
+
+            if failure < settings["error502Rate"]:
+                with counters["lock"]:
+                    counters["errors502"] += 1
+
+                self.sendResponse(502, b"", {})
+                return
+
+            if failure < settings["error502Rate"] + settings["error429Rate"]:
+                with counters["lock"]:
+                    counters["errors429"] += 1
+
+                self.sendResponse(429, b'{"message": "You have exceeded a secondary rate limit"}', {
+                    "retry-after": str(settings["retryAfterSeconds"])
+                })
+                return
+
+            if "organization(" in request["query"]:
+                result = self.createDiscoveryResult(variables)
+            else:
+                result = self.createResult(request["query"], variables, numberOfRepos)
+
+            self.sendResponse(200, json.dumps(result).encode('utf-8'), {})
+
+        def createDiscoveryResult(self, variables: Dict) -> Dict:
+            data = {}
+            errors = []
+            numberOfOrgs = len([name for name in variables if name.startswith("login")])
+
+            with counters["lock"]:
+                counters["pointsSpent"] += 1
+                rateLimit["remaining"] = max(rateLimit["remaining"] - 1, 0)
+
+            # Cursor is the offset of the next page in the repos of the org
+
+            for index in range(numberOfOrgs):
+                alias = "o" + str(index)
+                login = variables["login" + str(index)]
+
+                if login not in orgRepos:
+                    data[alias] = None
+                    errors.append({
+                        "type": "NOT_FOUND",
+                        "path": [alias],
+                        "message": "Could not resolve to an Organization with the login of '" + login + "'."
+                    })
+                    continue
+
+                offset = int(variables["after" + str(index)] or 0)
+                page = orgRepos[login][offset : offset + 100]
+
+                data[alias] = {
+                    "repositories": {
+                        "pageInfo": {"hasNextPage": offset + 100 < len(orgRepos[login]), "endCursor": str(offset + len(page))},
+                        "nodes": [{"name": repo.split('/')[1], "nameWithOwner": repo, "isArchived": False, "isFork": False} for repo in page]
+                    }
+                }
+
+            data["rateLimit"] = {
+                "cost": 1,
+                "remaining": rateLimit["remaining"],
+                "resetAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 3600))
+            }
+
+            result = {"data": data}
+
+            if len(errors) > 0:
+                result["errors"] = errors
+
+            return result
+
+        def createResult(self, query: str, variables: Dict, numberOfRepos: int) -> Dict:
+            fragment = re.search(r"fragment (\w+) on Repository", query)
+            fragmentName = fragment.group(1) if fragment else ""
+
+            cost = max(round(settings["pointsPerRepo"] * numberOfRepos), 1)
+            data = {}
+            errors = []
+
+            with counters["lock"]:
+                counters["repos"] += numberOfRepos
+                counters["pointsSpent"] += cost
+                rateLimit["remaining"] = max(rateLimit["remaining"] - cost, 0)
+                notFound = [randomGenerator.random() < settings["notFoundRate"] for index in range(numberOfRepos)]
+
+            for index in range(numberOfRepos):
+                alias = "r" + str(index)
+                nameWithOwner = variables["owner" + str(index)] + "/" + variables["name" + str(index)]
+
+                if notFound[index]:
+                    data[alias] = None
+                    errors.append({
+                        "type": "NOT_FOUND",
+                        "path": [alias],
+                        "message": "Could not resolve to a Repository with the name '" + nameWithOwner + "'."
+                    })
+                    continue
+
+                data[alias] = createRepoData(fragmentName, nameWithOwner, index)
+
+            with counters["lock"]:
+                counters["notFound"] += len(errors)
+
+            data["rateLimit"] = {
+                "cost": cost,
+                "remaining": rateLimit["remaining"],
+                "resetAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 3600))
+            }
+
+            result = {"data": data}
+
+            if len(errors) > 0:
+                result["errors"] = errors
+
+            return result
+
+        def sendResponse(self, status: int, body: bytes, headers: Dict):
+            with counters["lock"]:
+                counters["responseBytes"] += len(body)
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+
+            for name, value in headers.items():
+                self.send_header(name, value)
+
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGithubHandler)
+    server.daemon_threads = True
+
+    threading.Thread(target= server.serve_forever, daemon= True).start()
+
+    return {
+        "server": server,
+        "url": "http://127.0.0.1:" + str(server.server_address[1]) + "/graphql",
+        "counters": counters
+    }
+
+
+def createRepoData(fragmentName: str, nameWithOwner: str, index: int) -> Dict:
+    """
+    Takes in the fragment of the query, repo name with owner and its index in the batch
+    Returns synthetic data for the repo with the fields the fragment selects
+    """
+
+    if fragmentName == "repoChanges":
+        return {
+            "nameWithOwner": nameWithOwner,
+            "updatedAt": "2021-01-19T20:44:18Z",
+            "pushedAt": "2021-01-19T20:44:18Z",
+            "issues": {"nodes": [{"updatedAt": "2021-01-18T10:00:00Z"}]},
+            "pullRequests": {"nodes": [{"updatedAt": "2021-01-17T10:00:00Z"}]}
+        }
+
+    return {
+        "nameWithOwner": nameWithOwner,
+        "isArchived": False,
+        "isTemplate": False,
+        "updatedAt": "2021-01-19T20:44:18Z",
+        "Issues": {"totalCount": 500 + index},
+        "openIssues": {"totalCount": 45 + index},
+        "closedIssues": {"totalCount": 455},
+        "PRs": {"totalCount": 761},
+        "openPRs": {"totalCount": 13},
+        "closedPRs": {"totalCount": 150},
+        "mergedPRs": {"totalCount": 598},
+        "stars": {"totalCount": 3378 + index}
+    }
@@ -0,0 +1,354 @@
+import asyncio
+import importlib
+import inspect
+import json
+import threading
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+
+# Runs the real orchestrator, entity and activity functions of the function app in this process
+# Each orchestration runs its generator once on a thread of its own, there is no replay, durable tasks are futures
+# Inputs and outputs go through json like in durable functions, so functions don't share state by reference
+# and the size of each orchestration history can be measured
+
+
+class LocalTask:
+    """
+    Stand-in for a durable task, yielded by orchestrator functions
+    The orchestration waits for its future and gets its result back from the yield
+
+        Parameters
+            future (Future) - Future completed with the result of the task
+    """
+
+    def __init__(self, future: Future):
+        self.future = future
+
+    @property
+    def result(self):
+        return self.future.result()
+
+
+class LocalOrchestrationContext:
+    """
+    Stand-in for DurableOrchestrationContext with the operations the orchestrator functions use
+    Adds the size of the input and of every task input and output to the history size of the orchestration
+
+        Parameters
+            runtime (LocalDurableRuntime) - Runtime running the orchestration
+            orchestrationInput - Input of the orchestration
+    """
+
+    def __init__(self, runtime, orchestrationInput):
+        self.runtime = runtime
+        self.orchestrationInput = orchestrationInput
+        self.continueAsNewInput = None
+        self.is_replaying = False
+
+        self.historyLock = threading.Lock()
+        self.historyBytes = 0
+        self.addToHistory(orchestrationInput)
+
+    @property
+    def current_utc_datetime(self) -> datetime:
+        return datetime.utcnow()
+
+    def get_input(self):
+        return self.orchestrationInput
+
+    def call_activity(self, name: str, input_= None) -> LocalTask:
+        return self.runtime.callActivity(self, name, input_)
+
+    def call_sub_orchestrator(self, name: str, input_= None) -> LocalTask:
+        return self.runtime.callSubOrchestrator(self, name, input_)
+
+    def call_entity(self, entityId, operationName: str, operationInput= None) -> LocalTask:
+        future = Future()
+        future.set_result(self.addToHistory(self.runtime.callEntity(entityId, operationName, self.addToHistory(operationInput))))
+
+        return LocalTask(future)
+
+    def signal_entity(self, entityId, operationName: str, operationInput= None):
+        self.runtime.callEntity(entityId, operationName, self.addToHistory(operationInput))
+
+    def create_timer(self, fireAt: datetime) -> LocalTask:
+        future = Future()
+
+        timer = threading.Timer(max((fireAt - datetime.utcnow()).total_seconds(), 0), future.set_result, [None])
+        timer.daemon = True
+        timer.start()
+
+        return LocalTask(future)
+
+    def task_all(self, tasks: List) -> LocalTask:
+        combinedFuture = Future()
+        combinedLock = threading.Lock()
+        tasksLeft = [len(tasks)]
+
+        # Fails as soon as one task fails, completes with the results in order when all tasks are done
+
+        def taskDone(future: Future):
+            with combinedLock:
+                if combinedFuture.done():
+                    return
+
+                if future.exception() is not None:
+                    combinedFuture.set_exception(future.exception())
+                    return
+
+                tasksLeft[0] -= 1
+
+                if tasksLeft[0] == 0:
+                    combinedFuture.set_result([task.future.result() for task in tasks])
+
+        if len(tasks) == 0:
+            combinedFuture.set_result([])
+
+        for task in tasks:
+            task.future.add_done_callback(taskDone)
+
+        return LocalTask(combinedFuture)
+
+    def task_any(self, tasks: List) -> LocalTask:
+        combinedFuture = Future()
+        combinedLock = threading.Lock()
+
+        # Completes with the first task done, like durable functions task_any
+
+        def taskDone(task: LocalTask):
+            with combinedLock:
+                if not combinedFuture.done():
+                    combinedFuture.set_result(task)
+
+        for task in tasks:
+            task.future.add_done_callback(lambda future, task= task: taskDone(task))
+
+        return LocalTask(combinedFuture)
+
+    def continue_as_new(self, input_):
+        self.continueAsNewInput = roundTrip(input_)
+
+    def addToHistory(self, value):
+        """
+        Takes in an input or output of the orchestration or one of its tasks
+        Adds its serialized size to the history size and returns it
+        """
+
+        with self.historyLock:
+            self.historyBytes += len(json.dumps(value))
+
+        return value
+
+
+class LocalEntityContext:
+    """
+    Stand-in for DurableEntityContext for one operation on an entity
+
+        Parameters
+            state - Current state of the entity, None if the entity has no state yet
+            operationName (str) - Name of the operation
+            operationInput - Input of the operation
+    """
+
+    def __init__(self, state, operationName: str, operationInput):
+        self.state = state
+        self.operation_name = operationName
+        self.operationInput = operationInput
+        self.result = None
+
+    def get_state(self, initializer= None):
+        if self.state is None and initializer is not None:
+            self.state = initializer() if callable(initializer) else initializer
+
+        return self.state
+
+    def get_input(self):
+        return self.operationInput
+
+    def set_state(self, state):
+        self.state = state
+
+    def set_result(self, result):
+        self.result = result
+
+
+class LocalDurableRuntime:
+    """
+    Runs orchestrations of the function app in this process with the real functions looked up by their folder name
+    Activities run on a thread pool, async activities on one event loop like the functions host runs them
+
+        Parameters
+            activityOverrides (Dict) - Functions to call in place of activities, by activity name, Eg: an activity reading files of the app
+            maxConcurrentActivities (int) - Number of activities run at a time
+    """
+
+    def __init__(self, activityOverrides: Dict = None, maxConcurrentActivities: int = 32):
+        self.activityOverrides = activityOverrides or {}
+        self.activityExecutor = ThreadPoolExecutor(max_workers= maxConcurrentActivities)
+
+        self.eventLoop = asyncio.new_event_loop()
+        threading.Thread(target= self.eventLoop.run_forever, daemon= True).start()
+
+        self.entityLock = threading.Lock()
+        self.entityStates = {}
+
+        self.statsLock = threading.Lock()
+        self.activities = {}
+        self.orchestrations = {}
+        self.entityOperations = 0
+
+    def runOrchestration(self, name: str, orchestrationInput= None):
+        """
+        Takes in the name of an orchestrator function and its input
+        Runs the orchestration to completion and returns its output
+        """
+
+        return self.startOrchestration(name, roundTrip(orchestrationInput)).result
+
+    def startOrchestration(self, name: str, orchestrationInput) -> LocalTask:
+        future = Future()
+
+        def runOrchestrationThread():
+            try:
+                future.set_result(self.runGenerations(name, orchestrationInput))
+
+            except BaseException as error:
+                future.set_exception(error)
+
+        threading.Thread(target= runOrchestrationThread, daemon= True).start()
+
+        return LocalTask(future)
+
+    def runGenerations(self, name: str, orchestrationInput):
+        """
+        Runs an orchestration generation after generation, until it returns without continuing as new
+        Each generation starts with a new context and history, like durable functions does
+        """
+
+        orchestratorFunction = importlib.import_module(name).orchestrator_function
+
+        with self.statsLock:
+            orchestrationStats = self.orchestrations.setdefault(name, {"instances": 0, "generations": 0, "maxHistoryBytes": 0})
+            orchestrationStats["instances"] += 1
+
+        while True:
+            context = LocalOrchestrationContext(self, orchestrationInput)
+            output = runGenerator(orchestratorFunction(context))
+
+            with self.statsLock:
+                orchestrationStats["generations"] += 1
+                orchestrationStats["maxHistoryBytes"] = max(orchestrationStats["maxHistoryBytes"], context.historyBytes + len(json.dumps(output)))
+
+            if context.continueAsNewInput is None:
+                return roundTrip(output)
+
+            orchestrationInput = context.continueAsNewInput
+
+    def callActivity(self, context: LocalOrchestrationContext, name: str, activityInput) -> LocalTask:
+        activityFunction = self.activityOverrides.get(name) or importlib.import_module(name).main
+        activityInput = context.addToHistory(roundTrip(activityInput))
+
+        if inspect.iscoroutinefunction(activityFunction):
+            async def runAsyncActivity():
+                startTime = time.perf_counter()
+
+                try:
+                    return context.addToHistory(roundTrip(await activityFunction(activityInput)))
+
+                finally:
+                    self.addActivityTime(name, startTime)
+
+            return LocalTask(asyncio.run_coroutine_threadsafe(runAsyncActivity(), self.eventLoop))
+
+        def runActivity():
+            startTime = time.perf_counter()
+
+            try:
+                return context.addToHistory(roundTrip(activityFunction(activityInput)))
+
+            finally:
+                self.addActivityTime(name, startTime)
+
+        return LocalTask(self.activityExecutor.submit(runActivity))
+
+    def callSubOrchestrator(self, context: LocalOrchestrationContext, name: str, orchestrationInput) -> LocalTask:
+        task = self.startOrchestration(name, context.addToHistory(roundTrip(orchestrationInput)))
+
+        task.future.add_done_callback(lambda future: context.addToHistory(future.result()) if future.exception() is None else None)
+
+        return task
+
+    def callEntity(self, entityId, operationName: str, operationInput):
+        """
+        Runs one operation on an entity and returns its result
+        Operations on all entities run one at a time, so an entity never sees two operations at once
+        """
+
+        entityFunction = importlib.import_module(entityId.name).entity_function
+
+        with self.entityLock:
+            entityKey = (entityId.name, entityId.key)
+            entityContext = LocalEntityContext(self.entityStates.get(entityKey), operationName, roundTrip(operationInput))
+
+            entityFunction(entityContext)
+
+            self.entityStates[entityKey] = roundTrip(entityContext.state)
+            self.entityOperations += 1
+
+            return roundTrip(entityContext.result)
+
+    def addActivityTime(self, name: str, startTime: float):
+        with self.statsLock:
+            activityStats = self.activities.setdefault(name, {"calls": 0, "seconds": 0.0})
+            activityStats["calls"] += 1
+            activityStats["seconds"] = round(activityStats["seconds"] + time.perf_counter() - startTime, 3)
+
+    def shutdown(self):
+        self.activityExecutor.shutdown()
+        self.eventLoop.call_soon_threadsafe(self.eventLoop.stop)
+
+
+def runGenerator(generator):
+    """
+    Takes in the generator of an orchestrator function
+    Waits for each task it yields and sends the result back, or throws the error of a failed task into it
+    Returns the output of the orchestrator function
+    """
+
+    if not inspect.isgenerator(generator):
+        return generator
+
+    taskResult = None
+    taskError = None
+
+    while True:
+        try:
+            if taskError is not None:
+                task = generator.throw(taskError)
+            else:
+                task = generator.send(taskResult)
+
+        except StopIteration as stop:
+            return stop.value
+
+        taskResult = None
+        taskError = None
+
+        try:
+            taskResult = task.future.result()
+
+        except Exception as error:
+            taskError = error
+
+
+def roundTrip(value):
+    """
+    Takes in a value passed between functions
+    Returns a copy of it as durable functions would pass it, serialized to json and back
+    """
+
+    return json.loads(json.dumps(value))
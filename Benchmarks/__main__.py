@@ -0,0 +1,120 @@
+import argparse
+import json
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+from Benchmarks.FakeGithubServer import newFakeGithubSettings
+from Benchmarks.BenchmarkRun import runBenchmark
+
+
+# Offline benchmark of the pipeline against fake github and Cosmos DB
+# Run from the project root, Eg: python -m Benchmarks --repos 1000,10000 --error-502-rate 0.02 --output baseline.json
+# Then after a change: python -m Benchmarks --repos 1000,10000 --error-502-rate 0.02 --baseline baseline.json
+
+
+def parseArguments():
+    parser = argparse.ArgumentParser(prog= "python -m Benchmarks", description= "Benchmark the repo stats pipeline against fake github and Cosmos DB")
+
+    parser.add_argument("--repos", default= "1000,10000,100000", help= "Comma separated numbers of synthetic repos to benchmark")
+    parser.add_argument("--orgs", type= int, default= 4, help= "Number of synthetic orgs the repos are spread across")
+    parser.add_argument("--lanes", type= int, default= 4, help= "Number of parallel query lanes, MaxParallelQueryLanes")
+    parser.add_argument("--github-latency-ms", type= float, default= 50, help= "Latency of every github request")
+    parser.add_argument("--github-repo-latency-ms", type= float, default= 5, help= "Latency added for each repo in a github request")
+    parser.add_argument("--points-per-repo", type= float, default= 1, help= "Rate limit points each repo costs")
+    parser.add_argument("--error-502-rate", type= float, default= 0, help= "Share of github requests failing with 502")
+    parser.add_argument("--error-429-rate", type= float, default= 0, help= "Share of github requests hitting the secondary rate limit")
+    parser.add_argument("--not-found-rate", type= float, default= 0, help= "Share of repos that are not found")
+    parser.add_argument("--provisioned-ru", type= float, default= None, help= "Provisioned Cosmos DB RU/s, leave out for serverless")
+    parser.add_argument("--cosmos-latency-ms", type= float, default= 5, help= "Latency of every Cosmos DB operation")
+    parser.add_argument("--setting", action= "append", default= [], help= "App setting to override, Eg: --setting FuseFetchAndParse=false")
+    parser.add_argument("--output", help= "File to save the results to, usable as baseline later")
+    parser.add_argument("--baseline", help= "Results saved earlier to compare with")
+
+    return parser.parse_args()
+
+
+def printResults(results: List, baseline: Dict):
+    """
+    Prints one line for each benchmark, with the change against baseline when a baseline for the same number of repos is given
+    """
+
+    print("{0:>8} {1:>10} {2:>10} {3:>9} {4:>9} {5:>6} {6:>6} {7:>12} {8:>9} {9:>10}".format(
+        "repos", "seconds", "repos/s", "created", "failed", "502s", "429s", "github reqs", "RU", "peak MB"))
+
+    for result in results:
+        requestCharge = sum(container["requestCharge"] for container in result["cosmos"].values())
+
+        print("{0:>8} {1:>10} {2:>10} {3:>9} {4:>9} {5:>6} {6:>6} {7:>12} {8:>9} {9:>10}".format(
+            result["repos"], result["elapsedSeconds"], result["reposPerSecond"], result["createdCount"], result["failedCount"],
+            result["github"]["errors502"], result["github"]["errors429"], result["github"]["requests"], round(requestCharge), result["peakMemoryMb"]))
+
+        baselineResult = baseline.get(str(result["repos"]))
+
+        if baselineResult is not None and baselineResult["reposPerSecond"] > 0:
+            print("{0:>8} repos/s {1:+.1%}, peak MB {2:+.1%} against baseline".format(
+                "",
+                result["reposPerSecond"] / baselineResult["reposPerSecond"] - 1,
+                result["peakMemoryMb"] / baselineResult["peakMemoryMb"] - 1))
+
+    print()
+
+    for result in results:
+        print(str(result["repos"]) + " repos, seconds spent in activities: " + ", ".join(
+            activityName + " " + str(activityTiming["seconds"]) + " (" + str(activityTiming["calls"]) + " calls)"
+            for activityName, activityTiming in result["activities"].items()))
+
+    for result in results:
+        print(str(result["repos"]) + " repos, largest history of each orchestration: " + ", ".join(
+            orchestrationName + " " + str(orchestrationStats["maxHistoryBytes"]) + " bytes (" + str(orchestrationStats["instances"]) + " instances, " 
+            + str(orchestrationStats["generations"]) + " generations)"
+            for orchestrationName, orchestrationStats in result["orchestrations"].items()) + ", " + str(result["entityOperations"]) + " entity operations")
+
+
+def main():
+    arguments = parseArguments()
+
+    settings = {"MaxParallelQueryLanes": str(arguments.lanes)}
+
+    for setting in arguments.setting:
+        name, value = setting.split("=", 1)
+        settings[name] = value
+
+    options = {
+        "orgs": arguments.orgs,
+        "provisionedThroughput": arguments.provisioned_ru,
+        "cosmosLatencyMs": arguments.cosmos_latency_ms,
+        "settings": settings,
+        "github": newFakeGithubSettings(
+            baseLatencyMs= arguments.github_latency_ms,
+            perRepoLatencyMs= arguments.github_repo_latency_ms,
+            pointsPerRepo= arguments.points_per_repo,
+            pointsPerHour= 10 ** 9,
+            error502Rate= arguments.error_502_rate,
+            error429Rate= arguments.error_429_rate,
+            notFoundRate= arguments.not_found_rate)
+    }
+
+    # Each benchmark runs in a fresh process, so clients, caches and peak memory don't carry over between sizes
+
+    results = []
+
+    for numberOfRepos in [int(repos) for repos in arguments.repos.split(",")]:
+        with ProcessPoolExecutor(max_workers= 1, mp_context= multiprocessing.get_context("spawn")) as executor:
+            results.append(executor.submit(runBenchmark, numberOfRepos, options).result())
+
+    baseline = {}
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baselineFile:
+            baseline = {str(result["repos"]): result for result in json.load(baselineFile)["results"]}
+
+    printResults(results, baseline)
+
+    if arguments.output:
+        with open(arguments.output, "w") as outputFile:
+            json.dump({"options": options, "results": results}, outputFile, indent= 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import json
+import logging
+import os
+
+from Helpers.SendEmails import sendEmail
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.CosmosRateController import getRuRateController, pacedCosmosOperation
+from Helpers.RunInfoStore import createRunTrendsDocument
+from Helpers.TrendAnalytics import computeTrendReport
+
+
+def main(currentRunId: int) -> str:
+    """
+    Takes in the current run id
+    Computes star growth, issue and pull request velocity and the top movers over the last runs from the run snapshots
+    and saves them to run info container next to the run info document
+    Returns status of the operation
+
+        Parameters
+            currentRunId (int) - Current run id
+
+        Returns
+            Status of the operation
+    """
+
+    try:
+        trendReport = computeTrendReport(currentRunId)
+
+        endpoint = os.environ["CosmosDB_Endpoint"]
+        key = os.environ["CosmosDB_PrimaryKey"]
+        databaseName = os.environ["CosmosDB_DBName"]
+        containerName = os.environ["CosmosDB_RunInfoContainerName"]
+        container  = cosmosDbContainer(endpoint, key, databaseName, containerName, throttleRetries= False)
+
+        rateController = None
+
+        if os.environ["CosmosDB_ServerlessMode"].lower() != "true":
+            rateController = getRuRateController(containerName)
+
+        trendsDocument = createRunTrendsDocument(currentRunId, trendReport)
+
+        trendsStatus = pacedCosmosOperation(rateController,
+                                            lambda captureResponse: container.upsert_item(trendsDocument, response_hook= captureResponse),
+                                            len(json.dumps(trendsDocument).encode('utf-8')),
+                                            containerName)
+
+        if not trendsStatus["success"]:
+            raise Exception("Unable to save run trends, status " + str(trendsStatus["statusCode"]))
+
+        return "Computed trends over " + str(len(trendReport["runIds"])) + " runs for " + str(trendReport["repoCount"]) + " repos"
+
+    except:
+        # Log error and send email in case of exception
+
+        logging.error("Error- Unable to compute run trends")
+
+        sendEmail("Error- Unable to compute run trends")
+        raise
@@ -1,34 +1,37 @@
 import logging
 
-from typing import List
+from typing import Dict, List
 from Helpers.SendEmails import sendEmail
+from Helpers.GraphqlQueryBuilder import createRepositoryBatchQuery, createRepositoryBatchVariables
 
 
-def main(repos: List) -> str:
+# Fields fetched for each repo, defined once in the repoStats fragment of the query
+
+repoStatsSelection = ('nameWithOwner,isArchived,isTemplate,updatedAt,Issues: issues{totalCount},openIssues: issues(states: OPEN) {totalCount},'
+                      'closedIssues: issues(states: CLOSED) {totalCount},PRs: pullRequests{totalCount},openPRs: pullRequests(states: OPEN) {totalCount},'
+                      'closedPRs: pullRequests(states: CLOSED) {totalCount},mergedPRs: pullRequests(states: MERGED) {totalCount},stars: stargazers {totalCount}')
+
+
+def main(repos: List) -> Dict:
     """
     Takes in a list of repos 
-    Returns one graphql query for the list of repos
+    Returns one graphql query for the list of repos along with its variables
 
         Parameters
             repos (List) - List containing repos to fetch stats
             
         Returns
-            One graphql query for the list of repos obtained
+            Dict containing the graphql query text and the owner and name of each repo as variables
     """
     
     try:
-        graphqlQuery = 'query getRepoStats {'
+        # Query text only depends on the number of repos and is cached, repos are passed as variables
+        # so repo names never need escaping
 
-
-        # Loop through the list of repos and form graphql query
-        
-        for index, repo in enumerate(repos):
-            identifier = 'r' + str(index)
-            graphqlQuery += createQueryForRepo(repo, identifier)
-
-        graphqlQuery += '}'
-    
-        return graphqlQuery
+        return {
+            "query": createRepositoryBatchQuery("getRepoStats", "repoStats", repoStatsSelection, len(repos)),
+            "variables": createRepositoryBatchVariables(repos)
+        }
     
     except:
         # Log error and send email in case of exception
@@ -38,25 +41,3 @@ def main(repos: List) -> str:
         
         sendEmail("Error- unable to create graphql query for" + str(repos))
         raise
-
-def createQueryForRepo(repo, identifier):
-    """
-    Takes in a repo name and its identifier
-    Returns graphql query for given repo
-
-        Parameters
-            repos (str) - List containing repos to fetch stats
-            identifier(str) - Unique identifier for thr repo query
-            
-        Returns
-            Graphql query for the repo
-    """
-    
-    # Split owner, repo name from repo and pass to graphql query
-    
-    owner = repo.split('/')[0]
-    name = repo.split('/')[1]
-    
-    queryForRepoStats = '$identifier: repository(owner: "$owner", name: "$name") {nameWithOwner,isArchived,isTemplate,updatedAt,Issues: issues{totalCount},openIssues: issues(states: OPEN) {totalCount},closedIssues: issues(states: CLOSED) {totalCount},PRs: issues{totalCount},openPRs: pullRequests(states: OPEN) {totalCount},closedPRs: pullRequests(states: CLOSED) {totalCount},mergedPRs: pullRequests(states: MERGED) {totalCount},stars: stargazers {totalCount}}'.replace("$identifier", identifier).replace("$owner", owner).replace("$name", name)  
-    
-    return queryForRepoStats
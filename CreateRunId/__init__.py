@@ -1,9 +1,10 @@
 import logging
 import os
-import azure.cosmos.cosmos_client as cosmos_client
 
 from datetime import datetime
 from Helpers.SendEmails import sendEmail
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.RunInfoStore import runInfoDate
 
 
 def main(name: str) -> int:
@@ -28,7 +29,7 @@ def main(name: str) -> int:
         
         currentUtcDateTime = datetime.utcnow()
         runId = str(currentUtcDateTime.timestamp()).split('.')[0]
-        date = currentUtcDateTime.strftime("%Y%m%d")
+        date = runInfoDate(runId)
 
         runInfo = {
             "id" : runId,
@@ -37,9 +38,7 @@ def main(name: str) -> int:
 
         # Create id in Container and return the id if successful else return 0
         
-        client = cosmos_client.CosmosClient(endpoint, key)
-        database = client.get_database_client(database_name)
-        container = database.get_container_client(container_name)
+        container = cosmosDbContainer(endpoint, key, database_name, container_name)
         
         result = container.create_item(runInfo)
         return int(result["id"])
@@ -0,0 +1,31 @@
+import logging
+import os
+
+from Helpers.SendEmails import sendEmail
+from Helpers.PayloadStore import deleteExpiredPayloads
+
+
+def main(name: str) -> str:
+    """
+    Deletes the payloads offloaded to the payload store by runs that completed, or gave up, before 'PayloadStore_RetentionHours'
+    Returns status of the operation
+
+        Returns
+            Status of the operation
+    """
+
+    try:
+        # Payloads of the current run are kept, its orchestrations can still be replaying
+
+        retentionHours = float(os.environ.get("PayloadStore_RetentionHours", 72))
+        deletedCount = deleteExpiredPayloads(retentionHours)
+
+        return "Deleted " + str(deletedCount) + " expired payloads"
+
+    except:
+        # Log error and send email in case of exception
+
+        logging.error("Error- Unable to delete expired payloads")
+
+        sendEmail("Error- Unable to delete expired payloads")
+        raise
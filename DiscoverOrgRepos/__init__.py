@@ -0,0 +1,244 @@
+import functools
+import logging
+import os
+
+from typing import Dict, List
+from Helpers.SendEmails import sendEmail
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.CosmosBulkWriter import bulkUpsertItems
+from Helpers.CosmosRateController import getRuRateController
+from Helpers.RunInfoStore import createRunDetailDocuments, runDetailBatchKey
+from ExecuteGraphqlQuery import executeGraphqlQuery
+
+
+def main(discovery: Dict) -> Dict:
+    """
+    Takes in a set of orgs from source.json along with their page cursors and the github credential to use
+    Returns the next pages of repos for the orgs after removing the excluded repos
+
+    All orgs are aliased in one graphql query getting 100 repos of each org per request
+    Up to 'Discovery_PagesPerCall' requests are made one after other, so each call returns several pages of each org
+
+    When a run id is given the repos found are saved as discovered run detail documents of the run instead of being returned,
+    so they don't pass through orchestration history, and only the number of repos found for each org is returned
+
+        Parameters
+            discovery (Dict) - Dict containing orgs with their cursors, id of the github credential from the pool
+                               and optionally current run id
+            
+        Returns
+            Dict containing repos of each org found in this call (or their number) with the org cursors, orgs that failed,
+            the execution status and github rate limit info
+    """
+
+    try:
+        pagesPerCall = int(os.environ.get("Discovery_PagesPerCall", 10))
+
+        orgs = [dict(orgInfo) for orgInfo in discovery["orgs"]]
+
+        for orgInfo in orgs:
+            orgInfo["repos"] = []
+
+        discoveryStatus = {
+            "orgs": orgs,
+            "failedOrgs": [],
+            "executionFailed": False,
+            "timedOut": False,
+            "rateLimit": {},
+            "retryAfterSeconds": 0
+        }
+
+        for page in range(pagesPerCall):
+            orgsToQuery = [orgInfo for orgInfo in orgs if orgInfo["hasNextPage"]]
+
+            if len(orgsToQuery) == 0:
+                break
+
+            discoveryQuery = createDiscoveryQuery(orgsToQuery)
+
+            queryResult = executeGraphqlQuery({
+                "query": discoveryQuery["query"],
+                "variables": discoveryQuery["variables"],
+                "credentialId": discovery["credentialId"],
+                "operation": "discovery"
+            })
+
+            discoveryStatus["rateLimit"] = queryResult["rateLimit"] or discoveryStatus["rateLimit"]
+
+            # If a page fails return the pages got so far, next call continues from the cursors
+            # Fail the call only if nothing was got
+
+            if queryResult["executionFailed"]:
+                if page == 0:
+                    discoveryStatus["executionFailed"] = True
+                    discoveryStatus["timedOut"] = queryResult["timedOut"]
+                    discoveryStatus["retryAfterSeconds"] = queryResult["retryAfterSeconds"]
+
+                break
+
+            queryData = queryResult["githubStatsData"]["data"]
+
+            # Orgs that can't be resolved are given up on
+
+            for failedAlias in queryResult["failedAliases"]:
+                failedOrg = orgsToQuery[int(failedAlias["alias"][1:])]
+                failedOrg["hasNextPage"] = False
+
+                discoveryStatus["failedOrgs"].append({
+                    "orgName": failedOrg["orgName"],
+                    "reason": failedAlias["type"] or "FAILED"
+                })
+
+            for index, orgInfo in enumerate(orgsToQuery):
+                orgRepos = queryData.get('o' + str(index))
+
+                if orgRepos is None:
+                    continue
+
+                orgInfo["repos"].extend(filterRepos(orgInfo, orgRepos["repositories"]["nodes"]))
+                orgInfo["cursor"] = orgRepos["repositories"]["pageInfo"]["endCursor"]
+                orgInfo["hasNextPage"] = orgRepos["repositories"]["pageInfo"]["hasNextPage"]
+
+        if "currentRunId" in discovery:
+            saveDiscoveredRepos(discovery, discoveryStatus)
+
+        return discoveryStatus
+
+    except:
+        # Log error and send email in case of exception
+
+        logging.error("Error-Unable to get org info for")
+        logging.error(discovery["orgs"])
+
+        sendEmail("Error-Unable to get org info for" + str(discovery["orgs"]))
+        raise
+
+
+def saveDiscoveredRepos(discovery: Dict, discoveryStatus: Dict):
+    """
+    Takes in the input of the call and the discovery status holding the repos found
+    Writes the repos found as discovered run detail documents in run info container
+    and replaces the repos of each org in the status with their number
+
+        Parameters
+            discovery (Dict) - Dict containing orgs with the cursors the call started from and current run id
+            discoveryStatus (Dict) - Discovery status of the call, updated in place
+    """
+
+    endpoint = os.environ["CosmosDB_Endpoint"]
+    key = os.environ["CosmosDB_PrimaryKey"]
+    databaseName = os.environ["CosmosDB_DBName"]
+    containerName = os.environ["CosmosDB_RunInfoContainerName"]
+    container  = cosmosDbContainer(endpoint, key, databaseName, containerName, throttleRetries= False)
+
+    rateController = None
+
+    if os.environ["CosmosDB_ServerlessMode"].lower() != "true":
+        rateController = getRuRateController(containerName)
+
+    # Keyed by the orgs and the cursors the call started from, a retried call overwrites the documents it wrote earlier
+
+    discoveredRepos = [repo for orgInfo in discoveryStatus["orgs"] for repo in orgInfo["repos"]]
+
+    discoveredDocuments = createRunDetailDocuments(discovery["currentRunId"],
+                                                   "discovered",
+                                                   discoveredRepos,
+                                                   runDetailBatchKey([orgInfo["orgName"] + ":" + str(orgInfo["cursor"]) for orgInfo in discovery["orgs"]]))
+
+    detailStatuses = bulkUpsertItems(container, discoveredDocuments, rateController= rateController)
+    failedDetailStatuses = [detailStatus for detailStatus in detailStatuses if not detailStatus["success"]]
+
+    if len(failedDetailStatuses) > 0:
+        raise Exception("Unable to write " + str(len(failedDetailStatuses)) + " run detail documents")
+
+    for orgInfo in discoveryStatus["orgs"]:
+        orgInfo["repoCount"] = len(orgInfo.pop("repos"))
+
+
+def createDiscoveryQuery(orgs: List) -> Dict:
+    """
+    Takes in a list of orgs with their page cursors
+    Returns one graphql query that gets the next page of repos for all the orgs along with its variables
+
+        Parameters
+            orgs (List) - List of orgs with cursor of the last page got, None for the first page
+
+        Returns
+            Dict containing the graphql query text and the login and cursor of each org as variables
+    """
+
+    # Logins and cursors are passed as variables so they never need escaping, the query text is cached by the number of orgs
+
+    variables = {}
+
+    for index, orgInfo in enumerate(orgs):
+        variables["login" + str(index)] = orgInfo["orgName"]
+        variables["after" + str(index)] = orgInfo["cursor"]
+
+    return {
+        "query": createDiscoveryQueryText(len(orgs)),
+        "variables": variables
+    }
+
+
+@functools.lru_cache(maxsize= 64)
+def createDiscoveryQueryText(numberOfOrgs: int) -> str:
+    """
+    Takes in the number of orgs in the query
+    Returns the graphql query text getting the next page of repos for that many orgs, Eg: for 1 org
+
+        query getOrgRepos($login0: String!,$after0: String) {
+          o0: organization(login: $login0) {repositories(first: 100, after: $after0) {...}}
+          rateLimit {cost,remaining,resetAt}
+        }
+
+        Parameters
+            numberOfOrgs (int) - Number of orgs aliased in the query
+
+        Returns
+            Graphql query text
+    """
+
+    variableDefinitions = ",".join("$login{0}: String!,$after{0}: String".format(index) for index in range(numberOfOrgs))
+    organizations = "".join(("o{0}: organization(login: $login{0}) {{repositories(first: 100, after: $after{0}) "
+                             "{{pageInfo {{hasNextPage,endCursor}},nodes {{name,nameWithOwner,isArchived,isFork}}}}}}").format(index)
+                            for index in range(numberOfOrgs))
+
+    return ("query getOrgRepos" + ("(" + variableDefinitions + ")" if numberOfOrgs > 0 else "") + " {"
+            + organizations
+            + "rateLimit {cost,remaining,resetAt}"
+            + "}")
+
+
+def filterRepos(orgInfo: Dict, repos: List) -> List:
+    """
+    Takes in the org info from source.json and a page of repos of the org
+    Returns repos with owner after removing the excluded repos and the archived or forked repos if asked to
+
+        Parameters
+            orgInfo (Dict) - Single org info from sources.json
+            repos (List) - Page of repos of the org
+
+        Returns
+            List of repos with owner
+    """
+
+    reposToExclude = []
+    if "exclude" in orgInfo:
+        reposToExclude = orgInfo["exclude"].split(',')
+
+    excludeArchived = orgInfo.get("excludeArchived", False)
+    excludeForks = orgInfo.get("excludeForks", False)
+
+    reposToGetStats = []
+
+    for repo in repos:
+        if repo["name"] in reposToExclude:
+            continue
+
+        if (excludeArchived and repo["isArchived"]) or (excludeForks and repo["isFork"]):
+            continue
+
+        reposToGetStats.append(repo["nameWithOwner"])
+
+    return reposToGetStats
@@ -1,66 +1,254 @@
+import contextlib
 import logging
 import os
+import time
 
-from typing import Dict
+from typing import Dict, List
 from Helpers.SendEmails import sendEmail
-from sgqlc.endpoint.http import HTTPEndpoint
+from Helpers.GithubCredentials import getGithubToken
+from Helpers.GraphqlTransport import postGraphql, postGraphqlAsync
+from Helpers.PayloadStore import storePayload
+from Helpers.Telemetry import timedSpan, recordGithubRequest
+from ParseGraphqlQueryResult import parseQueryResults
 
 
-def main(graphqlQueryToExecute: str) -> Dict:
+async def main(graphqlQueryToExecute: Dict) -> Dict:
     
     """
-    Takes in graphql query for a set of repos 
+    Takes in graphql query for a set of repos and the github credential to use
     Returns Dict of result
 
+    Runs async, so the worker keeps the queries of several lanes in flight without a thread for each
+
         Parameters
-            graphqlQueryToExecute (str) - Graphql query to execute
+            graphqlQueryToExecute (Dict) - Graphql query to execute, its variables if any, id of the github credential from the pool,
+                                           optionally the run id to parse the result for, whether to offload large results to the payload store
+                                           and the operation the query is made for (stats, discovery or changes) to tag its telemetry
             
         Returns
-            Dict containing result of executed graphql query and the execution status
+            Dict containing result of executed graphql query for the repos that succeeded or the batch of their parsed stats in fused mode, the execution status, 
+            aliases of repos that failed, github rate limit info, seconds github asked to wait before retrying, time taken to execute the query
+            and size of the github response
     """
 
-    githubStatsData = {}
-    executionFailed = False
+    with graphqlQueryExecution(graphqlQueryToExecute) as execution:
+        execution["response"] = await postGraphqlAsync(*execution["request"])
+
+    return execution["result"]
+
+
+def executeGraphqlQuery(graphqlQueryToExecute: Dict) -> Dict:
+    """
+    Takes in graphql query for a set of repos and the github credential to use
+    Returns Dict of result, same as main but waits for github on the calling thread
+
+    Used by activities that query github more than once in a call and by the benchmark runner
+
+        Parameters
+            graphqlQueryToExecute (Dict) - Graphql query to execute, same as main
+            
+        Returns
+            Dict containing result of executed graphql query, same as main
+    """
+
+    with graphqlQueryExecution(graphqlQueryToExecute) as execution:
+        execution["response"] = postGraphql(*execution["request"])
+
+    return execution["result"]
+
+
+@contextlib.contextmanager
+def graphqlQueryExecution(graphqlQueryToExecute: Dict):
+    """
+    Context manager around sending a graphql query, shared by main and executeGraphqlQuery which only differ in how they wait for github
+    Yields a dict with the request to send, url, token, query and variables, the code inside sets the response got from the transport in it
+    On exit sets the result of the query in it, as returned by main
+
+    Failed queries, timeouts and connection failures included, come back from the transport as results for the lane to retry or split,
+    only unexpected errors are raised
+
+        Parameters
+            graphqlQueryToExecute (Dict) - Graphql query to execute, same as main
+    """
 
     try:
-        # Set up the graphql client
-        
-        url = "https://api.github.com/graphql"
-        githubToken = os.environ["Github_Token"]
+        # Execute query and measure the time taken, used for sizing next batches and exported as telemetry
 
-        headers = {
-            'Authorization': 'bearer ' + githubToken,
-        }
-        endpoint = HTTPEndpoint(url, headers)
-        
-        # Execute query
-        
-        result = endpoint(graphqlQueryToExecute)
+        url = os.environ.get("Github_GraphqlUrl", "https://api.github.com/graphql")
+        githubToken = getGithubToken(graphqlQueryToExecute["credentialId"])
+        variables = graphqlQueryToExecute.get("variables")
 
-        if "errors" in result:
-            logging.error("Error- Graphql query execution has errors")
-            logging.error(graphqlQueryToExecute)
-            executionFailed = True
+        execution = {"request": (url, githubToken, graphqlQueryToExecute["query"], variables)}
 
-        else:
-            githubStatsData = result
-        
-        # Return the result and status
-        
-        graphqlQueriesExecutionResult = {
-            "githubStatsData": githubStatsData,
-            "executionFailed": executionFailed
-            }
+        with timedSpan("github." + graphqlQueryToExecute.get("operation", "stats"), {"repos": len(variables or {}) // 2}) as span:
+            yield execution
 
-        return graphqlQueriesExecutionResult
+        execution["result"] = createExecutionResult(graphqlQueryToExecute, execution["response"], span)
 
     except:
         # Log error and send email in case of exception
         
         logging.error("Error- Unable to execute graphql query")
-        logging.error(graphqlQueryToExecute)
+        logging.error(graphqlQueryToExecute["query"])
         
-        sendEmail("Error- Unable to execute graphql query" + str(graphqlQueryToExecute))
+        sendEmail("Error- Unable to execute graphql query" + str(graphqlQueryToExecute["query"]))
         raise
 
 
+def createExecutionResult(graphqlQueryToExecute: Dict, response: Dict, span: Dict) -> Dict:
+    """
+    Takes in the executed graphql query, the response got from the transport and the span the query was timed in
+    Returns Dict of result
+
+        Parameters
+            graphqlQueryToExecute (Dict) - Graphql query that was executed
+            response (Dict) - Graphql result and size of the response as returned by the transport
+            span (Dict) - Span of the query, with time taken and number of repos
+
+        Returns
+            Dict containing result of executed graphql query, as returned by main
+    """
+
+    githubStatsData = {}
+    executionFailed = False
+    timedOut = False
+    failedAliases = []
+    rateLimit = {}
+    retryAfterSeconds = 0
+    parsedStats = None
+
+    result = response["result"]
+    elapsedSeconds = span["elapsedSeconds"]
+
+    # Github returns partial data when only some repos fail (Eg: deleted or renamed repos)
+    # Errors of those repos carry the repo alias in path, keep the repos that succeeded
+
+    queryData = result.get("data") or {}
+
+    if "errors" in result:
+        failedAliases = getFailedAliases(result)
+
+        if len(queryData) == 0 or len(failedAliases) < len(result["errors"]):
+            logging.error("Error- Graphql query execution has errors")
+            logging.error(graphqlQueryToExecute["query"])
+            executionFailed = True
+            timedOut = isTimeout(result)
+            retryAfterSeconds = getRetryAfterSeconds(result)
+            failedAliases = []
+
+    if not executionFailed:
+        # Separate rate limit info from repo stats so only repos are parsed later
+
+        rateLimit = queryData.pop("rateLimit", None) or {}
+
+        for failedAlias in failedAliases:
+            queryData.pop(failedAlias["alias"], None)
+
+        githubStatsData = {"data": queryData}
+
+        # In fused mode parse the result here and return only the stats documents, the raw result never leaves the activity
+
+        if "parseForRunId" in graphqlQueryToExecute:
+            parsedStats = parseQueryResults(queryData, graphqlQueryToExecute["parseForRunId"])
+            githubStatsData = {}
+
+        # Orchestrations ask for large results to be offloaded to the payload store, activities calling this directly don't
+
+        if graphqlQueryToExecute.get("offloadResult", False):
+            githubStatsData = storePayload(githubStatsData)
+            parsedStats = storePayload(parsedStats)
+    
+    recordGithubRequest(graphqlQueryToExecute.get("operation", "stats"), elapsedSeconds, rateLimit.get("cost", 0), 
+                        response["responseBytes"], span["repos"], executionFailed)
+
+    # Return the result and status
+    
+    graphqlQueriesExecutionResult = {
+        "githubStatsData": githubStatsData,
+        "parsedStats": parsedStats,
+        "executionFailed": executionFailed,
+        "timedOut": timedOut,
+        "failedAliases": failedAliases,
+        "rateLimit": rateLimit,
+        "retryAfterSeconds": retryAfterSeconds,
+        "elapsedSeconds": elapsedSeconds,
+        "responseBytes": response["responseBytes"]
+        }
+
+    return graphqlQueriesExecutionResult
+
+
+def getRetryAfterSeconds(result: Dict) -> int:
+    """
+    Takes in a failed graphql result
+    Returns the seconds github asked to wait before sending next request, 0 if github didn't ask to wait
+
+        Parameters
+            result (Dict) - Result of a graphql query that has errors
+            
+        Returns
+            Seconds to wait before sending next request
+    """
+
+    retryAfterSeconds = 0
+
+    for error in result["errors"]:
+
+        # Http errors carry the response headers
+        # Secondary rate limits send retry-after, primary rate limits send the reset time
+
+        headers = error.get("headers") or {}
+
+        if headers.get("retry-after"):
+            retryAfterSeconds = max(retryAfterSeconds, int(headers["retry-after"]))
+
+        elif headers.get("x-ratelimit-remaining") == "0" and headers.get("x-ratelimit-reset"):
+            retryAfterSeconds = max(retryAfterSeconds, int(headers["x-ratelimit-reset"]) - int(time.time()))
+
+    return retryAfterSeconds
+
+
+def getFailedAliases(result: Dict) -> List:
+    """
+    Takes in a graphql result that has errors
+    Returns the repo aliases that failed along with the error type, errors not tied to a repo are skipped
+
+        Parameters
+            result (Dict) - Result of a graphql query that has errors
+            
+        Returns
+            List of dicts containing alias, error type and error message of failed repos
+    """
+
+    failedAliases = []
+
+    for error in result["errors"]:
+        path = error.get("path") or []
+
+        if len(path) > 0 and path[0] != "rateLimit":
+            failedAliases.append({
+                "alias": path[0],
+                "type": error.get("type", ""),
+                "message": error.get("message", "")
+            })
+
+    return failedAliases
+
+
+def isTimeout(result: Dict) -> bool:
+    """
+    Takes in a failed graphql result
+    Returns True if github failed the query because it took too long, Eg: 502 Bad gateway
+
+        Parameters
+            result (Dict) - Result of a graphql query that has errors
+            
+        Returns
+            True if the query timed out
+    """
+
+    for error in result["errors"]:
+        if error.get("status") in (502, 504) or "timeout" in str(error.get("message", "")).lower():
+            return True
+
+    return False
@@ -0,0 +1,420 @@
+import logging
+import os
+import azure.durable_functions as df
+
+from datetime import timedelta
+from Helpers.QueryCostModel import nextBatchSize, updateQueryCostModel
+from Helpers.QueryRetry import planRetry
+from Helpers.RepoChangeIndex import isIncrementalRunEnabled
+from Helpers.RunProfile import newRunProfile, addGithubQuery
+from Helpers.RateGovernor import waitForGithubCapacity, reportGithubRateLimit, retryBackoffSeconds
+from Helpers.RunReport import newRunSummary, mergeRunSummary
+
+
+def orchestrator_function(context: df.DurableOrchestrationContext):
+    """
+    Sub orchestrator function that queries github stats for one lane of repos
+    A lane holds all repos of the owners assigned to it, grouped by owner, saved in pages to run info container by AssignQueryLanes
+    Lanes run in parallel, each lane starts with a github credential from the pool,
+    reads its repos one page at a time and queries them one batch after other
+    Each fetched batch is parsed and uploaded in its own sub orchestration while the lane goes on to the next batch
+    Batches save their repos, change index and snapshot part themselves, the lane only adds up their summaries
+
+    Lanes with many batches continue as new every 'MaxBatchesPerLaneHistory' batches and change check pages, so the history replayed
+    stays the same size however many repos the lane has. The state of the lane is carried to the next generation in its input,
+    it holds the next page to read, the repos of the pages read that are left to check and query and running totals
+    but no results of the batches, so it doesn't grow with the batches
+
+    Input
+        Dict containing current run id, lane index, number of pages of repos of the lane, preferred credential id,
+        ids of all credentials in pool and cost model to start with
+        or, in later generations, current run id, lane index, number of pages, ids of all credentials in pool
+        and the lane state left by the previous generation
+
+    Returns
+        Dict containing the summary of the uploads of all batches and repos given up on,
+        the cost model learned in the lane and the profile of its github queries
+    """
+
+    laneInput = context.get_input()
+
+    credentialIds = laneInput["credentialIds"]
+
+    # Notes: 
+    # Github api doesn't allow to send requests parallely against a same org or owner
+    # Lanes are formed so that all repos of an owner are in same lane, so process one by one in the lane
+    # Don't send a list of all repos to activity function and process
+    # Activity function will time out if processing take more than 10 minutes in consumption plans
+    # Common github api error is 502 Bad gateway timeout, It can occur itermittently at any point
+    # The fix is to send smaller queries or to wait sometime and send requests again (30 seconds is enough)
+    
+    # Below code takes care of following 
+    # Read the repos of the lane one page at a time, only when the repos read so far run out
+    # In incremental runs check the repos read for changes, IncrementalRun_ReposPerChangeQuery repos at a time
+    # Only changed repos are queried for stats, stats carried forward for unchanged repos are uploaded right away
+    # Size each batch of repos from the cost model learned in previous runs
+    # Eg: If repos take 0.05 seconds each to query and target time is 6 seconds
+    # Then next batch will have around 110 repos, capped by MaxNumberOfReposToQueryPerCall
+    # Create the graphql query for the batch, execute it and collect results
+    # Update the cost model with the observed cost and time so next batches adapt
+    # Before each query acquire capacity from the rate governor of the credential, it tells how long to wait
+    # for the github primary and secondary rate limits, if it has to wait the credential with most headroom is used instead
+    # Wait using a durable timer and report the rate limit observed in each response back to the rate governor
+    # Github returns partial data when only some repos in a query fail, keep the repos that succeeded
+    # Drop repos that can't be found (deleted or renamed), retry other failed repos until their retry budget is spent
+    # If a query fails as a whole halve it, so the bad repos get isolated and timeouts go away with smaller queries
+    # Back off using a durable timer before going forward in case of failure, doubling on each consecutive failure
+    # Queries that time out are halved without waiting as smaller queries are the fix for timeouts
+    # Hand each fetched batch to a ProcessStatsBatch sub orchestration which parses and uploads it
+    # and updates the change index of its repos with their fingerprints
+    # Up to MaxBatchesInFlightPerLane batches are processed at a time, the lane waits for one to finish before starting another
+    # So Cosmos DB writes overlap with github queries instead of starting after the last github query
+    # Add the summary of each processed batch to the totals of the lane, the batch saved everything else
+    # Repos given up on are saved as failed at the end of each generation and added to the totals
+    # After MaxBatchesPerLaneHistory batches and change checks wait for the batches in flight and continue as new with the lane state
+    # Events of earlier generations are dropped from the history, so each replay only goes over the current generation
+
+    # In fused mode the query activity parses its result, saving a parse activity per batch
+    # and keeping the raw github result out of the orchestration history
+
+    fuseFetchAndParse = os.environ.get("FuseFetchAndParse", "true").lower() == "true"
+
+    if "laneState" in laneInput:
+        laneState = laneInput["laneState"]
+    else:
+        laneState = newLaneState(laneInput)
+
+    batchPipeline = newBatchPipeline(laneState["runSummary"])
+
+    credentialId = laneState["credentialId"]
+    queryCostModel = laneState["queryCostModel"]
+    laneProfile = laneState["profile"]
+    droppedRepos = []
+    nextPage = laneState["nextPage"]
+    reposToCheck = laneState["reposToCheck"]
+    reposLeftToQuery = laneState["reposLeftToQuery"]
+    batchesToRetry = laneState["batchesToRetry"]
+    retryCounts = laneState["retryCounts"]
+    rateLimit = laneState["rateLimit"]
+    consecutiveFailures = laneState["consecutiveFailures"]
+    fingerprints = laneState["fingerprints"]
+
+    # In incremental runs repos read are checked for changes before they are queried, else they are queried as they are
+
+    incrementalRun = isIncrementalRunEnabled()
+    reposPerChangeQuery = int(os.environ.get("IncrementalRun_ReposPerChangeQuery", 100))
+
+    maxBatchesPerHistory = int(os.environ.get("MaxBatchesPerLaneHistory", 50))
+    batchesInHistory = 0
+    
+    while len(batchesToRetry) > 0 or len(reposLeftToQuery) > 0 or len(reposToCheck) > 0 or nextPage < laneInput["pageCount"]:
+
+        if maxBatchesPerHistory > 0 and batchesInHistory >= maxBatchesPerHistory:
+            break
+
+        # Retries go first so a halved batch is processed before the next new batch
+        # Then query a full batch if there is one, else check or read more repos to fill it
+        # The size nextBatchSize would give with one more repo left tells whether the repos left make a full batch
+
+        reposLeftToFill = len(reposToCheck) > 0 or nextPage < laneInput["pageCount"]
+        fullBatch = len(reposLeftToQuery) > 0 and nextBatchSize(queryCostModel, rateLimit, len(reposLeftToQuery) + 1) <= len(reposLeftToQuery)
+
+        if len(batchesToRetry) == 0 and not fullBatch and reposLeftToFill:
+
+            # Reading a page doesn't count as a batch, the repos read are only added to history once
+            # and are used up by the checks and batches that count
+
+            if len(reposToCheck) == 0:
+                reposPage = yield context.call_activity("GetLaneRepos", {
+                    "currentRunId": laneInput["currentRunId"],
+                    "laneIndex": laneInput["laneIndex"],
+                    "page": nextPage
+                })
+
+                nextPage += 1
+
+                if incrementalRun:
+                    reposToCheck = reposPage
+                else:
+                    reposLeftToQuery = reposLeftToQuery + reposPage
+
+                continue
+
+            # Each change check counts as a batch, along with the batch of unchanged stats it uploads
+
+            batchesInHistory += 1
+
+            changeCheck = yield from getChangedRepos(context, laneInput["currentRunId"], reposToCheck[:reposPerChangeQuery], credentialId, credentialIds)
+            reposToCheck = reposToCheck[reposPerChangeQuery:]
+
+            credentialId = changeCheck["credentialId"]
+            reposLeftToQuery = reposLeftToQuery + changeCheck["changedRepos"]
+            fingerprints.update(changeCheck["fingerprints"])
+
+            # Stats carried forward for unchanged repos only need to be uploaded
+
+            if changeCheck["unchangedStats"]:
+                yield from processBatch(context, batchPipeline, {
+                    "currentRunId": laneInput["currentRunId"],
+                    "stats": changeCheck["unchangedStats"]
+                })
+
+            continue
+
+        batchesInHistory += 1
+
+        if len(batchesToRetry) > 0:
+            reposSubset = batchesToRetry.pop(0)
+
+        else:
+            batchSize = nextBatchSize(queryCostModel, rateLimit, len(reposLeftToQuery))
+            reposSubset = reposLeftToQuery[:batchSize]
+            reposLeftToQuery = reposLeftToQuery[batchSize:]
+
+        owners = sorted(set(repo.split('/')[0] for repo in reposSubset))
+        estimatedCost = max(round(queryCostModel["pointsPerRepo"] * len(reposSubset)), 1)
+
+        query = yield context.call_activity("CreateGraphqlQuery", reposSubset)
+
+        credentialId = yield from waitForGithubCapacity(context, credentialId, credentialIds, owners, "graphql", estimatedCost)
+
+        graphqlQueryToExecute = {
+            "query": query["query"],
+            "variables": query["variables"],
+            "credentialId": credentialId,
+            "offloadResult": True
+        }
+
+        if fuseFetchAndParse:
+            graphqlQueryToExecute["parseForRunId"] = laneInput["currentRunId"]
+
+        queryResult = yield context.call_activity("ExecuteGraphqlQuery", graphqlQueryToExecute)
+
+        reportGithubRateLimit(context, credentialId, "graphql", queryResult["rateLimit"], queryResult["retryAfterSeconds"])
+        addGithubQuery(laneProfile, len(reposSubset), queryResult)
+
+        if queryResult["rateLimit"]:
+            rateLimit = queryResult["rateLimit"]
+
+        # Only timeouts tell about the cost of the repos, rate limited queries say nothing
+
+        if not queryResult["executionFailed"] or queryResult["timedOut"]:
+            queryCostModel = updateQueryCostModel(queryCostModel, 
+                                                  len(reposSubset), 
+                                                  queryResult["rateLimit"].get("cost", 0), 
+                                                  queryResult["elapsedSeconds"], 
+                                                  queryResult["executionFailed"])
+
+        if not queryResult["executionFailed"]:
+            batchInput = {
+                "currentRunId": laneInput["currentRunId"],
+                "fingerprints": {repo: fingerprints[repo] for repo in reposSubset if repo in fingerprints}
+            }
+
+            if fuseFetchAndParse:
+                batchInput["stats"] = queryResult["parsedStats"]
+            else:
+                batchInput["githubStatsData"] = queryResult["githubStatsData"]
+
+            yield from processBatch(context, batchPipeline, batchInput)
+
+        retryPlan = planRetry(reposSubset, queryResult, retryCounts)
+        batchesToRetry = retryPlan["batchesToRetry"] + batchesToRetry
+        droppedRepos.extend(retryPlan["droppedRepos"])
+
+        # Fingerprints and retry counts are only kept for the repos still to be queried
+
+        reposToRetry = set(repo for batchToRetry in retryPlan["batchesToRetry"] for repo in batchToRetry)
+
+        for repo in reposSubset:
+            if repo not in reposToRetry:
+                fingerprints.pop(repo, None)
+                retryCounts.pop(repo, None)
+
+        if len(retryPlan["droppedRepos"]) > 0 and not context.is_replaying:
+            logging.error("Error- Unable to get stats, dropping repos " + str(retryPlan["droppedRepos"]))
+
+        if queryResult["executionFailed"] :
+            consecutiveFailures += 1
+
+            if not (queryResult["timedOut"] and len(reposSubset) > 1):
+                backoffSeconds = max(retryBackoffSeconds(consecutiveFailures), queryResult["retryAfterSeconds"])
+
+                if not context.is_replaying:
+                    logging.error("Error- Graphql query execution failed, retrying the repos after " + str(backoffSeconds) + " seconds")
+
+                yield context.create_timer(context.current_utc_datetime + timedelta(seconds= backoffSeconds))
+                 
+        else:
+            consecutiveFailures = 0
+
+    # Wait for the batches still being processed, results of sub orchestrations still running would be lost when continuing as new
+
+    if len(batchPipeline["inFlight"]) > 0:
+        batchSummaries = yield context.task_all(batchPipeline["inFlight"])
+
+        for batchSummary in batchSummaries:
+            mergeRunSummary(batchPipeline["runSummary"], batchSummary)
+
+    # Save the repos given up on in this generation as failed, only their count and a sample are carried on
+
+    if len(droppedRepos) > 0:
+        droppedSummary = yield context.call_activity("SaveDroppedRepos", {
+            "currentRunId": laneInput["currentRunId"],
+            "droppedRepos": droppedRepos
+        })
+
+        mergeRunSummary(batchPipeline["runSummary"], droppedSummary)
+
+    laneState.update({
+        "credentialId": credentialId,
+        "queryCostModel": queryCostModel,
+        "profile": laneProfile,
+        "nextPage": nextPage,
+        "reposToCheck": reposToCheck,
+        "reposLeftToQuery": reposLeftToQuery,
+        "batchesToRetry": batchesToRetry,
+        "retryCounts": retryCounts,
+        "rateLimit": rateLimit,
+        "consecutiveFailures": consecutiveFailures,
+        "fingerprints": fingerprints,
+        "droppedCount": laneState["droppedCount"] + len(droppedRepos),
+        "runSummary": batchPipeline["runSummary"]
+    })
+
+    if len(batchesToRetry) > 0 or len(reposLeftToQuery) > 0 or len(reposToCheck) > 0 or nextPage < laneInput["pageCount"]:
+        context.continue_as_new({
+            "currentRunId": laneInput["currentRunId"],
+            "laneIndex": laneInput["laneIndex"],
+            "pageCount": laneInput["pageCount"],
+            "credentialIds": credentialIds,
+            "laneState": laneState
+        })
+
+        return
+
+    return {
+        "runSummary": laneState["runSummary"],
+        "droppedCount": laneState["droppedCount"],
+        "queryCostModel": queryCostModel,
+        "profile": laneProfile
+    }
+
+
+def newLaneState(laneInput: dict) -> dict:
+    """
+    Takes in the input of a lane
+    Returns the state of the lane before its first page is read, carried from one generation of the lane to the next
+
+        Returns
+            Dict containing the next page to read, repos read that are left to check for changes, repos left to query,
+            batches to retry, retry counts, last rate limit and failure count,
+            the credential and cost model in use, fingerprints of the changed repos left to query, 
+            the profile of its github queries, number of repos given up on and the summary of the batches processed so far
+    """
+
+    return {
+        "credentialId": laneInput["credentialId"],
+        "queryCostModel": laneInput["queryCostModel"],
+        "profile": newRunProfile(),
+        "nextPage": 0,
+        "reposToCheck": [],
+        "reposLeftToQuery": [],
+        "batchesToRetry": [],
+        "retryCounts": {},
+        "rateLimit": {},
+        "consecutiveFailures": 0,
+        "fingerprints": {},
+        "droppedCount": 0,
+        "runSummary": newRunSummary()
+    }
+
+
+def newBatchPipeline(runSummary: dict) -> dict:
+    """
+    Takes in the summary of the batches the lane processed so far
+    Returns the state of the batches a lane hands to ProcessStatsBatch sub orchestrations
+
+        Returns
+            Dict containing the sub orchestration tasks in flight, the summary finished ones are added to and the number of batches allowed in flight
+    """
+
+    # Provisioned Cosmos DB throughput is shared by all lanes, so by default a lane uploads one batch at a time in provisioned mode
+
+    isCosmoDbInServerlessMode = os.environ["CosmosDB_ServerlessMode"].lower() == "true"
+
+    return {
+        "inFlight": [],
+        "runSummary": runSummary,
+        "maxInFlight": max(int(os.environ.get("MaxBatchesInFlightPerLane", 4 if isCosmoDbInServerlessMode else 1)), 1)
+    }
+
+
+def processBatch(context: df.DurableOrchestrationContext, batchPipeline: dict, batchInput: dict):
+    """
+    Starts a ProcessStatsBatch sub orchestration for the batch without waiting for it to finish
+    If the pipeline is full, waits for one of the batches in flight to finish first
+    Use with 'yield from' inside the orchestrator function
+
+        Parameters
+            context (DurableOrchestrationContext) - Orchestration context
+            batchPipeline (Dict) - State of the batches of the lane, updated in place
+            batchInput (Dict) - Input of the ProcessStatsBatch sub orchestration
+    """
+
+    if len(batchPipeline["inFlight"]) >= batchPipeline["maxInFlight"]:
+        finishedTask = yield context.task_any(batchPipeline["inFlight"])
+
+        batchPipeline["inFlight"].remove(finishedTask)
+        mergeRunSummary(batchPipeline["runSummary"], finishedTask.result)
+
+    batchPipeline["inFlight"].append(context.call_sub_orchestrator("ProcessStatsBatch", batchInput))
+
+
+def getChangedRepos(context: df.DurableOrchestrationContext, currentRunId: int, repos: list, credentialId: str, credentialIds: list):
+    """
+    Checks a page of repos of the lane for changes, acquiring capacity from the rate governor for it
+    Use with 'yield from' inside the orchestrator function
+
+        Parameters
+            context (DurableOrchestrationContext) - Orchestration context
+            currentRunId (int) - Current run id
+            repos (List) - Page of repos to check, 'IncrementalRun_ReposPerChangeQuery' repos
+            credentialId (str) - Github credential id preferred for the call
+            credentialIds (List) - Ids of all github credentials in the pool
+
+        Returns
+            Dict containing the credential used, changed repos, their fingerprints and batch of stats of unchanged repos for current run
+    """
+
+    owners = sorted(set(repo.split('/')[0] for repo in repos))
+
+    credentialId = yield from waitForGithubCapacity(context, credentialId, credentialIds, owners, "graphql", 1)
+
+    changeStatus = yield context.call_activity("GetChangedRepos", {
+        "repos": repos,
+        "credentialId": credentialId,
+        "currentRunId": currentRunId
+    })
+
+    reportGithubRateLimit(context, credentialId, "graphql", changeStatus["rateLimit"], changeStatus["retryAfterSeconds"])
+
+    # If the change check fails query stats for the whole page
+
+    if changeStatus["executionFailed"]:
+        return {
+            "credentialId": credentialId,
+            "changedRepos": list(repos),
+            "fingerprints": {},
+            "unchangedStats": None
+        }
+
+    return {
+        "credentialId": credentialId,
+        "changedRepos": changeStatus["changedRepos"],
+        "fingerprints": changeStatus["fingerprints"],
+        "unchangedStats": changeStatus["unchangedStats"]
+    }
+
+
+main = df.Orchestrator.create(orchestrator_function)
@@ -0,0 +1,127 @@
+import logging
+import os
+
+from typing import Dict
+from Helpers.SendEmails import sendEmail
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.RepoChangeIndex import createChangeQuery, repoFingerprint, repoIndexId, repoIndexPartition, isIndexEntryFresh
+from Helpers.PayloadStore import storePayload
+from Helpers.RepoStatsBatch import createRepoStatsBatch
+from ExecuteGraphqlQuery import executeGraphqlQuery
+
+
+def main(changeQuery: Dict) -> Dict:
+    """
+    Takes in a page of repos, the github credential to use and current run id
+    Returns repos that changed since their stats were last fetched and carries forward the stats of the other repos
+
+        Parameters
+            changeQuery (Dict) - Dict containing repos to check, id of the github credential from the pool and current run id
+            
+        Returns
+            Dict containing changed repos along with their fingerprints, batch of stats of unchanged repos for current run
+            or a reference to it in the payload store (None if all repos changed),
+            the execution status and github rate limit info
+    """
+
+    try:
+        repos = changeQuery["repos"]
+        currentRunId = changeQuery["currentRunId"]
+
+        # Get the fields that tell whether a repo changed, this costs a fraction of getting the stats
+
+        changeGraphqlQuery = createChangeQuery(repos)
+
+        queryResult = executeGraphqlQuery({
+            "query": changeGraphqlQuery["query"],
+            "variables": changeGraphqlQuery["variables"],
+            "credentialId": changeQuery["credentialId"],
+            "operation": "changes"
+        })
+
+        changeStatus = {
+            "changedRepos": [],
+            "fingerprints": {},
+            "unchangedStats": None,
+            "executionFailed": queryResult["executionFailed"],
+            "timedOut": queryResult["timedOut"],
+            "rateLimit": queryResult["rateLimit"],
+            "retryAfterSeconds": queryResult["retryAfterSeconds"]
+        }
+
+        if queryResult["executionFailed"]:
+            return changeStatus
+
+        # Fingerprint of each repo, repos that failed in the query are treated as changed 
+        # so the stats query decides what to do with them
+
+        queryData = queryResult["githubStatsData"]["data"]
+        fingerprints = {}
+
+        for index, repo in enumerate(repos):
+            repoChanges = queryData.get('r' + str(index))
+
+            if repoChanges is not None:
+                fingerprints[repo] = repoFingerprint(repoChanges)
+
+        # Read the change index of the repos from run info container
+
+        endpoint = os.environ["CosmosDB_Endpoint"]
+        key = os.environ["CosmosDB_PrimaryKey"]
+        databaseName = os.environ["CosmosDB_DBName"]
+        containerName = os.environ["CosmosDB_RunInfoContainerName"]
+        container  = cosmosDbContainer(endpoint, key, databaseName, containerName)
+
+        # Index is partitioned by owner, a page usually holds repos of one owner so it is read with one query
+
+        reposByPartition = {}
+
+        for repo in repos:
+            reposByPartition.setdefault(repoIndexPartition(repo), []).append(repo)
+
+        indexEntriesByRepo = {}
+
+        for partition, partitionRepos in reposByPartition.items():
+            indexEntries = container.query_items(
+                query= "SELECT * FROM c WHERE ARRAY_CONTAINS(@ids, c.id)",
+                parameters= [{"name": "@ids", "value": [repoIndexId(repo) for repo in partitionRepos]}],
+                partition_key= partition)
+
+            indexEntriesByRepo.update((indexEntry["repo"], indexEntry) for indexEntry in indexEntries)
+
+        # Carry forward the stats of unchanged repos with id for current run 
+        # so downstream processes can do point reads with current run id
+
+        unchangedStats = []
+
+        for repo in repos:
+            indexEntry = indexEntriesByRepo.get(repo)
+
+            if repo in fingerprints and indexEntry is not None and isIndexEntryFresh(indexEntry, fingerprints[repo], currentRunId):
+                stats = dict(indexEntry["stats"])
+                stats["id"] = repo.replace('/', '.') + "." + str(currentRunId)
+                stats["carriedForwardFromRunId"] = indexEntry["runId"]
+
+                unchangedStats.append(stats)
+
+            else:
+                changeStatus["changedRepos"].append(repo)
+
+                if repo in fingerprints:
+                    changeStatus["fingerprints"][repo] = fingerprints[repo]
+
+        # Carried forward stats go straight to upload as one batch, offload it to the payload store if it is large
+
+        if len(unchangedStats) > 0:
+            changeStatus["unchangedStats"] = storePayload(createRepoStatsBatch(currentRunId, unchangedStats))
+
+        return changeStatus
+
+    except:
+        # Log error and send email in case of exception
+
+        logging.error("Error- Unable to get changed repos for")
+        logging.error(changeQuery["repos"])
+
+        sendEmail("Error- Unable to get changed repos for" + str(changeQuery["repos"]))
+        raise
@@ -0,0 +1,37 @@
+import logging
+import os
+
+from typing import Dict, List
+from Helpers.SendEmails import sendEmail
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.RunInfoStore import readLaneRepos
+
+
+def main(lanePage: Dict) -> List:
+    """
+    Takes in current run id, index of a query lane and index of a page of its repos
+    Returns the repos in the page, as written by AssignQueryLanes
+
+        Parameters
+            lanePage (Dict) - Dict containing current run id, lane index and page index
+
+        Returns
+            List of repos with owner
+    """
+
+    try:
+        endpoint = os.environ["CosmosDB_Endpoint"]
+        key = os.environ["CosmosDB_PrimaryKey"]
+        databaseName = os.environ["CosmosDB_DBName"]
+        containerName = os.environ["CosmosDB_RunInfoContainerName"]
+        container  = cosmosDbContainer(endpoint, key, databaseName, containerName)
+
+        return readLaneRepos(container, lanePage["currentRunId"], lanePage["laneIndex"], lanePage["page"])
+
+    except:
+        # Log error and send email in case of exception
+
+        logging.error("Error- Unable to get repos of lane " + str(lanePage["laneIndex"]) + " page " + str(lanePage["page"]))
+
+        sendEmail("Error- Unable to get repos of lane " + str(lanePage["laneIndex"]) + " page " + str(lanePage["page"]))
+        raise
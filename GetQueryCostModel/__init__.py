@@ -0,0 +1,42 @@
+import logging
+import os
+
+from typing import Dict
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+from Helpers.SendEmails import sendEmail
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.QueryCostModel import defaultQueryCostModel
+
+
+def main(name: str) -> Dict:
+    """
+    Returns the graphql query cost model learned from previous runs, 
+    or a default model if no run has saved one yet
+
+        Returns
+            Dict containing the per repo cost estimates for a graphql query
+    """
+
+    try:
+        endpoint = os.environ["CosmosDB_Endpoint"]
+        key = os.environ["CosmosDB_PrimaryKey"]
+        databaseName = os.environ["CosmosDB_DBName"]
+        containerName = os.environ["CosmosDB_RunInfoContainerName"]
+        container  = cosmosDbContainer(endpoint, key, databaseName, containerName)
+
+        # Cost model is kept as a single document in run info container
+
+        costModelDocument = container.read_item(item= "queryCostModel", partition_key= "queryCostModel")
+
+        return costModelDocument["costModel"]
+
+    except CosmosResourceNotFoundError:
+        return defaultQueryCostModel()
+
+    except:
+        # Log error and fall back to default model, a missing model should not stop the run
+
+        logging.error("Error- Unable to read graphql query cost model, using default model")
+
+        sendEmail("Error- Unable to read graphql query cost model, using default model")
+        return defaultQueryCostModel()
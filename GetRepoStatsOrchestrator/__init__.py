@@ -1,12 +1,15 @@
 import logging
-import math
 import os
-import time
-import functools
-import operator
 import azure.durable_functions as df
 
+from datetime import timedelta
 from github import *
+from Helpers.QueryCostModel import mergeQueryCostModels
+from Helpers.RateGovernor import waitForGithubCapacity, reportGithubRateLimit, retryBackoffSeconds
+from Helpers.GithubCredentials import githubCredentialIds
+from Helpers.RunProfile import mergeRunProfiles, addStageDuration
+from Helpers.SnapshotStore import snapshotStoreType
+from Helpers.PayloadStore import payloadStoreType
 
 def orchestrator_function(context: df.DurableOrchestrationContext):
     """
@@ -15,14 +18,21 @@ def orchestrator_function(context: df.DurableOrchestrationContext):
     Execution Order:
     1. Create run id and send an email notificataion stating the run has started
     2. Read data from sources.json in Data folder
-    3. Get repos for each org in sources.json file and remove the repos mentioned in excluded variable
+    3. Get repos for each org in sources.json file using graphql pagination, remove the repos mentioned in excluded variable
+       and save them to run info container
     4. Append individual repos to the repos obtained for each org and make a final list of repos to obtain stats
-    5. Create batches of graphql queries based on 'NumberOfReposToQueryPerCall' setting in config
-    6. Execute each batch of graphql queries and collect results
-    7. Parse the collected results and make them ready to upload into cosmosdb
-    8. Create items cosmosdb based on provisioned throughput capacity and collect the creation status
+    5. Group the repos by owner and split the owners into parallel lanes, keeping repos of an owner in same lane
+       and save the repos of each lane in pages, each lane reads its own pages
+    6. Query each lane in parallel in batches sized from the cost and time observed for previous queries, learning the per repo cost for next runs
+       In incremental runs only repos that changed since their last run are queried, stats of other repos are carried forward
+    7. Parse each batch and create items in cosmosdb as soon as the batch is fetched, while the lane goes on to query the next batch
+    8. Each batch saves its repos to run detail documents, the change index in incremental runs and its part of the snapshot as soon as it is uploaded
+       Collect the summary of each lane and join the snapshot parts into the columnar snapshot of the run
     9. Parse the collected cosmos db creation statuse and form email report
-    10. Send email report about run completion status along with number of repos processed and failure list of repos if any
+    10. Save the run status and the run profile, telling how long each stage took and the github and cosmos db totals, to run info container
+    11. Compute star growth, issue and pull request velocity and top movers over the last runs from the run snapshots
+        and delete the payloads offloaded by earlier runs from the payload store
+    12. Send email report about run completion status along with number of repos processed and failure list of repos if any
     """
     
     
@@ -35,151 +45,157 @@ def orchestrator_function(context: df.DurableOrchestrationContext):
     
     if currentRunId > 0:
         
+        # Stage durations use the orchestration time, which is the same on every replay
+        
+        stageStartedAt = context.current_utc_datetime
+
         # Parse and get data from sources.json in Data folder
         
         sourceData = yield context.call_activity("GetReposFromSource", "sources.json")
 
         #-----------------------------------------------------------------
 
-        # Get list of repos to get stats for each org
+        # All github calls use a credential from the pool and acquire capacity from the rate governor entity of the credential
         
-        OrgsToGetAllRepoStats = sourceData["fullOrgs"]
-        getReposForOrgTasks =[]
+        credentialIds = githubCredentialIds()
+
+        #-----------------------------------------------------------------
+
+        # Get list of repos to get stats for each org using graphql, 100 repos of an org per request
+        # Several orgs are aliased in one request and pages are collected round by round
+        # Each call saves the repos it found to run info container, only their number comes back to this orchestration
 
-        for orgDetails in OrgsToGetAllRepoStats:
-            getReposForOrgTasks.append(context.call_activity("GetReposForOrg", orgDetails))
+        orgDiscovery = yield from discoverOrgRepos(context, currentRunId, sourceData["fullOrgs"], credentialIds)
 
-        getReposForOrgTasksResult = yield context.task_all(getReposForOrgTasks)
+        discoveryFinishedAt = context.current_utc_datetime
 
         #-----------------------------------------------------------------
-        
-        # Append individual repos to the list of repos fo each org to form a final list of repos to get stats 
+
+        # Group the repos found for orgs and the individual repos by owner and split the owners into lanes, up to MaxParallelQueryLanes lanes
+        # All repos of an owner are kept in same lane as github doesn't allow parallel requests against a same owner
+        # Owners with most repos are assigned first, each to the lane with least repos, so lanes take about the same time
+        # Eg: With orgs of 6000, 2000, 1500 and 500 repos and 2 lanes, lanes get 6000 and 4000 repos
+        # With hash sharding owners are assigned to lanes by a hash of their name instead, so an owner keeps its lane from run to run
+        # Repos of each lane are saved in pages to run info container, this orchestration only gets the number of pages of each lane
+        # Lanes run in parallel as sub orchestrations, each lane reads its pages itself and queries its repos one batch after other
+        # Each lane parses and uploads its batches to cosmosdb as they are fetched, in sub orchestrations of their own
+        # Credentials in the pool are spread across lanes, a lane switches credential when its credential has to wait
+        # Each lane learns the query cost on its own, merge them to save for next runs
+        # Lanes continue as new every MaxBatchesPerLaneHistory batches, this orchestration only gets the summary of each lane
 
         individualRepos = []
 
         if "individualRepos" in sourceData:
             individualRepos = sourceData["individualRepos"]
 
-        fullReposList = {
-            "reposForOrgs" : getReposForOrgTasksResult,
-            "individualRepos" : individualRepos
-        }
+        queryCostModel = yield context.call_activity("GetQueryCostModel")
 
-        allReposToGetStats = yield context.call_activity("AppendIndividualRepos", fullReposList)
+        maxParallelQueryLanes = int(os.environ.get("MaxParallelQueryLanes", len(credentialIds)))
 
-        #-----------------------------------------------------------------
+        queryLanes = yield context.call_activity("AssignQueryLanes", {
+            "currentRunId": currentRunId,
+            "individualRepos": individualRepos,
+            "numberOfLanes": maxParallelQueryLanes,
+            "sharding": os.environ.get("QueryLanes_Sharding", "balanced").lower()
+        })
 
-        # Create batches of graphql queries from the list of repos to get stats based on NumberOfReposToQueryPerCall setting
-        # Eg: If NumberOfReposToQueryPerCall = 50 and we have a list of 500 repos to get stats 
-        # Then we create 500/50 = 10 batches of queries
-        
-        createGraphqlQueryTasks =[]
+        executeGraphqlQueryLaneTasks = []
 
-        numberOfReposToQueryPerCall = int(os.environ["NumberOfReposToQueryPerCall"])
-        numberOfQueryTasksToCreate =  math.ceil(len(allReposToGetStats)/numberOfReposToQueryPerCall)
+        for laneIndex, queryLane in enumerate(queryLanes):
+            executeGraphqlQueryLaneTasks.append(context.call_sub_orchestrator("ExecuteGraphqlQueryLane", {
+                "currentRunId": currentRunId,
+                "laneIndex": laneIndex,
+                "pageCount": queryLane["pageCount"],
+                "credentialId": credentialIds[laneIndex % len(credentialIds)],
+                "credentialIds": credentialIds,
+                "queryCostModel": queryCostModel
+            }))
 
-        for i in range(numberOfQueryTasksToCreate):
-            reposSubset = allReposToGetStats[i*numberOfReposToQueryPerCall : i*numberOfReposToQueryPerCall + numberOfReposToQueryPerCall]
-            createGraphqlQueryTasks.append(context.call_activity("CreateGraphqlQuery", reposSubset))
+        executeGraphqlQueryLaneTasksResult = yield context.task_all(executeGraphqlQueryLaneTasks)
 
+        lanesFinishedAt = context.current_utc_datetime
 
-        createGraphqlQueryTasksResult = yield context.task_all(createGraphqlQueryTasks)       
+        # Lanes profile their github queries, add how long discovery and the lanes took
 
-        #-----------------------------------------------------------------
+        runProfile = mergeRunProfiles([laneResult["profile"] for laneResult in executeGraphqlQueryLaneTasksResult])
+        addStageDuration(runProfile, "discovery", stageStartedAt, discoveryFinishedAt)
+        addStageDuration(runProfile, "queryAndUpload", discoveryFinishedAt, lanesFinishedAt)
 
-        # Notes: 
-        # Github api doesn't allow to send requests parallely against a same org or owner
-        # So process one by one and collect those results
-        # Don't send a list of all repos to activity function and process
-        # Activity function will time out if processing take more than 10 minutes in consumption plans
-        # Common github api error is 502 Bad gateway timeout, It can occur itermittently at any point
-        # The only fix is to wait sometime and send requests again (30 seconds is enough)
-        
-        # Below code takes care of following 
-        # Execute the batches of queries created and collect results
-        # If a query execution fails add it back to the list to re process
-        # Wait 60 seconds before going forward in case of failure
-        
-        
-        executeGraphqlQueryTasksResult = []
-            
-        for query in createGraphqlQueryTasksResult:
-                
-            queryResult = yield context.call_activity("ExecuteGraphqlQuery", query)
-                
-            if queryResult["executionFailed"] :
-                logging.error("Error- Graphql query execution failed, Appending the query and sleeping 60 seconds")
-                createGraphqlQueryTasksResult.append(query)
-                time.sleep(60)
-                     
-            else:
-                executeGraphqlQueryTasksResult.append(queryResult["githubStatsData"])
+        # Each lane returns the summary of its batches, the batches saved their repos, change index and snapshot parts
 
-        #-----------------------------------------------------------------
+        uploadResults = [[laneResult["runSummary"]] for laneResult in executeGraphqlQueryLaneTasksResult]
 
-        # Parse the results obtained from executing the graphql queries and create documents for cosmosdb
-        
-        parseGraphqlQueryTasks =[]
+        if len(executeGraphqlQueryLaneTasksResult) > 0:
+            queryCostModel = mergeQueryCostModels([laneResult["queryCostModel"] for laneResult in executeGraphqlQueryLaneTasksResult])
+
+        yield context.call_activity("SaveQueryCostModel", queryCostModel)
 
-        for result in executeGraphqlQueryTasksResult:
+        #-----------------------------------------------------------------
 
-            gqlResult = {
-                "currentRunId" : currentRunId,
-                "result" : result
-            }
+        # Join the snapshot parts saved by the batches into one columnar snapshot of the run for trend queries over many runs
 
-            parseGraphqlQueryTasks.append(context.call_activity("ParseGraphqlQueryResult", gqlResult))
+        if snapshotStoreType() != "none":
+            yield context.call_activity("SaveRunSnapshot", {
+                "currentRunId": currentRunId
+            })
 
-        parseGraphqlQueryTasksResult = yield context.task_all(parseGraphqlQueryTasks)
+            addStageDuration(runProfile, "snapshot", lanesFinishedAt, context.current_utc_datetime)
 
         #-----------------------------------------------------------------
-        
-        # Create itema is cosmos db based on plan and provisoned throughput
-        # If using serverless mode process all data in parallel
-        # If using provisioned mode process data one by one not exceeding the available throughput
-        # Collect the item creation statuses and form report to send notifications
-        
-        isCosmoDbInServerlessMode = os.environ["CosmosDB_ServerlessMode"].lower()
 
-        uploadToCosmosDBTasksResult = []
+        # Orgs dropped during discovery are saved and reported as failed along with the item creation statuses
 
-        if isCosmoDbInServerlessMode == "true":
-            
-            # Process in parallel
-            
-            uploadToCosmosDBTasks =[]
+        if len(orgDiscovery["droppedOrgs"]) > 0:
+            droppedSummary = yield context.call_activity("SaveDroppedRepos", {
+                "currentRunId": currentRunId,
+                "droppedRepos": orgDiscovery["droppedOrgs"]
+            })
 
-            for result in parseGraphqlQueryTasksResult:
-                uploadToCosmosDBTasks.append(context.call_activity("UploadQueryResultsToCosmosDB", result))
+            uploadResults.append([droppedSummary])
 
-            uploadToCosmosDBTasksResult = yield context.task_all(uploadToCosmosDBTasks)
-            
-        else:
-
-            #Throttle cosmosdb requests as per provsioned RU
-            
-            for result in parseGraphqlQueryTasksResult:
-                uploadToCosmosDBResult = yield context.call_activity("UploadQueryResultsToCosmosDB", result)
-                uploadToCosmosDBTasksResult.append(functools.reduce(operator.iconcat, uploadToCosmosDBResult, []))
-                
-        #-----------------------------------------------------------------
-        
         # Parse the item creation statuses and form report to send notifications
 
-        runCompletionStatus = yield context.call_activity("ParseCosmosDBResults", uploadToCosmosDBTasksResult)
+        runCompletionStatus = yield context.call_activity("ParseCosmosDBResults", {
+            "currentRunId": currentRunId,
+            "uploadResults": uploadResults,
+            "profile": runProfile
+        })
         
         #-----------------------------------------------------------------
         
-        # Add run id to the status dict to update the run info container
+        # Status carries the run id, it can be a reference to the payload store for large runs
         
         runStatus = runCompletionStatus["status"]
-        runStatus["id"] = currentRunId
 
         # Update run info container
         
         yield context.call_activity("UpdateRunInfoWithStatus", runStatus)
         
         #-----------------------------------------------------------------
+
+        # Compute trends over the last runs from their snapshots, trends are not part of the run
+        # so the run is reported as completed even if they fail
+
+        if snapshotStoreType() != "none" and os.environ.get("Trends_Enabled", "false").lower() == "true":
+            try:
+                yield context.call_activity("ComputeRunTrends", currentRunId)
+
+            except Exception:
+                if not context.is_replaying:
+                    logging.error("Error- Unable to compute trends for run " + str(currentRunId))
+
+        # Payloads are kept until later runs delete them, as replays of this run read them again
+        # Failing to delete them doesn't fail the run either
+
+        if payloadStoreType() != "none":
+            try:
+                yield context.call_activity("DeleteExpiredPayloads")
+
+            except Exception:
+                if not context.is_replaying:
+                    logging.error("Error- Unable to delete expired payloads")
+
+        #-----------------------------------------------------------------
         
         publishToEventGrid = os.environ["PublishToEventGrid"]
         
@@ -217,4 +233,101 @@ def orchestrator_function(context: df.DurableOrchestrationContext):
         
         return "Failed to obtain runId for current run"
     
+
+
+def discoverOrgRepos(context: df.DurableOrchestrationContext, currentRunId: int, orgs: list, credentialIds: list):
+    """
+    Gets the repos of all orgs in sources.json using graphql cursor pagination, saving them as discovered run detail documents of the run
+    Use with 'yield from' inside the orchestrator function
+
+    Orgs are split in chunks of 'Discovery_OrgsPerQuery' aliased in one query, chunks are spread across credentials
+    In each round every chunk with pages left gets its next pages in parallel, until all orgs are done
+    A chunk that fails is retried in next round after a back off, orgs are given up on after 'Github_MaxRetriesPerRepo' failures
+
+        Parameters
+            context (DurableOrchestrationContext) - Orchestration context
+            currentRunId (int) - Current run id
+            orgs (List) - Org info of each org from sources.json
+            credentialIds (List) - Ids of all github credentials in the pool
+
+        Returns
+            Dict containing number of repos found for each org and orgs that were given up on
+    """
+
+    orgsPerQuery = int(os.environ.get("Discovery_OrgsPerQuery", 5))
+    pagesPerCall = int(os.environ.get("Discovery_PagesPerCall", 10))
+    maxRetries = int(os.environ.get("Github_MaxRetriesPerRepo", 3))
+
+    repoCounts = {orgInfo["orgName"]: 0 for orgInfo in orgs}
+    droppedOrgs = []
+
+    discoveryChunks = []
+
+    for chunkStart in range(0, len(orgs), orgsPerQuery):
+        discoveryChunks.append({
+            "orgs": [dict(orgInfo, cursor= None, hasNextPage= True) for orgInfo in orgs[chunkStart : chunkStart + orgsPerQuery]],
+            "credentialId": credentialIds[(chunkStart // orgsPerQuery) % len(credentialIds)],
+            "failures": 0
+        })
+
+    activeChunks = discoveryChunks
+
+    while len(activeChunks) > 0:
+        discoveryTasks = []
+
+        for chunk in activeChunks:
+            orgNames = [orgInfo["orgName"] for orgInfo in chunk["orgs"]]
+            chunk["credentialId"] = yield from waitForGithubCapacity(context, chunk["credentialId"], credentialIds, orgNames, "graphql", pagesPerCall * len(orgNames))
+
+            discoveryTasks.append(context.call_activity("DiscoverOrgRepos", {
+                "orgs": chunk["orgs"],
+                "credentialId": chunk["credentialId"],
+                "currentRunId": currentRunId
+            }))
+
+        discoveryTasksResult = yield context.task_all(discoveryTasks)
+
+        backoffSeconds = 0
+
+        for chunk, discoveryStatus in zip(activeChunks, discoveryTasksResult):
+            reportGithubRateLimit(context, chunk["credentialId"], "graphql", discoveryStatus["rateLimit"], discoveryStatus["retryAfterSeconds"])
+
+            if discoveryStatus["executionFailed"]:
+                chunk["failures"] += 1
+                backoffSeconds = max(backoffSeconds, retryBackoffSeconds(chunk["failures"]), discoveryStatus["retryAfterSeconds"])
+
+                if chunk["failures"] > maxRetries:
+                    for orgInfo in chunk["orgs"]:
+                        orgInfo["hasNextPage"] = False
+                        droppedOrgs.append({"repo": orgInfo["orgName"], "reason": "DISCOVERY_FAILED"})
+
+                continue
+
+            chunk["failures"] = 0
+
+            for failedOrg in discoveryStatus["failedOrgs"]:
+                droppedOrgs.append({"repo": failedOrg["orgName"], "reason": failedOrg["reason"]})
+
+            # Keep the cursors to continue from and count the repos found
+
+            chunk["orgs"] = []
+
+            for orgStatus in discoveryStatus["orgs"]:
+                repoCounts[orgStatus["orgName"]] += orgStatus.pop("repoCount")
+                chunk["orgs"].append(orgStatus)
+
+        activeChunks = [chunk for chunk in discoveryChunks if any(orgInfo["hasNextPage"] for orgInfo in chunk["orgs"])]
+
+        if backoffSeconds > 0 and len(activeChunks) > 0:
+            if not context.is_replaying:
+                logging.error("Error- Getting repos for orgs failed, retrying after " + str(backoffSeconds) + " seconds")
+
+            yield context.create_timer(context.current_utc_datetime + timedelta(seconds= backoffSeconds))
+
+    return {
+        "repoCounts": [repoCounts[orgInfo["orgName"]] for orgInfo in orgs],
+        "droppedOrgs": droppedOrgs
+    }
+
+
 main = df.Orchestrator.create(orchestrator_function)
\ No newline at end of file
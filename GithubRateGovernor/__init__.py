@@ -0,0 +1,42 @@
+import logging
+import azure.durable_functions as df
+
+from Helpers.RateGovernor import newGovernorState, acquireCapacity, releaseCapacity, reportRateLimit
+
+
+def entity_function(context: df.DurableEntityContext):
+    """
+    Durable entity that governs the rate of calls to github for one github token
+    The entity key is the token id, token buckets are kept for each owner called with the token
+
+    Operations:
+    1. acquire - Reserves capacity for a github call and returns the seconds to wait before calling
+    2. release - Gives back capacity acquired for a github call that was made with another token instead
+    3. report - Updates the rate limits with the values observed in a github response
+    4. get - Returns the current state
+    """
+
+    state = context.get_state(newGovernorState)
+    operation = context.operation_name
+    operationInput = context.get_input()
+
+    if operation == "acquire":
+        result = acquireCapacity(state, operationInput)
+
+    elif operation == "release":
+        result = releaseCapacity(state, operationInput)
+
+    elif operation == "report":
+        result = reportRateLimit(state, operationInput)
+
+    elif operation == "get":
+        result = state
+
+    else:
+        logging.error("Error- Unknown github rate governor operation " + str(operation))
+        result = None
+
+    context.set_state(state)
+    context.set_result(result)
+
+main = df.Entity.create(entity_function)
@@ -0,0 +1,153 @@
+import hashlib
+import threading
+import requests
+import azure.cosmos.cosmos_client as cosmos_client
+import azure.cosmos.documents as documents
+
+from sendgrid import SendGridAPIClient
+from sgqlc.endpoint.requests import RequestsEndpoint
+from Helpers.Telemetry import recordResponseSize
+
+
+# Clients live for the life of the worker process and are shared by all activities running in it
+# Warm workers reuse the connections instead of paying TLS handshakes and Cosmos DB metadata lookups on every call
+
+registryLock = threading.Lock()
+registeredClients = {}
+
+
+def getClient(clientType: str, keyParts: tuple, createClient):
+    """
+    Takes in the type of client, the values that identify the client and a function to create it
+    Returns the client registered for these values, creating and registering it on first use
+
+        Parameters
+            clientType (str) - Type of client, Eg: cosmos
+            keyParts (tuple) - Values that identify the client, Eg: endpoint and key. Secrets are hashed before being used as key
+            createClient (function) - Function that creates the client
+
+        Returns
+            Registered client
+    """
+
+    registryKey = clientType + ":" + hashlib.sha256("|".join(str(keyPart) for keyPart in keyParts).encode('utf-8')).hexdigest()
+
+    client = registeredClients.get(registryKey)
+
+    if client is None:
+
+        # Create the client outside the lock, factories get other clients from the registry (Eg: container needs cosmos client)
+        # If two threads create the same client at once the first one registered is kept by both
+
+        newClient = createClient()
+
+        with registryLock:
+            client = registeredClients.setdefault(registryKey, newClient)
+
+    return client
+
+
+def getHttpSession() -> requests.Session:
+    """
+    Returns the keep alive http session shared by all http calls of the worker
+    """
+
+    return getClient("httpSession", (), newHttpSession)
+
+
+def newHttpSession() -> requests.Session:
+    """
+    Returns a new http session that keeps the size of each response for telemetry
+    """
+
+    session = requests.Session()
+    session.hooks["response"].append(recordResponseSize)
+
+    return session
+
+
+def getCosmosClient(endpoint: str, key: str, throttleRetries: bool = True) -> cosmos_client.CosmosClient:
+    """
+    Takes in a Cosmos DB endpoint and key
+    Returns the Cosmos DB client for the account
+
+        Parameters
+            endpoint (str) - Cosmos DB endpoint
+            key (str) - Cosmos DB key
+            throttleRetries (bool) - Whether the client retries throttled (429) requests itself, as the SDK does by default
+
+        Returns
+            Cosmos DB client
+    """
+
+    def createClient():
+        if throttleRetries:
+            return cosmos_client.CosmosClient(endpoint, key)
+
+        # Writes paced by the RU rate controller retry throttled requests themselves and slow down on each 429
+        # SDK retries would hide the 429s from the controller, 'retry_total= 0' is taken as not set by the SDK so set the retry options
+
+        connectionPolicy = documents.ConnectionPolicy()
+        connectionPolicy.RetryOptions = documents.RetryOptions(max_retry_attempt_count= 0)
+
+        return cosmos_client.CosmosClient(endpoint, key, connection_policy= connectionPolicy)
+
+    return getClient("cosmos", (endpoint, key, throttleRetries), createClient)
+
+
+def getCosmosContainer(endpoint: str, key: str, databaseName: str, containerName: str, throttleRetries: bool = True):
+    """
+    Takes in a Cosmos DB endpoint, key, database name, container name
+    Returns the container instance, container metadata is looked up once per worker
+
+        Parameters
+            endpoint (str) - Cosmos DB endpoint
+            key (str) - Cosmos DB key
+            databaseName (str) - Cosmos DB database name
+            containerName (str) - Cosmos DB container name
+            throttleRetries (bool) - Whether the client retries throttled (429) requests itself
+
+        Returns
+            Container instance
+    """
+
+    def createContainer():
+        database = getCosmosClient(endpoint, key, throttleRetries).get_database_client(databaseName)
+        return database.get_container_client(containerName)
+
+    return getClient("cosmosContainer", (endpoint, key, databaseName, containerName, throttleRetries), createContainer)
+
+
+def getGraphqlEndpoint(url: str, token: str) -> RequestsEndpoint:
+    """
+    Takes in a graphql url and github token
+    Returns the graphql endpoint for the token, sending requests over the shared keep alive session
+
+        Parameters
+            url (str) - Graphql url
+            token (str) - Github token
+
+        Returns
+            Graphql endpoint
+    """
+
+    headers = {
+        'Authorization': 'bearer ' + token,
+    }
+
+    return getClient("graphql", (url, token), lambda: RequestsEndpoint(url, headers, session= getHttpSession()))
+
+
+def getSendGridClient(apiKey: str) -> SendGridAPIClient:
+    """
+    Takes in a SendGrid api key
+    Returns the SendGrid client for the key
+
+        Parameters
+            apiKey (str) - SendGrid api key
+
+        Returns
+            SendGrid client
+    """
+
+    return getClient("sendgrid", (apiKey,), lambda: SendGridAPIClient(apiKey))
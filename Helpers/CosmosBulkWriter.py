@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+
+from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from Helpers.CosmosRateController import pacedCosmosOperation
+
+
+def bulkUpsertItems(container, items: List, concurrency: int = None, rateController: Dict = None) -> List:
+    """
+    Takes in a Cosmos DB container and list of items to write
+    Upserts the items with a bounded number of writes in flight
+    Returns status of each item in the order of the items
+    Throttled writes are retried here, take the container with 'throttleRetries= False' so the rate controller sees every 429
+
+        Parameters
+            container (ContainerProxy) - Cosmos DB container instance, without SDK throttle retries
+            items (List) - List of items to upsert
+            concurrency (int) - Number of writes in flight, defaults to 'CosmosDB_WriteConcurrency' setting
+            rateController (Dict) - RU rate controller pacing the writes in provisioned mode, None to write as fast as possible
+
+        Returns
+            List of dicts containing the item, whether it was written, status code and RU charged
+    """
+
+    if concurrency is None:
+        concurrency = int(os.environ.get("CosmosDB_WriteConcurrency", 16))
+
+    if len(items) == 0:
+        return []
+
+    # A container from a client with SDK throttle retries still writes, but the throttles it hides never slow the writers down
+
+    if rateController is not None and hasSdkThrottleRetries(container):
+        logging.error("Error- Paced writes to " + str(getattr(container, "id", None)) + " use a client with SDK throttle retries, throttles are hidden from the rate controller")
+
+    # Cosmos DB client is thread safe, share the container across the writers
+
+    with ThreadPoolExecutor(max_workers= max(min(concurrency, len(items)), 1)) as executor:
+        return list(executor.map(lambda item: upsertItem(container, item, rateController), items))
+
+
+def hasSdkThrottleRetries(container) -> bool:
+    """
+    Takes in a Cosmos DB container
+    Returns whether its client retries throttled (429) requests itself, Eg: a container taken without 'throttleRetries= False'
+
+        Parameters
+            container (ContainerProxy) - Cosmos DB container instance
+
+        Returns
+            True if the SDK retries throttled requests of the container
+    """
+
+    connectionPolicy = getattr(getattr(container, "client_connection", None), "connection_policy", None)
+
+    if connectionPolicy is None:
+        return False
+
+    return connectionPolicy.RetryOptions.MaxRetryAttemptCount > 0
+
+
+def upsertItem(container, item: Dict, rateController: Dict = None) -> Dict:
+    """
+    Takes in a Cosmos DB container and an item to write
+    Upserts the item, waiting as long as Cosmos DB asks when throttled (429)
+    Returns status of the item
+
+        Parameters
+            container (ContainerProxy) - Cosmos DB container instance
+            item (Dict) - Item to upsert
+            rateController (Dict) - RU rate controller pacing the write, None to write right away
+
+        Returns
+            Dict containing the item, whether it was written, status code, RU charged, number of times it was throttled and time taken
+    """
+
+    operationStatus = pacedCosmosOperation(rateController,
+                                           lambda captureResponse: container.upsert_item(item, response_hook= captureResponse),
+                                           len(json.dumps(item, default= str).encode('utf-8')),
+                                           getattr(container, "id", None))
+
+    if not operationStatus["success"]:
+        logging.error("Error- Unable to write item to cosmos db " + str(item.get("id")))
+
+    return {
+        "item": item,
+        "success": operationStatus["success"],
+        "statusCode": operationStatus["statusCode"],
+        "requestCharge": operationStatus["requestCharge"],
+        "throttledCount": operationStatus["throttledCount"],
+        "elapsedSeconds": operationStatus["elapsedSeconds"]
+    }
+
+
+def summarizeItemStatuses(itemStatuses: List) -> Dict:
+    """
+    Takes in status of each item written
+    Returns the upload result in the shape used for the run report
+
+        Parameters
+            itemStatuses (List) - Status of each item as returned by bulkUpsertItems
+
+        Returns
+            Dict containing the counts and lists of created and failed repos, number of failures per reason,
+            RU charged, number of throttled requests and seconds spent writing
+    """
+
+    createdList = [itemStatus["item"]["repo"] for itemStatus in itemStatuses if itemStatus["success"]]
+    failedList = [itemStatus["item"]["repo"] for itemStatus in itemStatuses if not itemStatus["success"]]
+
+    # Failures are counted per Cosmos DB status code for the run report
+
+    failureReasons = {}
+
+    for itemStatus in itemStatuses:
+        if not itemStatus["success"]:
+            reason = "COSMOS_" + str(itemStatus["statusCode"])
+            failureReasons[reason] = failureReasons.get(reason, 0) + 1
+
+    return {
+        "success": len(failedList) == 0,
+        "received": len(itemStatuses),
+        "processed": len(itemStatuses),
+        "createdCount": len(createdList),
+        "failedCount": len(failedList),
+        "createdList": createdList,
+        "failedList": failedList,
+        "failureReasons": failureReasons,
+        "requestCharge": sum(itemStatus["requestCharge"] for itemStatus in itemStatuses),
+        "throttledCount": sum(itemStatus["throttledCount"] for itemStatus in itemStatuses),
+        "writeSeconds": sum(itemStatus["elapsedSeconds"] for itemStatus in itemStatuses)
+    }
@@ -1,89 +1,31 @@
 import logging
-import os
-from typing import List
-import azure.cosmos.cosmos_client as cosmos_client
 
 from Helpers.SendEmails import sendEmail
+from Helpers.ClientRegistry import getCosmosContainer
 
-def cosmosDbContainer(endPoint: str, key: str, databaseName: str, containerName: str): 
+def cosmosDbContainer(endPoint: str, key: str, databaseName: str, containerName: str, throttleRetries: bool = True): 
     """
     Takes in a Cosmos DB endpoint, key, database name, container name
-    Returns the container instance to work on it
+    Returns the container instance to work on it, shared by all activities in the worker
+    Containers written with bulkUpsertItems or pacedCosmosOperation are taken without throttle retries,
+    those functions retry throttled writes themselves and let the RU rate controller see every 429
 
         Parameters
             endPoint (str) - Cosmos DB endpoint
             key (str) - Cosmos DB key
             databaseName (str) - Cosmos DB database name
             containerName (str) - Cosmos DB container name
+            throttleRetries (bool) - Whether the client retries throttled (429) requests itself, 
+                                     False for containers whose writes are paced by the RU rate controller
             
         Returns
             Container instance to work on it
     """
     try:
-        client = cosmos_client.CosmosClient(endPoint, key)
-        database = client.get_database_client(databaseName)
-        container = database.get_container_client(containerName)
-
-        return container
+        return getCosmosContainer(endPoint, key, databaseName, containerName, throttleRetries)
     
     except:
         logging.error("Error- Unable to get CosmosDB container for " + containerName)
         
         sendEmail("Error- Unable to get CosmosDB container for " + containerName)
         raise
-    
-
-def partitionDataForThrottling(data :List) -> List:
-    """
-    Takes in list of all data to post to Cosmos DB
-    Returns list of lists containing data in allowable RU limit
-
-        Parameters
-            data (List) - List of all data that need to be created in Cosmos DB
-            
-        Return
-            List of lists, where each list contains data in allowable limit
-    """
-    
-    # Get the provisoned throughput and RU needed for each write
-    # Leaving 20 KB as safe buffer limit from max allowable capacity
-    
-    cosmosDB_ProvisionedThroughput = int(os.environ["CosmosDB_ProvisionedThroughput"])
-    cosmosDB_RU_NeededForEachWrite = int(os.environ["CosmosDB_RU_NeededForEachWrite"])
-    
-    safeCapacityLimitBufferInBytes = 20000
-    maxCapacityInBytesPerSecond = ((cosmosDB_ProvisionedThroughput / cosmosDB_RU_NeededForEachWrite)
-                                     * 1000
-                                     - safeCapacityLimitBufferInBytes)
-    
-    dataThrottled = []
-    currentSet = []
-    sizeTracker = 0
- 
-    for index, repostat in enumerate(data):
-    
-        # Get the size of current document and upadate sizetracker
-
-        repostatSizeInBytes = len(str(repostat).encode('utf-8'))
-        sizeTracker += repostatSizeInBytes
-
-        # If the size of current document fits in the current set add it
-        # Else add the the current set to the main list for processing
-        # Reset the current set and sizetracker, add the current repo stats back to the list
-        # If the loop reaches the last element then add current set to main list
-
-        if maxCapacityInBytesPerSecond - sizeTracker >= 0 :
-            currentSet.append(repostat)
-
-            if(len(data)-1 == index):
-                dataThrottled.append(currentSet)
-
-        else:
-            dataThrottled.append(currentSet)
-
-            sizeTracker = 0
-            currentSet = []
-
-            data.append(repostat)
-            
-    return dataThrottled
\ No newline at end of file
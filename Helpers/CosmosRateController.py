@@ -0,0 +1,217 @@
+import logging
+import os
+import time
+import threading
+
+from typing import Dict
+from azure.cosmos.exceptions import CosmosHttpResponseError
+from Helpers.ClientRegistry import getClient
+from Helpers.Telemetry import recordCosmosOperation
+
+
+def getRuRateController(containerName: str) -> Dict:
+    """
+    Takes in a Cosmos DB container name
+    Returns the RU rate controller of the container, shared by all activities in the worker
+    so the target RU/s learned by earlier calls is reused
+
+        Parameters
+            containerName (str) - Cosmos DB container name
+
+        Returns
+            Dict containing the state of the rate controller
+    """
+
+    return getClient("ruRateController", (containerName,), newRuRateController)
+
+
+def newRuRateController() -> Dict:
+    """
+    Returns a new RU rate controller
+    The controller paces writes to a target RU/s which starts at the provisioned throughput,
+    drops when Cosmos DB throttles (429) and climbs back while writes go through
+
+        Returns
+            Dict containing the state of the rate controller
+    """
+
+    provisionedThroughput = float(os.environ["CosmosDB_ProvisionedThroughput"])
+
+    return {
+        "lock": threading.Lock(),
+        "maxRuPerSecond": provisionedThroughput,
+        "targetRuPerSecond": provisionedThroughput,
+        "availableRu": provisionedThroughput,
+        "updatedAt": time.monotonic(),
+        "ruPerKb": float(os.environ.get("CosmosDB_RU_NeededForEachWrite", 5)),
+        "throttledCount": 0,
+        "totalRequestCharge": 0.0
+    }
+
+
+def estimateRequestCharge(controller: Dict, sizeInBytes: int) -> float:
+    """
+    Takes in the rate controller and size of the document to write
+    Returns RU the write is expected to cost, learned from the charges of earlier writes
+    """
+
+    return max(controller["ruPerKb"] * sizeInBytes / 1000, 1)
+
+
+def waitForRu(controller: Dict, estimatedCharge: float):
+    """
+    Takes in the rate controller and the RU a write is expected to cost
+    Reserves the RU, sleeping until the target RU/s allows the write
+
+        Parameters
+            controller (Dict) - Rate controller state
+            estimatedCharge (float) - RU the write is expected to cost
+    """
+
+    with controller["lock"]:
+        now = time.monotonic()
+        elapsedSeconds = now - controller["updatedAt"]
+
+        # Refill at the target rate, allowing at most a second worth of RU to build up
+
+        controller["availableRu"] = min(controller["availableRu"] + elapsedSeconds * controller["targetRuPerSecond"],
+                                        controller["targetRuPerSecond"])
+        controller["updatedAt"] = now
+
+        # Available RU can go below zero which makes later writers wait in line
+
+        controller["availableRu"] -= estimatedCharge
+        waitSeconds = max(-controller["availableRu"] / controller["targetRuPerSecond"], 0)
+
+    if waitSeconds > 0:
+        time.sleep(waitSeconds)
+
+
+def recordRequestCharge(controller: Dict, estimatedCharge: float, requestCharge: float, sizeInBytes: int, throttled: bool):
+    """
+    Takes in the rate controller and the outcome of a write
+    Corrects the reserved RU with the actual charge and adjusts the target RU/s
+
+        Parameters
+            controller (Dict) - Rate controller state
+            estimatedCharge (float) - RU reserved for the write
+            requestCharge (float) - RU charged by Cosmos DB as per x-ms-request-charge header
+            sizeInBytes (int) - Size of the document written
+            throttled (bool) - Whether Cosmos DB throttled the write (429)
+    """
+
+    smoothing = 0.2
+
+    with controller["lock"]:
+        controller["availableRu"] -= requestCharge - estimatedCharge
+        controller["totalRequestCharge"] += requestCharge
+
+        if throttled:
+            # Multiplicative decrease when throttled, Cosmos DB capacity is shared with other clients
+
+            controller["throttledCount"] += 1
+            controller["targetRuPerSecond"] = max(controller["targetRuPerSecond"] * 0.7, controller["maxRuPerSecond"] * 0.1)
+
+        else:
+            # Additive increase back towards the provisioned throughput
+
+            controller["targetRuPerSecond"] = min(controller["targetRuPerSecond"] + controller["maxRuPerSecond"] * 0.01,
+                                                  controller["maxRuPerSecond"])
+
+            if requestCharge > 0 and sizeInBytes > 0:
+                controller["ruPerKb"] = (1 - smoothing) * controller["ruPerKb"] + smoothing * requestCharge * 1000 / sizeInBytes
+
+
+def pacedCosmosOperation(controller: Dict, operation, sizeInBytes: int, containerName: str = None) -> Dict:
+    """
+    Takes in the rate controller, a Cosmos DB write operation and the size of the document written
+    Runs the operation paced by the controller, retrying after the time Cosmos DB asks for when throttled (429)
+    The operation should write with a container taken with 'throttleRetries= False', otherwise the SDK retries 429s before they get here
+
+        Parameters
+            controller (Dict) - Rate controller state, None to run without pacing (serverless mode)
+            operation (function) - Function taking a response hook and running the Cosmos DB operation
+            sizeInBytes (int) - Size of the document written
+            containerName (str) - Name of the container written to, used to tag telemetry
+
+        Returns
+            Dict containing whether the operation succeeded, its result, status code, RU charged, number of times it was throttled
+            and time taken including the throttled retries
+    """
+
+    # Writes are measured as metrics only, a span for every document would cost more than the write
+
+    startTime = time.perf_counter()
+    operationStatus = runPacedCosmosOperation(controller, operation, sizeInBytes)
+    operationStatus["elapsedSeconds"] = time.perf_counter() - startTime
+
+    recordCosmosOperation(containerName, operationStatus["elapsedSeconds"], operationStatus["requestCharge"],
+                          operationStatus["throttledCount"], operationStatus["statusCode"])
+
+    return operationStatus
+
+
+def runPacedCosmosOperation(controller: Dict, operation, sizeInBytes: int) -> Dict:
+    """
+    Runs the operation paced by the controller, retrying when throttled, as described in pacedCosmosOperation
+    """
+
+    maxRetries = int(os.environ.get("CosmosDB_MaxThrottleRetries", 10))
+
+    operationStatus = {
+        "success": False,
+        "result": None,
+        "statusCode": 0,
+        "requestCharge": 0.0,
+        "throttledCount": 0
+    }
+
+    for attempt in range(maxRetries + 1):
+        estimatedCharge = 0
+
+        if controller is not None:
+            estimatedCharge = estimateRequestCharge(controller, sizeInBytes)
+            waitForRu(controller, estimatedCharge)
+
+        # Response hook gets the headers of this request, last response headers of the client are shared across threads
+
+        charges = []
+
+        def captureResponse(headers, result):
+            charges.append(float(headers.get("x-ms-request-charge", 0)))
+
+        try:
+            operationStatus["result"] = operation(captureResponse)
+            operationStatus["success"] = True
+            operationStatus["statusCode"] = 200
+            operationStatus["requestCharge"] += sum(charges)
+
+            if controller is not None:
+                recordRequestCharge(controller, estimatedCharge, sum(charges), sizeInBytes, False)
+
+            return operationStatus
+
+        except CosmosHttpResponseError as error:
+            headers = error.headers or {}
+            requestCharge = float(headers.get("x-ms-request-charge", 0))
+
+            operationStatus["statusCode"] = error.status_code or 0
+            operationStatus["requestCharge"] += requestCharge
+
+            if controller is not None:
+                recordRequestCharge(controller, estimatedCharge, requestCharge, sizeInBytes, error.status_code == 429)
+
+            if error.status_code != 429 or attempt == maxRetries:
+                logging.error("Error- Cosmos DB operation failed with status " + str(error.status_code))
+                return operationStatus
+
+            # Wait as long as Cosmos DB asks before retrying
+
+            operationStatus["throttledCount"] += 1
+            time.sleep(float(headers.get("x-ms-retry-after-ms", 1000)) / 1000)
+
+        except Exception:
+            logging.error("Error- Cosmos DB operation failed")
+            return operationStatus
+
+    return operationStatus
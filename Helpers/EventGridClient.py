@@ -1,9 +1,9 @@
 import json
-import requests
 import logging
 
 from typing import Dict, List
 from Helpers.SendEmails import sendEmail
+from Helpers.ClientRegistry import getHttpSession
 
 def publishEvent(endpoint: str, endpointKey: str, eventGridData: List) -> Dict:
 
@@ -29,7 +29,7 @@ def publishEvent(endpoint: str, endpointKey: str, eventGridData: List) -> Dict:
         }
     
         dataToPost = json.dumps(eventGridData)
-        response = requests.post(endpoint, data= dataToPost, headers= headers)
+        response = getHttpSession().post(endpoint, data= dataToPost, headers= headers)
 
         if response.status_code == 200 :
             
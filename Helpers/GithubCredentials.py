@@ -0,0 +1,119 @@
+import os
+import time
+
+from datetime import timezone
+from typing import List
+from github import GithubIntegration
+from Helpers.RateGovernor import githubTokenId
+from Helpers.ClientRegistry import getClient
+
+
+# Installation tokens of github apps are valid for an hour, cache them for the life of the worker
+
+installationTokens = {}
+
+
+def githubCredentialIds() -> List:
+    """
+    Returns ids of all github credentials in the pool
+    Ids are safe to pass between functions and to use as rate governor entity keys, tokens never leave the activity
+    Raises ValueError if no credential is configured
+
+        Returns
+            List of github credential ids
+    """
+
+    credentialIds = [githubTokenId(token) for token in githubTokens()]
+
+    for installationId in githubAppInstallationIds():
+        credentialIds.append("app-" + installationId)
+
+    # Lanes and discovery chunks are spread over the credentials, there is nothing to spread them over without one
+
+    if len(credentialIds) == 0:
+        raise ValueError("No github credential configured, set 'Github_Tokens', 'Github_Token' or 'Github_AppInstallationIds'")
+
+    return credentialIds
+
+
+def getGithubToken(credentialId: str) -> str:
+    """
+    Takes in a github credential id
+    Returns the github token for the credential
+
+        Parameters
+            credentialId (str) - Github credential id from the pool
+
+        Returns
+            Github token to use in authorization header
+    """
+
+    if credentialId.startswith("app-"):
+        return getInstallationToken(credentialId[len("app-"):])
+
+    for token in githubTokens():
+        if githubTokenId(token) == credentialId:
+            return token
+
+    raise KeyError("Github credential not found in pool " + credentialId)
+
+
+def githubTokens() -> List:
+    """
+    Returns the personal access tokens configured in 'Github_Tokens' as CSV list,
+    falls back to 'Github_Token' setting
+    """
+
+    tokens = os.environ.get("Github_Tokens", "")
+
+    if tokens.strip() == "":
+        tokens = os.environ.get("Github_Token", "")
+
+    return [token.strip() for token in tokens.split(',') if token.strip() != ""]
+
+
+def githubAppInstallationIds() -> List:
+    """
+    Returns the github app installation ids configured in 'Github_AppInstallationIds' as CSV list
+    """
+
+    installationIds = os.environ.get("Github_AppInstallationIds", "")
+
+    return [installationId.strip() for installationId in installationIds.split(',') if installationId.strip() != ""]
+
+
+def getInstallationToken(installationId: str) -> str:
+    """
+    Takes in a github app installation id
+    Returns installation token for the installation, reusing the cached token until it is about to expire
+
+        Parameters
+            installationId (str) - Github app installation id
+
+        Returns
+            Installation token
+    """
+
+    cachedToken = installationTokens.get(installationId)
+
+    # Refresh the token 5 minutes before it expires
+
+    if cachedToken is None or cachedToken["expiresAt"] - time.time() < 300:
+        appId = int(os.environ["Github_AppId"])
+        privateKey = os.environ["Github_AppPrivateKey"]
+
+        integration = getClient("githubApp", (appId, privateKey), lambda: GithubIntegration(appId, privateKey))
+        authorization = integration.get_access_token(int(installationId))
+
+        expiresAt = authorization.expires_at
+
+        if expiresAt.tzinfo is None:
+            expiresAt = expiresAt.replace(tzinfo= timezone.utc)
+
+        cachedToken = {
+            "token": authorization.token,
+            "expiresAt": expiresAt.timestamp()
+        }
+        installationTokens[installationId] = cachedToken
+
+    return cachedToken["token"]
@@ -0,0 +1,66 @@
+import functools
+
+from typing import Dict, List
+
+
+# Repos of a batch are aliased r0 to rN, each alias selects the repo fields through a named fragment
+# Owners and names are passed as variables, so the query text only depends on the number of repos in the batch
+# and is the same across batches and runs, Eg: for 2 repos
+#
+#   query getRepoStats($owner0: String!, $name0: String!, $owner1: String!, $name1: String!) {
+#     r0: repository(owner: $owner0, name: $name0) {...repoStats}
+#     r1: repository(owner: $owner1, name: $name1) {...repoStats}
+#     rateLimit {cost,remaining,resetAt}
+#   }
+#   fragment repoStats on Repository {nameWithOwner,isArchived,...}
+
+
+@functools.lru_cache(maxsize= 512)
+def createRepositoryBatchQuery(operationName: str, fragmentName: str, selection: str, numberOfRepos: int) -> str:
+    """
+    Takes in the operation name, fragment name, fields to select for each repo and number of repos in the batch
+    Returns the graphql query text for the batch, cached by these values
+
+        Parameters
+            operationName (str) - Name of the graphql operation, Eg: getRepoStats
+            fragmentName (str) - Name of the fragment holding the fields, Eg: repoStats
+            selection (str) - Fields to select for each repo, without the enclosing braces
+            numberOfRepos (int) - Number of repos in the batch
+
+        Returns
+            Graphql query text
+    """
+
+    variableDefinitions = ",".join("$owner{0}: String!,$name{0}: String!".format(index) for index in range(numberOfRepos))
+    repositories = "".join("r{0}: repository(owner: $owner{0}, name: $name{0}) {{...{1}}}".format(index, fragmentName)
+                           for index in range(numberOfRepos))
+
+    # Ask github for the cost of this query and the points remaining, used for sizing the next batches of queries
+
+    return ("query " + operationName + ("(" + variableDefinitions + ")" if numberOfRepos > 0 else "") + " {"
+            + repositories
+            + "rateLimit {cost,remaining,resetAt}"
+            + "} fragment " + fragmentName + " on Repository {" + selection + "}")
+
+
+def createRepositoryBatchVariables(repos: List) -> Dict:
+    """
+    Takes in a list of repos with owner (Eg: octokit/octokit.rb)
+    Returns the variables of the batch query for the repos
+
+        Parameters
+            repos (List) - List of repos in the batch, in the order of their aliases
+
+        Returns
+            Dict containing owner and name of each repo
+    """
+
+    variables = {}
+
+    for index, repo in enumerate(repos):
+        owner, name = repo.split('/', 1)
+
+        variables["owner" + str(index)] = owner
+        variables["name" + str(index)] = name
+
+    return variables
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import os
+import requests
+
+from typing import Dict
+from Helpers.ClientRegistry import getClient, getGraphqlEndpoint
+from Helpers.Telemetry import takeResponseSize
+
+
+# Github GraphQL calls go through one of two transports, as per 'Github_Transport' setting
+# "requests" (default) sends them with sgqlc over the shared keep alive session of the worker, one blocking call per thread
+# "httpx" sends them over HTTP/2 with httpx, all calls to github are multiplexed on one connection per worker,
+# responses are read as a stream and compressed with gzip, or br when brotli is installed
+# and the async client lets an activity wait on github without holding a thread, so calls of many lanes are in flight at once
+# Both return results shaped like sgqlc results, so failures are handled the same way whichever transport is used
+# Timeouts and connection failures are returned as failed results too, only errors in this code raise
+
+
+def graphqlTransportType() -> str:
+    """
+    Returns the transport used for github graphql calls as per 'Github_Transport' setting, requests or httpx
+    """
+
+    return os.environ.get("Github_Transport", "requests").lower()
+
+
+def requestTimeoutSeconds() -> float:
+    """
+    Returns the time a github graphql call may take as per 'Github_RequestTimeoutSeconds' setting
+    Kept below the 10 second github timeout, so a slow query is given up on and split before github answers with 502
+    """
+
+    return float(os.environ.get("Github_RequestTimeoutSeconds", 9))
+
+
+def postGraphql(url: str, token: str, query: str, variables: Dict = None) -> Dict:
+    """
+    Takes in a graphql url, github token, query and its variables
+    Sends the query and waits for the result on the calling thread
+
+        Parameters
+            url (str) - Graphql url
+            token (str) - Github token
+            query (str) - Graphql query
+            variables (Dict) - Variables of the query, if any
+
+        Returns
+            Dict containing the graphql result, shaped like sgqlc results, and the size of the response in bytes
+    """
+
+    if graphqlTransportType() == "httpx":
+        client = getClient("httpxClient", (), lambda: newHttpxClient(False))
+
+        try:
+            with client.stream("POST", url, headers= graphqlHeaders(token), json= graphqlBody(query, variables), timeout= requestTimeoutSeconds()) as response:
+                body = b"".join(response.iter_bytes())
+
+                return {
+                    "result": createGraphqlResult(response.status_code, response.headers, body),
+                    "responseBytes": response.num_bytes_downloaded
+                }
+
+        except httpxTimeoutError() as timeoutError:
+            return {"result": createTimeoutResult(timeoutError), "responseBytes": 0}
+
+        except httpxTransportError() as transportError:
+            return {"result": createTransportErrorResult(transportError), "responseBytes": 0}
+
+    endpoint = getGraphqlEndpoint(url, token)
+
+    try:
+        takeResponseSize()
+        result = endpoint(query, variables, timeout= requestTimeoutSeconds())
+
+        return {"result": result, "responseBytes": takeResponseSize()}
+
+    except requests.exceptions.Timeout as timeoutError:
+        return {"result": createTimeoutResult(timeoutError), "responseBytes": 0}
+
+    except requests.exceptions.RequestException as transportError:
+        return {"result": createTransportErrorResult(transportError), "responseBytes": 0}
+
+
+async def postGraphqlAsync(url: str, token: str, query: str, variables: Dict = None) -> Dict:
+    """
+    Takes in a graphql url, github token, query and its variables
+    Sends the query without holding a thread while waiting for github, requests transport waits on a worker thread instead
+
+        Parameters
+            url (str) - Graphql url
+            token (str) - Github token
+            query (str) - Graphql query
+            variables (Dict) - Variables of the query, if any
+
+        Returns
+            Dict containing the graphql result, shaped like sgqlc results, and the size of the response in bytes
+    """
+
+    if graphqlTransportType() != "httpx":
+        return await asyncio.get_running_loop().run_in_executor(None, postGraphql, url, token, query, variables)
+
+    # Async clients are bound to the event loop they were created on
+
+    client = getClient("httpxAsyncClient", (id(asyncio.get_running_loop()),), lambda: newHttpxClient(True))
+
+    try:
+        async with client.stream("POST", url, headers= graphqlHeaders(token), json= graphqlBody(query, variables), timeout= requestTimeoutSeconds()) as response:
+            body = b"".join([chunk async for chunk in response.aiter_bytes()])
+
+            return {
+                "result": createGraphqlResult(response.status_code, response.headers, body),
+                "responseBytes": response.num_bytes_downloaded
+            }
+
+    except httpxTimeoutError() as timeoutError:
+        return {"result": createTimeoutResult(timeoutError), "responseBytes": 0}
+
+    except httpxTransportError() as transportError:
+        return {"result": createTransportErrorResult(transportError), "responseBytes": 0}
+
+
+def newHttpxClient(isAsync: bool):
+    """
+    Takes in whether the client is used from async code
+    Returns a new HTTP/2 httpx client keeping up to 'Github_MaxConnections' connections alive
+    """
+
+    # httpx is only needed with httpx transport
+
+    import httpx
+
+    maxConnections = int(os.environ.get("Github_MaxConnections", 10))
+
+    clientOptions = {
+        "http2": True,
+        "timeout": httpx.Timeout(requestTimeoutSeconds(), connect= 5),
+        "limits": httpx.Limits(max_connections= maxConnections, max_keepalive_connections= maxConnections)
+    }
+
+    return httpx.AsyncClient(**clientOptions) if isAsync else httpx.Client(**clientOptions)
+
+
+def httpxTimeoutError():
+    """
+    Returns the exception httpx raises when a request takes too long
+    """
+
+    import httpx
+
+    return httpx.TimeoutException
+
+
+def httpxTransportError():
+    """
+    Returns the exception httpx raises when a request fails on the connection, Eg: ConnectError or RemoteProtocolError
+    """
+
+    import httpx
+
+    return httpx.TransportError
+
+
+def graphqlHeaders(token: str) -> Dict:
+    """
+    Takes in a github token
+    Returns the headers of a graphql request
+    """
+
+    return {
+        "Authorization": "bearer " + token,
+        "Accept": "application/json"
+    }
+
+
+def graphqlBody(query: str, variables: Dict = None) -> Dict:
+    """
+    Takes in a graphql query and its variables
+    Returns the body of a graphql request
+    """
+
+    return {
+        "query": str(query),
+        "variables": variables
+    }
+
+
+def createGraphqlResult(statusCode: int, headers, body: bytes) -> Dict:
+    """
+    Takes in the status code, headers and body of a graphql response
+    Returns the graphql result, http errors are returned as graphql errors carrying status and headers like sgqlc does
+
+        Parameters
+            statusCode (int) - Http status code
+            headers (Headers) - Response headers
+            body (bytes) - Response body
+
+        Returns
+            Dict containing data and errors of the result along with the response headers
+    """
+
+    lowerCaseHeaders = {name.lower(): value for name, value in headers.items()}
+
+    if statusCode >= 400:
+        return {
+            "data": None,
+            "errors": [{
+                "message": "HTTP Error " + str(statusCode),
+                "status": statusCode,
+                "headers": lowerCaseHeaders,
+                "body": body.decode('utf-8', errors= 'replace')
+            }]
+        }
+
+    try:
+        result = json.loads(body)
+    except ValueError as jsonError:
+        return {
+            "data": None,
+            "errors": [{
+                "message": "Invalid JSON response: " + str(jsonError),
+                "body": body.decode('utf-8', errors= 'replace')
+            }]
+        }
+
+    result["headers"] = lowerCaseHeaders
+
+    return result
+
+
+def createTimeoutResult(timeoutError: Exception) -> Dict:
+    """
+    Takes in the error raised when a graphql request took too long
+    Returns a graphql result with a timeout error, so the query is split and retried like a 502
+    """
+
+    return {
+        "data": None,
+        "errors": [{
+            "message": "Request timeout after " + str(requestTimeoutSeconds()) + " seconds: " + str(timeoutError)
+        }]
+    }
+
+
+def createTransportErrorResult(transportError: Exception) -> Dict:
+    """
+    Takes in the error raised when a graphql request failed on the connection, Eg: connection refused or reset
+    Returns a graphql result with the error, so the query is split and retried like a failed query instead of failing the lane
+    """
+
+    return {
+        "data": None,
+        "errors": [{
+            "message": "Request failed: " + type(transportError).__name__ + ": " + str(transportError)
+        }]
+    }
@@ -0,0 +1,196 @@
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from Helpers.ClientRegistry import getClient
+
+
+# Activity inputs and outputs are saved in orchestration history and read back on every replay
+# Large payloads are written to a payload store and only a small reference travels through the orchestration (claim check)
+# Activities store their large outputs with storePayload and load their inputs with loadPayload,
+# which returns payloads that were small enough to be passed inline as they are
+# Payloads are not deleted when loaded, replays and retried activities load the same reference again
+# Each run deletes the payloads older than 'PayloadStore_RetentionHours' when it completes, with deleteExpiredPayloads
+
+
+def payloadStoreType() -> str:
+    """
+    Returns the payload store to offload large payloads to as per 'PayloadStore_Type' setting, blob, local or none
+    """
+
+    return os.environ.get("PayloadStore_Type", "none").lower()
+
+
+def storePayload(payload):
+    """
+    Takes in a payload to return from an activity or pass to one
+    Returns the payload as it is if it is small, else writes it to the payload store and returns a reference to it
+
+        Parameters
+            payload (Any) - Json serializable payload
+
+        Returns
+            Payload or Dict containing the reference to the stored payload
+    """
+
+    storeType = payloadStoreType()
+
+    if storeType == "none":
+        return payload
+
+    serializedPayload = json.dumps(payload).encode('utf-8')
+    thresholdInBytes = int(os.environ.get("PayloadStore_ThresholdBytes", 32000))
+
+    if len(serializedPayload) <= thresholdInBytes:
+        return payload
+
+    payloadName = uuid.uuid4().hex + ".json"
+
+    if storeType == "blob":
+        payloadContainer().upload_blob(payloadName, serializedPayload)
+
+    elif storeType == "local":
+        with open(os.path.join(localPayloadPath(), payloadName), "wb") as payloadFile:
+            payloadFile.write(serializedPayload)
+
+    else:
+        raise ValueError("Unknown payload store type " + storeType)
+
+    return {
+        "claimCheck": {
+            "store": storeType,
+            "name": payloadName,
+            "sizeInBytes": len(serializedPayload)
+        }
+    }
+
+
+def loadPayload(payload):
+    """
+    Takes in a payload or a reference to a stored payload
+    Returns the payload, reading it from the payload store if it was stored
+
+        Parameters
+            payload (Any) - Payload or Dict containing the reference returned by storePayload
+
+        Returns
+            Payload
+    """
+
+    if not isPayloadReference(payload):
+        return payload
+
+    claimCheck = payload["claimCheck"]
+
+    if claimCheck["store"] == "blob":
+        serializedPayload = payloadContainer().download_blob(claimCheck["name"]).readall()
+
+    elif claimCheck["store"] == "local":
+        with open(os.path.join(localPayloadPath(), claimCheck["name"]), "rb") as payloadFile:
+            serializedPayload = payloadFile.read()
+
+    else:
+        raise ValueError("Unknown payload store type " + claimCheck["store"])
+
+    return json.loads(serializedPayload)
+
+
+def deleteExpiredPayloads(retentionHours: float) -> int:
+    """
+    Takes in the number of hours payloads are kept for
+    Deletes the payloads stored longer ago than that from the payload store
+    Returns the number of payloads deleted
+
+        Parameters
+            retentionHours (float) - Hours payloads are kept for, longer than any run takes
+
+        Returns
+            Number of payloads deleted
+    """
+
+    storeType = payloadStoreType()
+    expiresBefore = time.time() - retentionHours * 3600
+    deletedCount = 0
+
+    if storeType == "blob":
+        from azure.core.exceptions import ResourceNotFoundError
+
+        containerClient = payloadContainer()
+
+        for blob in containerClient.list_blobs():
+            if blob.last_modified.timestamp() < expiresBefore:
+
+                # Runs completing at the same time delete the same payloads
+
+                try:
+                    containerClient.delete_blob(blob.name)
+                    deletedCount += 1
+                except ResourceNotFoundError:
+                    pass
+
+    elif storeType == "local":
+        localPath = localPayloadPath()
+
+        for payloadName in os.listdir(localPath):
+            payloadPath = os.path.join(localPath, payloadName)
+
+            try:
+                if os.path.getmtime(payloadPath) < expiresBefore:
+                    os.remove(payloadPath)
+                    deletedCount += 1
+            except FileNotFoundError:
+                pass
+
+    return deletedCount
+
+
+def isPayloadReference(payload) -> bool:
+    """
+    Takes in a payload
+    Returns True if it is a reference to a stored payload
+    """
+
+    return isinstance(payload, dict) and len(payload) == 1 and "claimCheck" in payload
+
+
+def payloadContainer():
+    """
+    Returns the blob container payloads are stored in, as per 'PayloadStore_ContainerName' setting
+    Uses the storage account of the function app, 'AzureWebJobsStorage' setting
+    """
+
+    # Blob storage client is only needed when payloads are stored in blobs
+
+    from azure.core.exceptions import ResourceExistsError
+    from azure.storage.blob import BlobServiceClient
+
+    connectionString = os.environ["AzureWebJobsStorage"]
+    containerName = os.environ.get("PayloadStore_ContainerName", "repo-stats-payloads")
+
+    def createContainerClient():
+        containerClient = BlobServiceClient.from_connection_string(connectionString).get_container_client(containerName)
+
+        # Another worker can create the container at the same time
+
+        try:
+            containerClient.create_container()
+        except ResourceExistsError:
+            pass
+
+        return containerClient
+
+    return getClient("payloadContainer", (connectionString, containerName), createContainerClient)
+
+
+def localPayloadPath() -> str:
+    """
+    Returns the local directory payloads are stored in, as per 'PayloadStore_LocalPath' setting
+    Local store only works when all functions run on one machine, Eg: during development
+    """
+
+    localPath = os.environ.get("PayloadStore_LocalPath") or os.path.join(tempfile.gettempdir(), "repo-stats-payloads")
+    os.makedirs(localPath, exist_ok= True)
+
+    return localPath
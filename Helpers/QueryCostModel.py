@@ -0,0 +1,132 @@
+import os
+import math
+
+from typing import Dict, List
+
+
+def defaultQueryCostModel() -> Dict:
+    """
+    Returns a starting cost model used when no model has been learned from previous runs
+
+        Returns
+            Dict containing the per repo cost estimates for a graphql query
+    """
+
+    initialBatchSize = int(os.environ["NumberOfReposToQueryPerCall"])
+    targetSeconds = float(os.environ.get("GraphqlQueryTargetSeconds", 6))
+
+    # Assume the configured batch size takes the target time to execute
+    # and costs one point, until real observations are available
+
+    overheadSeconds = 0.5
+
+    return {
+        "pointsPerRepo": 1.0 / initialBatchSize,
+        "secondsPerRepo": max(targetSeconds - overheadSeconds, 0.1) / initialBatchSize,
+        "overheadSeconds": overheadSeconds,
+        "samples": 0
+    }
+
+
+def nextBatchSize(costModel: Dict, rateLimit: Dict, reposLeft: int) -> int:
+    """
+    Takes in the current cost model, last observed github rate limit and number of repos left to query
+    Returns number of repos to put in the next graphql query
+
+        Parameters
+            costModel (Dict) - Per repo cost estimates
+            rateLimit (Dict) - Last rateLimit {cost, remaining, resetAt} returned by github, can be empty
+            reposLeft (int) - Number of repos still waiting to be queried
+
+        Returns
+            Batch size for the next graphql query
+    """
+
+    minBatchSize = int(os.environ.get("MinNumberOfReposToQueryPerCall", 1))
+    maxBatchSize = int(os.environ.get("MaxNumberOfReposToQueryPerCall", 100))
+    targetSeconds = float(os.environ.get("GraphqlQueryTargetSeconds", 6))
+
+    # Github drops queries running longer than 10 seconds with 502,
+    # so size the batch to finish within the target time
+
+    usableSeconds = max(targetSeconds - costModel["overheadSeconds"], 0)
+    batchSize = math.floor(usableSeconds / max(costModel["secondsPerRepo"], 0.001))
+
+    # Don't spend more points than what is remaining in the current rate limit window
+
+    if rateLimit and "remaining" in rateLimit:
+        batchSize = min(batchSize, math.floor(rateLimit["remaining"] / max(costModel["pointsPerRepo"], 0.001)))
+
+    batchSize = max(min(batchSize, maxBatchSize), minBatchSize)
+
+    return max(min(batchSize, reposLeft), 1)
+
+
+def updateQueryCostModel(costModel: Dict, numberOfRepos: int, cost: int, elapsedSeconds: float, executionFailed: bool) -> Dict:
+    """
+    Takes in the current cost model and the observations from an executed graphql query
+    Returns the updated cost model
+
+        Parameters
+            costModel (Dict) - Per repo cost estimates
+            numberOfRepos (int) - Number of repos in the executed query
+            cost (int) - Points charged by github for the query, 0 if unknown
+            elapsedSeconds (float) - Time taken to execute the query
+            executionFailed (bool) - Whether the query failed
+
+        Returns
+            Updated cost model
+    """
+
+    updatedModel = dict(costModel)
+
+    if numberOfRepos <= 0:
+        return updatedModel
+
+    # Failures are mostly github timeouts for heavy batches
+    # Double the per repo time estimate so the next batch is half the size
+
+    if executionFailed:
+        updatedModel["secondsPerRepo"] = costModel["secondsPerRepo"] * 2
+        return updatedModel
+
+    # Exponentially weighted average, recent observations weigh more
+
+    smoothing = 0.3
+    observedSecondsPerRepo = max(elapsedSeconds - costModel["overheadSeconds"], 0) / numberOfRepos
+
+    updatedModel["secondsPerRepo"] = (1 - smoothing) * costModel["secondsPerRepo"] + smoothing * observedSecondsPerRepo
+
+    if cost > 0:
+        updatedModel["pointsPerRepo"] = (1 - smoothing) * costModel["pointsPerRepo"] + smoothing * (cost / numberOfRepos)
+
+    updatedModel["samples"] = costModel["samples"] + 1
+
+    return updatedModel
+
+
+def mergeQueryCostModels(costModels: List) -> Dict:
+    """
+    Takes in cost models learned by lanes queried in parallel
+    Returns one cost model, averaging the estimates weighted by the number of observations in each model
+
+        Parameters
+            costModels (List) - List of cost models
+
+        Returns
+            Merged cost model
+    """
+
+    totalSamples = sum(costModel["samples"] for costModel in costModels)
+
+    if totalSamples == 0:
+        return dict(costModels[0])
+
+    mergedModel = dict(costModels[0])
+
+    for estimate in ["pointsPerRepo", "secondsPerRepo"]:
+        mergedModel[estimate] = sum(costModel[estimate] * costModel["samples"] for costModel in costModels) / totalSamples
+
+    mergedModel["samples"] = totalSamples
+
+    return mergedModel
@@ -0,0 +1,79 @@
+import hashlib
+
+from typing import Dict, List
+
+
+def groupReposByOwner(repos: List) -> Dict:
+    """
+    Takes in a list of repos with owner (Eg: octokit/octokit.rb)
+    Returns Dict of repos for each owner keeping the order of repos
+
+        Parameters
+            repos (List) - List of repos with owner
+
+        Returns
+            Dict with owner as key and list of repos for the owner as value
+    """
+
+    reposByOwner = {}
+
+    for repo in repos:
+        owner = repo.split('/')[0]
+        reposByOwner.setdefault(owner, []).append(repo)
+
+    return reposByOwner
+
+
+def assignReposToLanes(repos: List, numberOfLanes: int) -> List:
+    """
+    Takes in a list of repos and number of lanes to query in parallel
+    Returns list of lanes, each lane is a list of repos
+    All repos of an owner are kept in the same lane as github doesn't allow parallel requests against a same owner
+
+        Parameters
+            repos (List) - List of repos with owner
+            numberOfLanes (int) - Number of lanes to query in parallel
+
+        Returns
+            List of lists of repos, empty lanes are dropped
+    """
+
+    lanes = [[] for lane in range(max(numberOfLanes, 1))]
+
+    # Assign owners with most repos first, each to the lane with the least repos
+
+    reposByOwner = groupReposByOwner(repos)
+
+    for owner in sorted(reposByOwner, key= lambda owner: (-len(reposByOwner[owner]), owner)):
+        smallestLane = min(lanes, key= len)
+        smallestLane.extend(reposByOwner[owner])
+
+    return [lane for lane in lanes if len(lane) > 0]
+
+
+def assignReposToShards(repos: List, numberOfShards: int) -> List:
+    """
+    Takes in a list of repos and number of shards to query in parallel
+    Returns list of shards, each shard is a list of repos
+    Owners are assigned by a hash of the owner name, so an owner stays in the same shard from run to run
+    however many other owners are added. All repos of an owner are in the same shard
+
+        Parameters
+            repos (List) - List of repos with owner
+            numberOfShards (int) - Number of shards to query in parallel
+
+        Returns
+            List of lists of repos, empty shards are dropped
+    """
+
+    shards = [[] for shard in range(max(numberOfShards, 1))]
+
+    # Built in hash of strings changes from process to process, it can't be used in orchestrations which replay on any worker
+
+    reposByOwner = groupReposByOwner(repos)
+
+    for owner in sorted(reposByOwner):
+        shardIndex = int(hashlib.sha256(owner.lower().encode('utf-8')).hexdigest()[:8], 16) % len(shards)
+        shards[shardIndex].extend(reposByOwner[owner])
+
+    return [shard for shard in shards if len(shard) > 0]
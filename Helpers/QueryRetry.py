@@ -0,0 +1,114 @@
+import os
+
+from typing import Dict, List
+
+
+# Github error types which will not go away by retrying, Eg: deleted or renamed repos
+
+permanentErrorTypes = ["NOT_FOUND", "FORBIDDEN"]
+
+
+def planRetry(reposSubset: List, queryResult: Dict, retryCounts: Dict) -> Dict:
+    """
+    Takes in the repos of an executed graphql query, its result and the retries done so far for each repo
+    Returns the batches to retry and the repos to give up on
+
+    Repos that failed with a permanent error are dropped right away
+    Repos that failed with other errors are retried until the retry budget is spent
+    Batches that failed as a whole are halved so bad repos get isolated, single repos spend retry budget
+    Batches that are rate limited are retried as is without spending retry budget
+
+        Parameters
+            reposSubset (List) - Repos in the executed query, in the order of the query aliases
+            queryResult (Dict) - Result of ExecuteGraphqlQuery
+            retryCounts (Dict) - Retries done so far for each repo, updated in place
+
+        Returns
+            Dict containing list of batches to retry and list of dropped repos along with the reason
+    """
+
+    maxRetriesPerRepo = int(os.environ.get("Github_MaxRetriesPerRepo", 3))
+
+    batchesToRetry = []
+    droppedRepos = []
+
+    if queryResult["executionFailed"]:
+
+        if queryResult["retryAfterSeconds"] > 0:
+            batchesToRetry.append(reposSubset)
+
+        elif len(reposSubset) > 1:
+            half = len(reposSubset) // 2
+            batchesToRetry.append(reposSubset[:half])
+            batchesToRetry.append(reposSubset[half:])
+
+        else:
+            reposToRetry = spendRetryBudget(reposSubset, retryCounts, maxRetriesPerRepo)
+            batchesToRetry.extend([[repo] for repo in reposToRetry])
+
+            if len(reposToRetry) == 0:
+                droppedRepos.append({
+                    "repo": reposSubset[0],
+                    "reason": "TIMEOUT" if queryResult["timedOut"] else "FAILED"
+                })
+
+        return {
+            "batchesToRetry": batchesToRetry,
+            "droppedRepos": droppedRepos
+        }
+
+    # Aliases are r0, r1 ... in the order of repos in the query
+    # Repos failed on their own, so the ones to retry can go together in one batch
+
+    reposToRetry = []
+
+    for failedAlias in queryResult["failedAliases"]:
+        repo = reposSubset[int(failedAlias["alias"][1:])]
+
+        if failedAlias["type"] in permanentErrorTypes:
+            droppedRepos.append({
+                "repo": repo,
+                "reason": failedAlias["type"]
+            })
+
+        elif len(spendRetryBudget([repo], retryCounts, maxRetriesPerRepo)) > 0:
+            reposToRetry.append(repo)
+
+        else:
+            droppedRepos.append({
+                "repo": repo,
+                "reason": failedAlias["type"] or "FAILED"
+            })
+
+    if len(reposToRetry) > 0:
+        batchesToRetry.append(reposToRetry)
+
+    return {
+        "batchesToRetry": batchesToRetry,
+        "droppedRepos": droppedRepos
+    }
+
+
+def spendRetryBudget(repos: List, retryCounts: Dict, maxRetriesPerRepo: int) -> List:
+    """
+    Takes in repos to retry and the retries done so far for each repo
+    Returns the repos that still have retry budget left, counting this retry
+
+        Parameters
+            repos (List) - Repos to retry
+            retryCounts (Dict) - Retries done so far for each repo, updated in place
+            maxRetriesPerRepo (int) - Retries allowed for each repo
+
+        Returns
+            List of repos that can be retried
+    """
+
+    reposToRetry = []
+
+    for repo in repos:
+        retryCounts[repo] = retryCounts.get(repo, 0) + 1
+
+        if retryCounts[repo] <= maxRetriesPerRepo:
+            reposToRetry.append(repo)
+
+    return reposToRetry
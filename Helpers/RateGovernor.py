@@ -0,0 +1,304 @@
+import os
+import hashlib
+import azure.durable_functions as df
+
+from datetime import timedelta, timezone
+from typing import Dict, List
+from Helpers.RepoStatsBatch import encodeTimestamp
+
+
+def githubTokenId(githubToken: str) -> str:
+    """
+    Takes in a github token
+    Returns a short id for the token which is safe to use in entity keys and orchestration history
+
+        Parameters
+            githubToken (str) - Github token
+
+        Returns
+            Short id for the token
+    """
+
+    return hashlib.sha256(githubToken.encode('utf-8')).hexdigest()[:16]
+
+
+def newGovernorState() -> Dict:
+    """
+    Returns the initial state of a github rate governor
+
+        Returns
+            Dict containing the rate limits per github resource and token buckets per owner
+    """
+
+    return {
+        "pausedUntil": 0,
+        "resources": {},
+        "owners": {}
+    }
+
+
+def acquireCapacity(state: Dict, request: Dict) -> Dict:
+    """
+    Takes in the governor state and a request for capacity to call github
+    Reserves the capacity and returns the number of seconds the caller has to wait before calling github
+
+        Parameters
+            state (Dict) - Governor state, updated in place
+            request (Dict) - Dict containing owners to call, resource (graphql or core), points needed and current time in epoch seconds
+
+        Returns
+            Dict containing the wait time in seconds and the points reserved, to give back with releaseCapacity if the call is not made
+    """
+
+    now = request["now"]
+    cost = request.get("cost", 1)
+
+    requestsPerSecond = float(os.environ.get("Github_RequestsPerSecondPerOwner", 1))
+    burstSize = float(os.environ.get("Github_RequestBurstPerOwner", 5))
+
+    # Wait out secondary rate limit pauses reported by github
+
+    waitSeconds = max(state["pausedUntil"] - now, 0)
+    reservedPoints = 0
+
+    # Wait for the rate limit window to reset if the points remaining are not enough
+
+    resource = state["resources"].get(request.get("resource", "graphql"))
+
+    if resource is not None:
+        if resource["resetAt"] <= now:
+            resource["remaining"] = None
+
+        elif resource["remaining"] is not None:
+            if resource["remaining"] < cost:
+                waitSeconds = max(waitSeconds, resource["resetAt"] - now)
+            else:
+                resource["remaining"] -= cost
+                reservedPoints = cost
+
+    # Take a token from the bucket of each owner, tokens can go below zero
+    # which makes later callers for the same owner wait in line
+
+    for owner in request["owners"]:
+        bucket = state["owners"].get(owner, {"tokens": burstSize, "updatedAt": now})
+
+        elapsedSeconds = max(now - bucket["updatedAt"], 0)
+        tokens = min(bucket["tokens"] + elapsedSeconds * requestsPerSecond, burstSize)
+
+        if tokens < 1:
+            waitSeconds = max(waitSeconds, (1 - tokens) / requestsPerSecond)
+
+        state["owners"][owner] = {
+            "tokens": tokens - 1,
+            "updatedAt": now
+        }
+
+    return {
+        "waitSeconds": waitSeconds,
+        "reservedPoints": reservedPoints
+    }
+
+
+def releaseCapacity(state: Dict, release: Dict) -> Dict:
+    """
+    Takes in the governor state and capacity acquired earlier for a github call that is not made with this credential
+    Gives the capacity back, Eg: when the caller switches to another credential instead of waiting
+    Returns the updated state
+
+        Parameters
+            state (Dict) - Governor state, updated in place
+            release (Dict) - Dict containing owners and resource of the acquire request, points reserved by it and current time in epoch seconds
+
+        Returns
+            Updated governor state
+    """
+
+    now = release["now"]
+
+    burstSize = float(os.environ.get("Github_RequestBurstPerOwner", 5))
+
+    # Points are only given back within the rate limit window they were taken from
+
+    resource = state["resources"].get(release.get("resource", "graphql"))
+
+    if resource is not None and resource["resetAt"] > now and resource["remaining"] is not None:
+        resource["remaining"] += release.get("reservedPoints", 0)
+
+    for owner in release["owners"]:
+        bucket = state["owners"].get(owner)
+
+        if bucket is not None:
+            bucket["tokens"] = min(bucket["tokens"] + 1, burstSize)
+
+    return state
+
+
+def reportRateLimit(state: Dict, report: Dict) -> Dict:
+    """
+    Takes in the governor state and the rate limit observed in a github response
+    Returns the updated state
+
+        Parameters
+            state (Dict) - Governor state, updated in place
+            report (Dict) - Dict containing resource, current time in epoch seconds and
+                            optionally rateLimit {remaining, resetAt} and retryAfterSeconds
+
+        Returns
+            Updated governor state
+    """
+
+    now = report["now"]
+
+    rateLimit = report.get("rateLimit") or {}
+
+    # Github reports resetAt as an ISO 8601 timestamp, rate limit headers as epoch seconds
+
+    if "remaining" in rateLimit and "resetAt" in rateLimit:
+        resetAt = rateLimit["resetAt"]
+
+        state["resources"][report.get("resource", "graphql")] = {
+            "remaining": rateLimit["remaining"],
+            "resetAt": float(resetAt) if isinstance(resetAt, (int, float)) else encodeTimestamp(resetAt)
+        }
+
+    # Secondary rate limits pause all calls with this token
+
+    retryAfterSeconds = report.get("retryAfterSeconds") or 0
+
+    if retryAfterSeconds > 0:
+        state["pausedUntil"] = max(state["pausedUntil"], now + retryAfterSeconds)
+
+    return state
+
+
+def credentialHeadroom(state: Dict, resource: str, now: float) -> float:
+    """
+    Takes in the governor state of a github credential
+    Returns the points that can be spent with the credential right now
+
+        Parameters
+            state (Dict) - Governor state of the credential
+            resource (str) - Github rate limit resource, graphql or core
+            now (float) - Current time in epoch seconds
+
+        Returns
+            Points remaining for the credential, 0 if the credential is paused
+    """
+
+    if state["pausedUntil"] > now:
+        return 0
+
+    resourceState = state["resources"].get(resource)
+
+    # Unused credentials and credentials past their reset time have their full budget
+
+    if resourceState is None or resourceState["resetAt"] <= now or resourceState["remaining"] is None:
+        return float(os.environ.get("Github_PointsPerHour", 5000))
+
+    return resourceState["remaining"]
+
+
+def orchestrationEpochSeconds(context: df.DurableOrchestrationContext) -> float:
+    """
+    Returns the replay safe current time of the orchestration in epoch seconds
+
+        Parameters
+            context (DurableOrchestrationContext) - Orchestration context
+
+        Returns
+            Current orchestration time in epoch seconds
+    """
+
+    return context.current_utc_datetime.replace(tzinfo= timezone.utc).timestamp()
+
+
+def waitForGithubCapacity(context: df.DurableOrchestrationContext, credentialId: str, credentialIds: List, owners: List, resource: str, cost: int):
+    """
+    Acquires capacity from the rate governor entity of the github credential and waits using a durable timer if asked to
+    If the credential has to wait, switches to the credential in the pool with the most headroom
+    Use with 'yield from' inside an orchestrator function, returns the credential id to use for the call
+
+        Parameters
+            context (DurableOrchestrationContext) - Orchestration context
+            credentialId (str) - Github credential id preferred for the call
+            credentialIds (List) - Ids of all github credentials in the pool
+            owners (List) - Owners of the repos the github call is made for
+            resource (str) - Github rate limit resource, graphql or core
+            cost (int) - Estimated points the github call costs
+
+        Returns
+            Github credential id to use for the call
+    """
+
+    acquireRequest = {
+        "owners": owners,
+        "resource": resource,
+        "cost": cost,
+        "now": orchestrationEpochSeconds(context)
+    }
+
+    acquireResult = yield context.call_entity(df.EntityId("GithubRateGovernor", credentialId), "acquire", acquireRequest)
+
+    if acquireResult["waitSeconds"] > 0 and len(credentialIds) > 1:
+
+        # Send the call to the credential with the most headroom instead of waiting
+
+        governorStates = yield context.task_all([context.call_entity(df.EntityId("GithubRateGovernor", otherCredentialId), "get") 
+                                                 for otherCredentialId in credentialIds])
+
+        headrooms = [credentialHeadroom(governorState, resource, acquireRequest["now"]) for governorState in governorStates]
+        bestCredentialId = credentialIds[headrooms.index(max(headrooms))]
+
+        if bestCredentialId != credentialId and max(headrooms) >= cost:
+
+            # Give back what the first acquire reserved, the call won't be made with that credential
+
+            context.signal_entity(df.EntityId("GithubRateGovernor", credentialId), "release", dict(acquireRequest, reservedPoints= acquireResult["reservedPoints"]))
+
+            credentialId = bestCredentialId
+            acquireResult = yield context.call_entity(df.EntityId("GithubRateGovernor", credentialId), "acquire", acquireRequest)
+
+    if acquireResult["waitSeconds"] > 0:
+        yield context.create_timer(context.current_utc_datetime + timedelta(seconds= acquireResult["waitSeconds"]))
+
+    return credentialId
+
+
+def reportGithubRateLimit(context: df.DurableOrchestrationContext, credentialId: str, resource: str, rateLimit: Dict, retryAfterSeconds: int):
+    """
+    Reports the rate limit observed in a github response to the rate governor entity of the credential
+
+        Parameters
+            context (DurableOrchestrationContext) - Orchestration context
+            credentialId (str) - Github credential id used for the call
+            resource (str) - Github rate limit resource, graphql or core
+            rateLimit (Dict) - Rate limit {remaining, resetAt} returned by github, can be empty
+            retryAfterSeconds (int) - Seconds github asked to wait before next call
+    """
+
+    context.signal_entity(df.EntityId("GithubRateGovernor", credentialId), "report", {
+        "resource": resource,
+        "rateLimit": rateLimit,
+        "retryAfterSeconds": retryAfterSeconds,
+        "now": orchestrationEpochSeconds(context)
+    })
+
+
+def retryBackoffSeconds(consecutiveFailures: int) -> int:
+    """
+    Takes in number of consecutive failed github calls
+    Returns seconds to wait before retrying, doubling on each failure up to a limit
+
+        Parameters
+            consecutiveFailures (int) - Number of consecutive failed github calls
+
+        Returns
+            Seconds to wait before retrying
+    """
+
+    # Github 502 timeouts mostly clear up in 30 seconds
+
+    baseBackoffSeconds = int(os.environ.get("Github_RetryBackoffSeconds", 30))
+    maxBackoffSeconds = int(os.environ.get("Github_MaxRetryBackoffSeconds", 600))
+
+    return min(baseBackoffSeconds * 2 ** (consecutiveFailures - 1), maxBackoffSeconds)
@@ -0,0 +1,105 @@
+import os
+
+from typing import Dict, List
+from Helpers.GraphqlQueryBuilder import createRepositoryBatchQuery, createRepositoryBatchVariables
+
+
+# Fields that tell whether a repo changed, defined once in the repoChanges fragment of the change query
+
+repoChangesSelection = ('nameWithOwner,updatedAt,pushedAt,'
+                        'issues(first: 1, orderBy: {field: UPDATED_AT, direction: DESC}) {nodes {updatedAt}},'
+                        'pullRequests(first: 1, orderBy: {field: UPDATED_AT, direction: DESC}) {nodes {updatedAt}}')
+
+
+def isIncrementalRunEnabled() -> bool:
+    """
+    Returns True if repos that didn't change since their last run should be skipped, as per 'IncrementalRun_Enabled' setting
+    """
+
+    return os.environ.get("IncrementalRun_Enabled", "false").lower() == "true"
+
+
+def createChangeQuery(repos: List) -> Dict:
+    """
+    Takes in a list of repos
+    Returns one graphql query that gets only the fields that tell whether a repo changed, along with its variables
+
+        Parameters
+            repos (List) - List containing repos to check for changes
+
+        Returns
+            Dict containing the graphql query text and the owner and name of each repo as variables
+    """
+
+    # Repo updatedAt moves on stars and settings changes, pushedAt on pushes
+    # Latest updated issue and pull request catch issues and PRs being opened, closed or merged
+
+    return {
+        "query": createRepositoryBatchQuery("getRepoChanges", "repoChanges", repoChangesSelection, len(repos)),
+        "variables": createRepositoryBatchVariables(repos)
+    }
+
+
+def repoFingerprint(repoChanges: Dict) -> str:
+    """
+    Takes in the result of change query for a repo
+    Returns a fingerprint that changes whenever the stats of the repo can change
+
+        Parameters
+            repoChanges (Dict) - Result of change query for a repo
+
+        Returns
+            Fingerprint of the repo
+    """
+
+    latestIssues = repoChanges["issues"]["nodes"]
+    latestPullRequests = repoChanges["pullRequests"]["nodes"]
+
+    return "|".join([
+        str(repoChanges["updatedAt"]),
+        str(repoChanges["pushedAt"]),
+        latestIssues[0]["updatedAt"] if len(latestIssues) > 0 else "",
+        latestPullRequests[0]["updatedAt"] if len(latestPullRequests) > 0 else ""
+    ])
+
+
+def repoIndexId(repo: str) -> str:
+    """
+    Takes in a repo with owner (Eg: octokit/octokit.rb)
+    Returns id of the change index document of the repo in run info container
+    """
+
+    return "repoIndex." + repo.replace('/', '.')
+
+
+def repoIndexPartition(repo: str) -> str:
+    """
+    Takes in a repo with owner (Eg: octokit/octokit.rb)
+    Returns the partition of run info container the change index document of the repo is in, one per owner (Eg: repoIndex.octokit)
+    Lanes and change check pages hold the repos of an owner together, so reads and writes of a page stay in one partition
+    while the index of all owners is spread across partitions
+    """
+
+    return "repoIndex." + repo.split('/')[0]
+
+
+def isIndexEntryFresh(indexEntry: Dict, fingerprint: str, currentRunId: int) -> bool:
+    """
+    Takes in the change index document of a repo, its current fingerprint and current run id
+    Returns True if the stats saved in the index can be carried forward to current run
+
+        Parameters
+            indexEntry (Dict) - Change index document of the repo
+            fingerprint (str) - Current fingerprint of the repo
+            currentRunId (int) - Current run id
+
+        Returns
+            True if the repo didn't change and its stats were fetched recently enough
+    """
+
+    # Run ids are UTC timestamps, refresh the stats every few days even when nothing changed
+
+    maxSkipSeconds = float(os.environ.get("IncrementalRun_MaxSkipDays", 7)) * 86400
+
+    return (indexEntry["fingerprint"] == fingerprint
+            and currentRunId - int(indexEntry["runId"]) <= maxSkipSeconds)
@@ -0,0 +1,145 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+
+
+# Parsed stats travel between activities and sit in orchestration history and memory as one batch per github query
+# A batch keeps them column by column, the repo names, a list per count and the flags packed in one int per repo,
+# so field names appear once per batch instead of once per repo and document ids, which repeat the repo name, are left out
+# Stats are expanded to Cosmos DB documents only where they are written or read one repo at a time
+
+countFields = ["openIssues", "closedIssues", "totalIssues", "openPRs", "closedPRs", "mergedPRs", "totalPRs", "stars"]
+
+flagBits = {
+    "isArchived": 1,
+    "isTemplate": 2
+}
+
+
+def newRepoStatsBatch(runId: int) -> Dict:
+    """
+    Takes in the run id the stats are for
+    Returns an empty batch
+
+        Parameters
+            runId (int) - Run id, used for the ids of the documents of the batch
+
+        Returns
+            Dict containing run id, repo names, flags, update times, a list per count field and
+            the runs carried forward stats come from by position in the batch
+    """
+
+    return {
+        "runId": runId,
+        "repos": [],
+        "flags": [],
+        "repoUpdatedAt": [],
+        "counts": {field: [] for field in countFields},
+        "carriedForwardFromRunId": {}
+    }
+
+
+def appendRepoStats(batch: Dict, stats: Dict):
+    """
+    Takes in a batch and the stats of a repo, as in its Cosmos DB document, and adds the repo to the end of the batch
+    """
+
+    position = len(batch["repos"])
+
+    batch["repos"].append(stats["repo"])
+    batch["flags"].append(sum(bit for flag, bit in flagBits.items() if stats[flag]))
+    batch["repoUpdatedAt"].append(encodeTimestamp(stats["repoUpdatedAt"]))
+
+    for field in countFields:
+        batch["counts"][field].append(stats[field])
+
+    # Json keys are strings, so positions are kept as strings
+
+    if "carriedForwardFromRunId" in stats:
+        batch["carriedForwardFromRunId"][str(position)] = stats["carriedForwardFromRunId"]
+
+
+def createRepoStatsBatch(runId: int, statsList: List) -> Dict:
+    """
+    Takes in a run id and a list of repo stats, as in their Cosmos DB documents
+    Returns a batch with the stats
+    """
+
+    batch = newRepoStatsBatch(runId)
+
+    for stats in statsList:
+        appendRepoStats(batch, stats)
+
+    return batch
+
+
+def repoStatsCount(batch: Dict) -> int:
+    """
+    Takes in a batch
+    Returns number of repos in it
+    """
+
+    return len(batch["repos"])
+
+
+def expandRepoStatsBatch(batch: Dict) -> List:
+    """
+    Takes in a batch
+    Returns the Cosmos DB documents of the repos in the batch, in the order they were added
+
+        Parameters
+            batch (Dict) - Batch of repo stats
+
+        Returns
+            List of repo stats documents ready for creating in cosmos db
+    """
+
+    runId = str(batch["runId"])
+    counts = batch["counts"]
+    carriedForwardFromRunId = batch["carriedForwardFromRunId"]
+
+    statsList = []
+
+    for position, repo in enumerate(batch["repos"]):
+        flags = batch["flags"][position]
+
+        stats = {
+            "id": repo.replace('/', '.') + "." + runId,
+            "repo": repo,
+            "isArchived": bool(flags & flagBits["isArchived"]),
+            "isTemplate": bool(flags & flagBits["isTemplate"]),
+            "repoUpdatedAt": decodeTimestamp(batch["repoUpdatedAt"][position])
+        }
+
+        for field in countFields:
+            stats[field] = counts[field][position]
+
+        if str(position) in carriedForwardFromRunId:
+            stats["carriedForwardFromRunId"] = carriedForwardFromRunId[str(position)]
+
+        statsList.append(stats)
+
+    return statsList
+
+
+def encodeTimestamp(timestamp: str) -> int:
+    """
+    Takes in an ISO 8601 timestamp as returned by github, Eg: 2021-01-19T20:44:18Z
+    Returns epoch seconds, None if the timestamp is missing
+    """
+
+    if not timestamp:
+        return None
+
+    return int(datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp())
+
+
+def decodeTimestamp(epochSeconds: int) -> str:
+    """
+    Takes in epoch seconds
+    Returns the ISO 8601 timestamp in the format github returns, None if the timestamp is missing
+    """
+
+    if epochSeconds is None:
+        return None
+
+    return datetime.fromtimestamp(epochSeconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
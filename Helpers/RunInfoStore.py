@@ -0,0 +1,212 @@
+import hashlib
+import os
+
+from datetime import datetime
+from typing import Dict, List
+
+
+# Run info of a run is stored as one compact summary document and append only detail documents
+# Summary stays the same size whatever the number of repos, each detail document holds a fixed number of repos
+# so writing the run status costs the same per repo for small and large runs
+# Detail documents are written by each upload batch as it finishes, so the repos of the run are never collected in one place
+
+
+def runInfoDate(runId: int) -> str:
+    """
+    Takes in a run id
+    Returns the date partition of the run info documents of the run
+
+        Parameters
+            runId (int) - Run id, UTC timestamp of the run start
+
+        Returns
+            Date of the run start in YYYYMMDD format
+    """
+
+    return datetime.utcfromtimestamp(int(runId)).strftime("%Y%m%d")
+
+
+def runDetailDocumentId(runId: int, status: str, batchKey: str, index: int) -> str:
+    """
+    Takes in a run id, status of the repos, key of the batch and index of the detail document in the batch
+    Returns id of the run detail document, Eg: 1611127298.created.3f2a9c0d1e7b4a65.0
+    """
+
+    return str(runId) + "." + status + "." + batchKey + "." + str(index)
+
+
+def runDetailBatchKey(repos: List) -> str:
+    """
+    Takes in the repos of an upload batch
+    Returns the key of the batch used in the ids of its detail documents
+    A repo is uploaded in one batch per run, so keys don't collide and a retried upload overwrites the documents it wrote earlier
+    """
+
+    return hashlib.sha256("|".join(sorted(repos)).encode('utf-8')).hexdigest()[:16]
+
+
+def createRunDetailDocuments(runId: int, status: str, repos: List, batchKey: str) -> List:
+    """
+    Takes in a run id, status of the repos, list of repos and key of the batch they come from
+    Returns detail documents holding the repos, 'RunInfo_ReposPerDetailDocument' repos per document
+
+        Parameters
+            runId (int) - Current run id
+            status (str) - Status of the repos, created, failed, unchanged, discovered or the lane holding them, Eg: lane0
+            repos (List) - List of repos with owner, for unchanged repos Dicts of repo and the run of its last full document
+            batchKey (str) - Key of the batch, Eg: from runDetailBatchKey
+
+        Returns
+            List of run detail documents
+    """
+
+    reposPerDocument = int(os.environ.get("RunInfo_ReposPerDetailDocument", 500))
+    date = runInfoDate(runId)
+
+    detailDocuments = []
+
+    for index, start in enumerate(range(0, len(repos), reposPerDocument)):
+        detailDocuments.append({
+            "id": runDetailDocumentId(runId, status, batchKey, index),
+            "date": date,
+            "runId": str(runId),
+            "status": status,
+            "repos": repos[start:start + reposPerDocument]
+        })
+
+    return detailDocuments
+
+
+def readRunDetailRepos(runInfoContainer, runId: int, status: str):
+    """
+    Takes in the run info container, a run id and status of the repos
+    Yields the repos in the detail documents of the run with the status, reading the date partition of the run only
+
+        Parameters
+            runInfoContainer (ContainerProxy) - Run info container
+            runId (int) - Run id
+            status (str) - Status of the repos, created, failed, unchanged or discovered
+
+        Returns
+            Generator of repos with owner, for unchanged repos Dicts of repo and the run of its last full document
+    """
+
+    detailDocuments = runInfoContainer.query_items(
+        query= "SELECT c.repos FROM c WHERE c.runId = @runId AND c.status = @status",
+        parameters= [{"name": "@runId", "value": str(runId)}, {"name": "@status", "value": status}],
+        partition_key= runInfoDate(runId))
+
+    for detailDocument in detailDocuments:
+        yield from detailDocument["repos"]
+
+
+def createLaneReposDocuments(runId: int, laneIndex: int, repos: List) -> List:
+    """
+    Takes in a run id, index of a query lane and the repos assigned to the lane
+    Returns detail documents holding the repos of the lane in pages, Eg: 1611127298.lane0.repos.0
+    The lane reads its repos one page at a time with readLaneRepos, so the repos never pass through orchestration history
+
+        Parameters
+            runId (int) - Current run id
+            laneIndex (int) - Index of the lane
+            repos (List) - List of repos with owner assigned to the lane
+
+        Returns
+            List of run detail documents, one for each page of the lane
+    """
+
+    return createRunDetailDocuments(runId, "lane" + str(laneIndex), repos, "repos")
+
+
+def readLaneRepos(runInfoContainer, runId: int, laneIndex: int, page: int) -> List:
+    """
+    Takes in the run info container, a run id, index of a query lane and index of the page
+    Returns the repos in the page of the lane written by createLaneReposDocuments
+
+        Parameters
+            runInfoContainer (ContainerProxy) - Run info container
+            runId (int) - Run id
+            laneIndex (int) - Index of the lane
+            page (int) - Index of the page of the lane
+
+        Returns
+            List of repos with owner
+    """
+
+    laneDocument = runInfoContainer.read_item(runDetailDocumentId(runId, "lane" + str(laneIndex), "repos", page), partition_key= runInfoDate(runId))
+
+    return laneDocument["repos"]
+
+
+def createRunSummaryDocument(runId: int, runStatus: Dict, createdDocumentCount: int, failedDocumentCount: int, unchangedDocumentCount: int = 0) -> Dict:
+    """
+    Takes in a run id, status of the run and number of detail documents written for the run
+    Returns the summary document of the run
+
+        Parameters
+            runId (int) - Current run id
+            runStatus (Dict) - Status of the run with the totals
+            createdDocumentCount (int) - Number of detail documents holding created repos
+            failedDocumentCount (int) - Number of detail documents holding failed repos
+            unchangedDocumentCount (int) - Number of detail documents holding repos left unchanged by diff writes
+
+        Returns
+            Run summary document
+    """
+
+    # Counts tell readers how many detail documents to expect, readers find them with readRunDetailRepos
+
+    return {
+        "id": str(runId),
+        "date": runInfoDate(runId),
+        "totalReceived": runStatus["totalReceived"],
+        "totalProcessed": runStatus["totalProcessed"],
+        "totalCreatedCount": runStatus["totalCreatedCount"],
+        "totalFailedCount": runStatus["totalFailedCount"],
+        "totalUnchangedCount": runStatus.get("totalUnchangedCount", 0),
+        "createdDocumentCount": createdDocumentCount,
+        "failedDocumentCount": failedDocumentCount,
+        "unchangedDocumentCount": unchangedDocumentCount
+    }
+
+
+def createRunProfileDocument(runId: int, runProfile: Dict) -> Dict:
+    """
+    Takes in a run id and the profile of the run
+    Returns the profile document of the run, stored next to the summary document, Eg: 1611127298.profile
+
+        Parameters
+            runId (int) - Current run id
+            runProfile (Dict) - Profile of the run as built by RunProfile helpers
+
+        Returns
+            Run profile document
+    """
+
+    github = runProfile["github"]
+    cosmos = runProfile["cosmos"]
+
+    return {
+        "id": str(runId) + ".profile",
+        "date": runInfoDate(runId),
+        "runId": str(runId),
+        "stages": runProfile["stages"],
+        "github": dict(github,
+                       costPerRepo= github["cost"] / github["repos"] if github["repos"] > 0 else 0,
+                       secondsPerRequest= github["seconds"] / github["requests"] if github["requests"] > 0 else 0,
+                       responseBytesPerRequest= github["responseBytes"] / github["requests"] if github["requests"] > 0 else 0),
+        "cosmos": dict(cosmos,
+                       requestChargePerWrite= cosmos["requestCharge"] / cosmos["writes"] if cosmos["writes"] > 0 else 0)
+    }
+
+
+def createRunTrendsDocument(runId: int, trendReport: Dict) -> Dict:
+    """
+    Takes in a run id and the trend report computed after the run
+    Returns the trends document of the run, stored next to the summary document, Eg: 1611127298.trends
+    """
+
+    return dict(trendReport,
+                id= str(runId) + ".trends",
+                date= runInfoDate(runId),
+                runId= str(runId))
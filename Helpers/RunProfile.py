@@ -0,0 +1,106 @@
+from datetime import datetime
+from typing import Dict, List
+
+
+# Profile of a run tells where the time and money of the run went, without re-running it
+# Lanes profile their github queries, the orchestrator adds the stage durations and the report adds the Cosmos DB totals
+# It is built from activity results only, so it is safe to build inside orchestrations
+
+
+def newRunProfile() -> Dict:
+    """
+    Returns an empty run profile
+
+        Returns
+            Dict containing seconds taken by each stage, github query totals and Cosmos DB write totals
+    """
+
+    return {
+        "stages": {},
+        "github": {
+            "requests": 0,
+            "failedRequests": 0,
+            "repos": 0,
+            "seconds": 0.0,
+            "cost": 0,
+            "responseBytes": 0
+        },
+        "cosmos": {
+            "writes": 0,
+            "requestCharge": 0.0,
+            "throttledCount": 0,
+            "writeSeconds": 0.0
+        }
+    }
+
+
+def addGithubQuery(runProfile: Dict, numberOfRepos: int, queryResult: Dict) -> Dict:
+    """
+    Takes in the run profile, number of repos in a github query and the result of the query
+    Adds the latency, point cost and response size of the query to the profile and returns it
+
+        Parameters
+            runProfile (Dict) - Run profile, updated in place
+            numberOfRepos (int) - Number of repos in the query
+            queryResult (Dict) - Result of ExecuteGraphqlQuery
+
+        Returns
+            Updated run profile
+    """
+
+    github = runProfile["github"]
+
+    github["requests"] += 1
+    github["failedRequests"] += 1 if queryResult["executionFailed"] else 0
+    github["repos"] += numberOfRepos
+    github["seconds"] += queryResult["elapsedSeconds"]
+    github["cost"] += (queryResult["rateLimit"] or {}).get("cost", 0)
+    github["responseBytes"] += queryResult.get("responseBytes", 0)
+
+    return runProfile
+
+
+def addStageDuration(runProfile: Dict, stage: str, startedAt: datetime, finishedAt: datetime) -> Dict:
+    """
+    Takes in the run profile, name of a stage and when the stage started and finished
+    Adds the seconds taken by the stage to the profile and returns it, Eg: discovery
+    """
+
+    runProfile["stages"][stage] = runProfile["stages"].get(stage, 0) + (finishedAt - startedAt).total_seconds()
+
+    return runProfile
+
+
+def addCosmosSummary(runProfile: Dict, runSummary: Dict) -> Dict:
+    """
+    Takes in the run profile and the run summary merged from the upload results
+    Adds the Cosmos DB write totals of the run to the profile and returns it
+    """
+
+    cosmos = runProfile["cosmos"]
+
+    cosmos["writes"] += runSummary["processed"]
+    cosmos["requestCharge"] += runSummary.get("requestCharge", 0)
+    cosmos["throttledCount"] += runSummary.get("throttledCount", 0)
+    cosmos["writeSeconds"] += runSummary.get("writeSeconds", 0)
+
+    return runProfile
+
+
+def mergeRunProfiles(runProfiles: List) -> Dict:
+    """
+    Takes in a list of run profiles, Eg: one per lane
+    Returns one profile with the totals of all, stage durations are added up
+    """
+
+    mergedProfile = newRunProfile()
+
+    for runProfile in runProfiles:
+        for stage, seconds in runProfile["stages"].items():
+            mergedProfile["stages"][stage] = mergedProfile["stages"].get(stage, 0) + seconds
+
+        for section in ("github", "cosmos"):
+            for counter, value in runProfile[section].items():
+                mergedProfile[section][counter] += value
+
+    return mergedProfile
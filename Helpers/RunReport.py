@@ -0,0 +1,181 @@
+import collections
+import os
+
+from typing import Dict
+
+
+def newRunSummary() -> Dict:
+    """
+    Returns an empty run summary which partial summaries of upload batches are merged into
+    Partial summaries are upload results, with the full lists of the batch, or other summaries. Extra fields like failureReasons are optional
+    Repos of each batch are saved in run detail documents as the batch is uploaded, so the summary only keeps counts
+    and the first 'RunReport_MaxFailuresInEmail' failed repos for the report, its size doesn't grow with the repos
+
+        Returns
+            Dict containing the counters, a sample of failed repos, number of failures per reason,
+            number of run detail documents written per status and Cosmos DB write totals
+    """
+
+    return {
+        "success": True,
+        "received": 0,
+        "processed": 0,
+        "createdCount": 0,
+        "failedCount": 0,
+        "unchangedCount": 0,
+        "failedSample": [],
+        "failureReasons": {},
+        "createdDocumentCount": 0,
+        "failedDocumentCount": 0,
+        "unchangedDocumentCount": 0,
+        "requestCharge": 0.0,
+        "throttledCount": 0,
+        "writeSeconds": 0.0
+    }
+
+
+def mergeRunSummary(runSummary: Dict, partialSummary: Dict) -> Dict:
+    """
+    Takes in the run summary and the partial summary of an upload batch
+    Merges the partial summary into the run summary and returns it
+    Merging is associative so summaries can be merged in any grouping, Eg: per lane and then per run
+
+        Parameters
+            runSummary (Dict) - Run summary, updated in place
+            partialSummary (Dict) - Summary of an upload batch as returned by summarizeItemStatuses or another merge
+
+        Returns
+            Updated run summary
+    """
+
+    runSummary["success"] = runSummary["success"] and partialSummary["success"]
+    runSummary["received"] += partialSummary["received"]
+    runSummary["processed"] += partialSummary["processed"]
+    runSummary["createdCount"] += partialSummary["createdCount"]
+    runSummary["failedCount"] += partialSummary["failedCount"]
+
+    # Repos left unchanged by diff writes, only uploads with diff writes enabled have them
+
+    runSummary["unchangedCount"] += partialSummary.get("unchangedCount", 0)
+
+    # Keep the first failed repos for the report, the full lists are in run detail documents
+
+    maxFailedSample = int(os.environ.get("RunReport_MaxFailuresInEmail", 20))
+    failedRepos = partialSummary.get("failedSample", partialSummary.get("failedList", []))
+
+    runSummary["failedSample"].extend(failedRepos[:max(maxFailedSample - len(runSummary["failedSample"]), 0)])
+
+    failureReasons = partialSummary.get("failureReasons")
+
+    if failureReasons is None and partialSummary["failedCount"] > 0:
+        failureReasons = {"UPLOAD_FAILED": partialSummary["failedCount"]}
+
+    for reason, count in (failureReasons or {}).items():
+        runSummary["failureReasons"][reason] = runSummary["failureReasons"].get(reason, 0) + count
+
+    for status in ["created", "failed", "unchanged"]:
+        runSummary[status + "DocumentCount"] += partialSummary.get(status + "DocumentCount", 0)
+
+    # Cosmos DB write totals feed the run profile, summaries of dropped repos don't have them
+
+    runSummary["requestCharge"] += partialSummary.get("requestCharge", 0)
+    runSummary["throttledCount"] += partialSummary.get("throttledCount", 0)
+    runSummary["writeSeconds"] += partialSummary.get("writeSeconds", 0)
+
+    return runSummary
+
+
+def mergeRunSummaries(partialSummaries) -> Dict:
+    """
+    Takes in an iterable of partial summaries
+    Returns the run summary merging all of them, one at a time without flattening the input
+    """
+
+    runSummary = newRunSummary()
+
+    for partialSummary in partialSummaries:
+        mergeRunSummary(runSummary, partialSummary)
+
+    return runSummary
+
+
+def droppedReposSummary(droppedRepos) -> Dict:
+    """
+    Takes in the repos given up on before upload, Eg: repos not found on github or orgs that failed discovery
+    Returns their partial summary, dropped repos are reported as failed with their reason
+
+        Parameters
+            droppedRepos (List) - List of dicts containing repo and reason
+
+        Returns
+            Partial summary of the dropped repos
+    """
+
+    return {
+        "success": len(droppedRepos) == 0,
+        "received": len(droppedRepos),
+        "processed": 0,
+        "createdCount": 0,
+        "failedCount": len(droppedRepos),
+        "failedList": [droppedRepo["repo"] + " (" + droppedRepo["reason"] + ")" for droppedRepo in droppedRepos],
+        "failureReasons": dict(collections.Counter(droppedRepo["reason"] for droppedRepo in droppedRepos))
+    }
+
+
+def renderRunReport(runSummary: Dict, currentRunId: int) -> str:
+    """
+    Takes in the run summary and current run id
+    Returns html report of the run whose size doesn't depend on the number of repos
+    Lists the most common failure reasons and the first failed repos, and points to run detail documents for the full list
+
+        Parameters
+            runSummary (Dict) - Run summary
+            currentRunId (int) - Current run id
+
+        Returns
+            Html string containing the report to send email
+    """
+
+    maxFailuresInReport = int(os.environ.get("RunReport_MaxFailuresInEmail", 20))
+
+    report = ["<b>Total received: {0} <br>Total processed: {1}<br>Total created: {2}<br>Total failed: {3} <br>".format(
+        runSummary["received"], runSummary["processed"], runSummary["createdCount"], runSummary["failedCount"])]
+
+    if runSummary["unchangedCount"] > 0:
+        report.append("Total unchanged since an earlier run: {0} <br>".format(runSummary["unchangedCount"]))
+
+    if runSummary["failedCount"] > 0:
+        topReasons = sorted(runSummary["failureReasons"].items(), key= lambda reasonCount: reasonCount[1], reverse= True)
+
+        report.append("Failure reasons: {0}<br>".format(
+            ", ".join(reason + ": " + str(count) for reason, count in topReasons[:maxFailuresInReport])))
+
+        report.append("Failed List: {0}".format(",".join(runSummary["failedSample"][:maxFailuresInReport])))
+
+        if runSummary["failedCount"] > min(len(runSummary["failedSample"]), maxFailuresInReport):
+            report.append(" and {0} more. Full list in run info container, documents {1}.failed.*".format(
+                runSummary["failedCount"] - min(len(runSummary["failedSample"]), maxFailuresInReport), currentRunId))
+
+        report.append("<br>")
+
+    report.append("</b>")
+
+    return "".join(report)
+
+
+def runStatusFromSummary(runSummary: Dict) -> Dict:
+    """
+    Takes in the run summary
+    Returns the run status in the shape saved by UpdateRunInfoWithStatus
+    """
+
+    return {
+        "totalReceived": runSummary["received"],
+        "totalProcessed": runSummary["processed"],
+        "totalCreatedCount": runSummary["createdCount"],
+        "totalFailedCount": runSummary["failedCount"],
+        "totalUnchangedCount": runSummary["unchangedCount"],
+        "createdDocumentCount": runSummary["createdDocumentCount"],
+        "failedDocumentCount": runSummary["failedDocumentCount"],
+        "unchangedDocumentCount": runSummary["unchangedDocumentCount"]
+    }
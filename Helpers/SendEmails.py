@@ -2,8 +2,8 @@ import logging
 import os
 
 from datetime import datetime
-from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
+from Helpers.ClientRegistry import getSendGridClient
 
 
 def sendEmail(emailData: str) -> str:
@@ -31,7 +31,7 @@ def sendEmail(emailData: str) -> str:
                 subject='Github stats data sync status -' + datetime.now().strftime("%m/%d/%Y, %H:%M:%S"),
                 html_content = emailData)
 
-            sg = SendGridAPIClient(os.environ["SendGrid_API_Key"])
+            sg = getSendGridClient(os.environ["SendGrid_API_Key"])
             sg.send(message)
             return "email sent via sendgrid"
         
@@ -0,0 +1,338 @@
+import gzip
+import io
+import json
+import os
+import numpy as np
+
+from typing import Dict, List
+from Helpers.ClientRegistry import getClient
+from Helpers.RepoStatsBatch import flagBits
+
+
+# Each run is saved as one compressed columnar snapshot, <runId>.npz, along with the stats documents in Cosmos DB
+# Repo names are stored once in the repo dictionary, repos.json.gz, snapshots refer to repos by their index in it
+# so reading a metric of all repos over many runs reads a few columns per run instead of a document per repo per run
+# Each uploaded batch saves its stats as a part, <runId>.part.<key>.json.gz, the parts are joined into the snapshot
+# at the end of the run and deleted, so the stats of the run are never collected in the orchestration
+
+# Columns of a snapshot and their types, besides repoId
+
+snapshotColumns = {
+    "openIssues": np.int32,
+    "closedIssues": np.int32,
+    "totalIssues": np.int32,
+    "openPRs": np.int32,
+    "closedPRs": np.int32,
+    "mergedPRs": np.int32,
+    "totalPRs": np.int32,
+    "stars": np.int32,
+    "isArchived": np.bool_,
+    "isTemplate": np.bool_,
+    "repoUpdatedAt": np.int64
+}
+
+repoDictionaryName = "repos.json.gz"
+
+
+def snapshotStoreType() -> str:
+    """
+    Returns the store to save run snapshots to as per 'Snapshot_StoreType' setting, blob, local or none
+    """
+
+    return os.environ.get("Snapshot_StoreType", "none").lower()
+
+
+def loadRepoDictionary() -> Dict:
+    """
+    Returns the repo dictionary, an empty one if no snapshot was saved yet
+
+        Returns
+            Dict containing the list of repos, a repo's id is its index in the list, and the id of each repo
+    """
+
+    repos = []
+
+    if snapshotFileExists(repoDictionaryName):
+        repos = json.loads(gzip.decompress(readSnapshotFile(repoDictionaryName)))
+
+    return {
+        "repos": repos,
+        "repoIds": {repo: repoId for repoId, repo in enumerate(repos)}
+    }
+
+
+def saveRepoDictionary(repoDictionary: Dict):
+    """
+    Takes in the repo dictionary and saves it, repos are only ever appended so ids in earlier snapshots stay valid
+    """
+
+    writeSnapshotFile(repoDictionaryName, gzip.compress(json.dumps(repoDictionary["repos"]).encode('utf-8')))
+
+
+def repoIdsFor(repoDictionary: Dict, repos: List) -> np.ndarray:
+    """
+    Takes in the repo dictionary and a list of repos
+    Returns the ids of the repos, adding the repos not in the dictionary yet to it
+
+        Parameters
+            repoDictionary (Dict) - Repo dictionary, updated in place
+            repos (List) - List of repos with owner
+
+        Returns
+            Array of repo ids in the order of the repos
+    """
+
+    repoIds = np.empty(len(repos), dtype= np.int32)
+
+    for index, repo in enumerate(repos):
+        repoId = repoDictionary["repoIds"].get(repo)
+
+        if repoId is None:
+            repoId = len(repoDictionary["repos"])
+            repoDictionary["repos"].append(repo)
+            repoDictionary["repoIds"][repo] = repoId
+
+        repoIds[index] = repoId
+
+    return repoIds
+
+
+def createSnapshotFromBatches(batches: List, repoDictionary: Dict) -> Dict:
+    """
+    Takes in batches of parsed stats of the repos of a run and the repo dictionary
+    Returns the snapshot of the run, reading the columns of the batches without expanding them to documents
+
+        Parameters
+            batches (List) - Batches of repo stats, as in Helpers/RepoStatsBatch.py
+            repoDictionary (Dict) - Repo dictionary, repos seen for the first time are added to it
+
+        Returns
+            Dict containing repoId array and an array for each column in snapshotColumns
+    """
+
+    repoIds = repoIdsFor(repoDictionary, [repo for batch in batches for repo in batch["repos"]])
+    flags = np.array([flag for batch in batches for flag in batch["flags"]], dtype= np.int32)
+
+    snapshot = {"repoId": repoIds}
+
+    for column, columnType in snapshotColumns.items():
+        if column in flagBits:
+            values = (flags & flagBits[column]) != 0
+        elif column == "repoUpdatedAt":
+            values = [epochSeconds or 0 for batch in batches for epochSeconds in batch["repoUpdatedAt"]]
+        else:
+            values = [count for batch in batches for count in batch["counts"][column]]
+
+        snapshot[column] = np.array(values, dtype= columnType)
+
+    # Sorted by repo id so snapshots of different runs can be joined with searchsorted
+
+    order = np.argsort(repoIds, kind= "stable")
+
+    return {column: values[order] for column, values in snapshot.items()}
+
+
+def snapshotPartPrefix(runId: int) -> str:
+    """
+    Takes in a run id
+    Returns the prefix of the names of the snapshot parts of the run
+    """
+
+    return str(runId) + ".part."
+
+
+def saveSnapshotPart(runId: int, partKey: str, batch: Dict):
+    """
+    Takes in a run id, key of the part and a batch of repo stats
+    Saves the batch compressed as a part of the snapshot of the run, saving a part again overwrites it
+    """
+
+    writeSnapshotFile(snapshotPartPrefix(runId) + partKey + ".json.gz", gzip.compress(json.dumps(batch).encode('utf-8')))
+
+
+def listSnapshotParts(runId: int) -> List:
+    """
+    Takes in a run id
+    Returns the file names of the snapshot parts of the run
+    """
+
+    return sorted(fileName for fileName in listSnapshotFiles(snapshotPartPrefix(runId)) if fileName.endswith(".json.gz"))
+
+
+def loadSnapshotPart(fileName: str) -> Dict:
+    """
+    Takes in the file name of a snapshot part
+    Returns the batch of repo stats saved in it
+    """
+
+    return json.loads(gzip.decompress(readSnapshotFile(fileName)))
+
+
+def saveSnapshot(runId: int, snapshot: Dict) -> int:
+    """
+    Takes in a run id and the snapshot of the run
+    Saves the snapshot compressed and returns its size in bytes
+    """
+
+    snapshotBuffer = io.BytesIO()
+    np.savez_compressed(snapshotBuffer, **snapshot)
+
+    writeSnapshotFile(str(runId) + ".npz", snapshotBuffer.getvalue())
+
+    return snapshotBuffer.tell()
+
+
+def loadSnapshot(runId: int) -> Dict:
+    """
+    Takes in a run id
+    Returns the snapshot of the run, one array per column sorted by repo id
+    """
+
+    with np.load(io.BytesIO(readSnapshotFile(str(runId) + ".npz"))) as snapshotFile:
+        return {column: snapshotFile[column] for column in snapshotFile.files}
+
+
+def listSnapshotRunIds() -> List:
+    """
+    Returns the run ids of all saved snapshots, oldest first
+    """
+
+    runIds = []
+
+    for fileName in listSnapshotFiles():
+        if fileName.endswith(".npz") and fileName[:-len(".npz")].isdigit():
+            runIds.append(int(fileName[:-len(".npz")]))
+
+    return sorted(runIds)
+
+
+def writeSnapshotFile(fileName: str, content: bytes):
+    """
+    Takes in a file name and its content and writes it to the snapshot store
+    """
+
+    storeType = snapshotStoreType()
+
+    if storeType == "blob":
+        snapshotContainer().upload_blob(fileName, content, overwrite= True)
+
+    elif storeType == "local":
+
+        # Write to a temporary file and rename, so readers never see half a snapshot
+
+        filePath = os.path.join(localSnapshotPath(), fileName)
+
+        with open(filePath + ".tmp", "wb") as snapshotFile:
+            snapshotFile.write(content)
+
+        os.replace(filePath + ".tmp", filePath)
+
+    else:
+        raise ValueError("Unknown snapshot store type " + storeType)
+
+
+def readSnapshotFile(fileName: str) -> bytes:
+    """
+    Takes in a file name and returns its content from the snapshot store
+    """
+
+    storeType = snapshotStoreType()
+
+    if storeType == "blob":
+        return snapshotContainer().download_blob(fileName).readall()
+
+    elif storeType == "local":
+        with open(os.path.join(localSnapshotPath(), fileName), "rb") as snapshotFile:
+            return snapshotFile.read()
+
+    raise ValueError("Unknown snapshot store type " + storeType)
+
+
+def deleteSnapshotFile(fileName: str):
+    """
+    Takes in a file name and deletes it from the snapshot store
+    """
+
+    storeType = snapshotStoreType()
+
+    if storeType == "blob":
+        snapshotContainer().delete_blob(fileName)
+
+    elif storeType == "local":
+        os.remove(os.path.join(localSnapshotPath(), fileName))
+
+    else:
+        raise ValueError("Unknown snapshot store type " + storeType)
+
+
+def snapshotFileExists(fileName: str) -> bool:
+    """
+    Takes in a file name and returns True if it is in the snapshot store
+    """
+
+    storeType = snapshotStoreType()
+
+    if storeType == "blob":
+        return snapshotContainer().get_blob_client(fileName).exists()
+
+    elif storeType == "local":
+        return os.path.exists(os.path.join(localSnapshotPath(), fileName))
+
+    raise ValueError("Unknown snapshot store type " + storeType)
+
+
+def listSnapshotFiles(prefix: str = "") -> List:
+    """
+    Takes in a prefix of file names
+    Returns the names of the files in the snapshot store starting with it, all files if it is empty
+    """
+
+    storeType = snapshotStoreType()
+
+    if storeType == "blob":
+        return [blob.name for blob in snapshotContainer().list_blobs(name_starts_with= prefix or None)]
+
+    elif storeType == "local":
+        return [fileName for fileName in os.listdir(localSnapshotPath()) if fileName.startswith(prefix)]
+
+    raise ValueError("Unknown snapshot store type " + storeType)
+
+
+def snapshotContainer():
+    """
+    Returns the blob container snapshots are stored in, as per 'Snapshot_ContainerName' setting
+    Uses the storage account of the function app, 'AzureWebJobsStorage' setting
+    """
+
+    # Blob storage client is only needed when snapshots are stored in blobs
+
+    from azure.core.exceptions import ResourceExistsError
+    from azure.storage.blob import BlobServiceClient
+
+    connectionString = os.environ["AzureWebJobsStorage"]
+    containerName = os.environ.get("Snapshot_ContainerName", "repo-stats-snapshots")
+
+    def createContainerClient():
+        containerClient = BlobServiceClient.from_connection_string(connectionString).get_container_client(containerName)
+
+        # Another worker can create the container at the same time
+
+        try:
+            containerClient.create_container()
+        except ResourceExistsError:
+            pass
+
+        return containerClient
+
+    return getClient("snapshotContainer", (connectionString, containerName), createContainerClient)
+
+
+def localSnapshotPath() -> str:
+    """
+    Returns the local directory snapshots are stored in, as per 'Snapshot_LocalPath' setting
+    """
+
+    localPath = os.environ.get("Snapshot_LocalPath") or "snapshots"
+    os.makedirs(localPath, exist_ok= True)
+
+    return localPath
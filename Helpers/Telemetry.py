@@ -0,0 +1,185 @@
+import contextlib
+import os
+import threading
+import time
+
+from typing import Dict
+
+# OpenTelemetry is optional, without it measurements are still returned to the orchestrations for the run profile
+# but no spans or metrics are exported
+
+try:
+    from opentelemetry import trace, metrics
+except ImportError:
+    trace = None
+    metrics = None
+
+
+# Size of the last http response received on each thread, set by the response hook of the shared http session
+
+lastResponse = threading.local()
+
+
+def telemetryEnabled() -> bool:
+    """
+    Returns True if OpenTelemetry is installed and 'Telemetry_Enabled' setting is not false
+    """
+
+    return trace is not None and os.environ.get("Telemetry_Enabled", "true").lower() == "true"
+
+
+def telemetryInstruments() -> Dict:
+    """
+    Returns the OpenTelemetry tracer and metric instruments of the worker, creating them on first use
+    Exports to Application Insights if azure-monitor-opentelemetry is installed and 'APPLICATIONINSIGHTS_CONNECTION_STRING' is set
+
+        Returns
+            Dict containing the tracer and the histograms and counters measurements are recorded to
+    """
+
+    from Helpers.ClientRegistry import getClient
+
+    return getClient("telemetryInstruments", (), newTelemetryInstruments)
+
+
+def newTelemetryInstruments() -> Dict:
+    """
+    Returns a new OpenTelemetry tracer and metric instruments, configuring the exporter if one is available
+    """
+
+    if os.environ.get("APPLICATIONINSIGHTS_CONNECTION_STRING"):
+        try:
+            from azure.monitor.opentelemetry import configure_azure_monitor
+            configure_azure_monitor()
+        except ImportError:
+            pass
+
+    meter = metrics.get_meter("github-repo-stats")
+
+    return {
+        "tracer": trace.get_tracer("github-repo-stats"),
+        "githubDuration": meter.create_histogram("github.request.duration", unit= "s", description= "Time taken by github requests"),
+        "githubCost": meter.create_histogram("github.request.cost", unit= "{point}", description= "Rate limit points spent by github requests"),
+        "githubResponseSize": meter.create_histogram("github.response.size", unit= "By", description= "Size of github responses"),
+        "githubFailures": meter.create_counter("github.request.failures", unit= "{request}", description= "Github requests that failed"),
+        "cosmosDuration": meter.create_histogram("cosmos.operation.duration", unit= "s", description= "Time taken by Cosmos DB writes, including throttled retries"),
+        "cosmosRequestCharge": meter.create_histogram("cosmos.operation.request_charge", unit= "{RU}", description= "RU charged for Cosmos DB writes"),
+        "cosmosThrottled": meter.create_counter("cosmos.operation.throttled", unit= "{request}", description= "Cosmos DB requests throttled with 429"),
+        "stageDuration": meter.create_histogram("run.stage.duration", unit= "s", description= "Time taken by each stage of a run")
+    }
+
+
+@contextlib.contextmanager
+def timedSpan(name: str, attributes: Dict = None):
+    """
+    Context manager that measures the time taken by the code inside it and exports it as an OpenTelemetry span
+    Yields a dict the code can add span attributes to, elapsedSeconds is set in it on exit
+
+        Parameters
+            name (str) - Name of the span, Eg: ExecuteGraphqlQuery
+            attributes (Dict) - Attributes to start the span with
+    """
+
+    spanAttributes = dict(attributes or {})
+    startTime = time.perf_counter()
+
+    if not telemetryEnabled():
+        try:
+            yield spanAttributes
+        finally:
+            spanAttributes["elapsedSeconds"] = time.perf_counter() - startTime
+        return
+
+    with telemetryInstruments()["tracer"].start_as_current_span(name) as span:
+        try:
+            yield spanAttributes
+        finally:
+            spanAttributes["elapsedSeconds"] = time.perf_counter() - startTime
+
+            for attributeName, value in spanAttributes.items():
+                if isinstance(value, (str, bool, int, float)):
+                    span.set_attribute(attributeName, value)
+
+
+def recordGithubRequest(operation: str, elapsedSeconds: float, cost: int, responseBytes: int, numberOfRepos: int, failed: bool):
+    """
+    Records the measurements of a github request as OpenTelemetry metrics
+
+        Parameters
+            operation (str) - Activity that made the request, Eg: ExecuteGraphqlQuery
+            elapsedSeconds (float) - Time taken by the request
+            cost (int) - Rate limit points spent, 0 if github didn't report it
+            responseBytes (int) - Size of the response body
+            numberOfRepos (int) - Number of repos or orgs in the request
+            failed (bool) - True if the request failed
+    """
+
+    if not telemetryEnabled():
+        return
+
+    instruments = telemetryInstruments()
+    attributes = {"operation": operation}
+
+    instruments["githubDuration"].record(elapsedSeconds, dict(attributes, failed= failed))
+    instruments["githubResponseSize"].record(responseBytes, attributes)
+
+    if cost > 0:
+        instruments["githubCost"].record(cost, dict(attributes, repos= numberOfRepos))
+
+    if failed:
+        instruments["githubFailures"].add(1, attributes)
+
+
+def recordCosmosOperation(containerName: str, elapsedSeconds: float, requestCharge: float, throttledCount: int, statusCode: int):
+    """
+    Records the measurements of a Cosmos DB write as OpenTelemetry metrics
+
+        Parameters
+            containerName (str) - Container written to, None if not known
+            elapsedSeconds (float) - Time taken by the write, including throttled retries
+            requestCharge (float) - RU charged for the write
+            throttledCount (int) - Number of times the write was throttled
+            statusCode (int) - Status code of the write
+    """
+
+    if not telemetryEnabled():
+        return
+
+    instruments = telemetryInstruments()
+    attributes = {"container": containerName or "", "statusCode": statusCode}
+
+    instruments["cosmosDuration"].record(elapsedSeconds, attributes)
+    instruments["cosmosRequestCharge"].record(requestCharge, attributes)
+
+    if throttledCount > 0:
+        instruments["cosmosThrottled"].add(throttledCount, attributes)
+
+
+def recordStageDuration(stage: str, seconds: float):
+    """
+    Records the time taken by a stage of a run as an OpenTelemetry metric, Eg: discovery
+    """
+
+    if not telemetryEnabled():
+        return
+
+    telemetryInstruments()["stageDuration"].record(seconds, {"stage": stage})
+
+
+def recordResponseSize(response, *args, **kwargs):
+    """
+    Response hook of the shared http session, keeps the size of the response body for the thread that made the request
+    """
+
+    lastResponse.sizeInBytes = len(response.content)
+
+
+def takeResponseSize() -> int:
+    """
+    Returns the size of the last http response body received on this thread and clears it, 0 if none was received since last taken
+    """
+
+    sizeInBytes = getattr(lastResponse, "sizeInBytes", 0)
+    lastResponse.sizeInBytes = 0
+
+    return sizeInBytes
@@ -0,0 +1,201 @@
+import os
+import numpy as np
+
+from typing import Dict, List
+from Helpers.SnapshotStore import listSnapshotRunIds, loadSnapshot, loadRepoDictionary
+
+
+# Trends are computed on the columnar snapshots of the runs, each stat of a window of runs is loaded
+# into one matrix with a row per run and a column per repo id, so every computation is a whole array operation
+# Repos missing in a run (not yet discovered, failed or deleted) are NaN in that run
+# Matrices are float32, which holds counts exactly up to 16 million and halves the memory of large windows
+
+# Pull requests opened are counted from the pull requests in each state, totalPRs of snapshots saved
+# before the query fetched pullRequests{totalCount} for it holds the issue count
+
+trendColumns = ["stars", "totalIssues", "closedIssues", "openPRs", "closedPRs", "mergedPRs"]
+
+secondsPerDay = 86400
+
+
+def loadRunWindow(runIds: List, columns: List = None) -> Dict:
+    """
+    Takes in the run ids of a window of runs, oldest first, and the stats to load
+    Returns the stats of all repos in the window aligned by repo id
+
+        Parameters
+            runIds (List) - Run ids of the runs in the window, oldest first
+            columns (List) - Stats to load, defaults to trendColumns
+
+        Returns
+            Dict containing run ids as array, repo names and a runs x repos float32 matrix for each stat
+    """
+
+    columns = columns or trendColumns
+    repos = loadRepoDictionary()["repos"]
+
+    window = {
+        "runIds": np.array(runIds, dtype= np.int64),
+        "repos": repos,
+        "stats": {column: np.full((len(runIds), len(repos)), np.nan, dtype= np.float32) for column in columns}
+    }
+
+    for runIndex, runId in enumerate(runIds):
+        snapshot = loadSnapshot(runId)
+
+        for column in columns:
+            window["stats"][column][runIndex, snapshot["repoId"]] = snapshot[column]
+
+    return window
+
+
+def runDeltas(statMatrix: np.ndarray) -> np.ndarray:
+    """
+    Takes in a runs x repos stat matrix
+    Returns the change of the stat from each run to the next, (runs - 1) x repos, NaN where either run is missing
+    """
+
+    return np.diff(statMatrix, axis= 0)
+
+
+def dailyRates(statMatrix: np.ndarray, runIds: np.ndarray) -> np.ndarray:
+    """
+    Takes in a runs x repos stat matrix and the run ids
+    Returns the change of the stat per day from each run to the next, run ids are UTC timestamps
+    """
+
+    daysBetweenRuns = np.diff(runIds).astype(np.float64) / secondsPerDay
+
+    return runDeltas(statMatrix) / np.maximum(daysBetweenRuns, 1e-9)[:, np.newaxis]
+
+
+def rollingMean(matrix: np.ndarray, windowSize: int) -> np.ndarray:
+    """
+    Takes in a rows x repos matrix and the number of rows to average over
+    Returns the mean of each window of rows ending at each row, skipping NaN, (rows - windowSize + 1) x repos
+    Windows with no values are NaN
+    """
+
+    if matrix.shape[0] < windowSize:
+        return np.full((0, matrix.shape[1]), np.nan)
+
+    isPresent = ~np.isnan(matrix)
+
+    # Running sums of values and counts give the sum of every window with one subtraction
+
+    valueSums = np.concatenate([np.zeros((1, matrix.shape[1])), np.cumsum(np.where(isPresent, matrix, 0), axis= 0)])
+    countSums = np.concatenate([np.zeros((1, matrix.shape[1])), np.cumsum(isPresent, axis= 0)])
+
+    windowValues = valueSums[windowSize:] - valueSums[:-windowSize]
+    windowCounts = countSums[windowSize:] - countSums[:-windowSize]
+
+    with np.errstate(invalid= "ignore", divide= "ignore"):
+        return np.where(windowCounts > 0, windowValues / windowCounts, np.nan)
+
+
+def windowVelocity(statMatrix: np.ndarray, runIds: np.ndarray) -> Dict:
+    """
+    Takes in a runs x repos stat matrix and the run ids
+    Returns the change of the stat of each repo between its first and last run in the window and the change per day
+
+        Returns
+            Dict containing change and change per day arrays by repo id, NaN for repos seen in less than two runs
+    """
+
+    isPresent = ~np.isnan(statMatrix)
+    runCount = statMatrix.shape[0]
+    repoIndexes = np.arange(statMatrix.shape[1])
+
+    firstRun = np.argmax(isPresent, axis= 0)
+    lastRun = runCount - 1 - np.argmax(isPresent[::-1], axis= 0)
+
+    change = statMatrix[lastRun, repoIndexes] - statMatrix[firstRun, repoIndexes]
+    days = (runIds[lastRun] - runIds[firstRun]).astype(np.float64) / secondsPerDay
+
+    seenTwice = isPresent.sum(axis= 0) >= 2
+
+    with np.errstate(invalid= "ignore", divide= "ignore"):
+        return {
+            "change": np.where(seenTwice, change, np.nan),
+            "perDay": np.where(seenTwice & (days > 0), change / days, np.nan)
+        }
+
+
+def topMovers(values: np.ndarray, repos: List, count: int) -> List:
+    """
+    Takes in a value per repo id, the repo names and number of repos to return
+    Returns the repos with the highest values, highest first, NaN values are left out
+
+        Returns
+            List of dicts containing repo and value
+    """
+
+    validIds = np.flatnonzero(~np.isnan(values))
+
+    if len(validIds) == 0 or count <= 0:
+        return []
+
+    count = min(count, len(validIds))
+
+    # Partition picks the top values without sorting all repos, only those are sorted
+
+    topIds = validIds[np.argpartition(values[validIds], -count)[-count:]]
+    topIds = topIds[np.argsort(values[topIds])[::-1]]
+
+    return [{"repo": repos[repoId], "value": round(float(values[repoId]), 3)} for repoId in topIds]
+
+
+def computeTrendReport(currentRunId: int) -> Dict:
+    """
+    Takes in the current run id
+    Returns trends over the last 'Trends_WindowRuns' runs up to the current run, with the top 'Trends_TopMovers' repos for each trend
+
+        Parameters
+            currentRunId (int) - Current run id, runs after it are left out
+
+        Returns
+            Dict containing the runs in the window and the top repos by star growth, recent star rate,
+            issue and pull request open, close and merge velocity
+    """
+
+    windowRuns = int(os.environ.get("Trends_WindowRuns", 90))
+    rollingRuns = int(os.environ.get("Trends_RollingRuns", 7))
+    moversCount = int(os.environ.get("Trends_TopMovers", 20))
+
+    runIds = [runId for runId in listSnapshotRunIds() if runId <= int(currentRunId)][-windowRuns:]
+
+    trendReport = {
+        "runIds": runIds,
+        "repoCount": 0,
+        "topMovers": {}
+    }
+
+    if len(runIds) < 2:
+        return trendReport
+
+    window = loadRunWindow(runIds)
+    stats = window["stats"]
+    repos = window["repos"]
+
+    trendReport["repoCount"] = int((~np.isnan(stats["stars"][-1])).sum())
+
+    starVelocity = windowVelocity(stats["stars"], window["runIds"])
+
+    # Recent star rate is the mean daily rate over the last rolling window of runs
+
+    recentStarRate = rollingMean(dailyRates(stats["stars"], window["runIds"]), min(rollingRuns, len(runIds) - 1))[-1]
+
+    pullRequests = stats["openPRs"] + stats["closedPRs"] + stats["mergedPRs"]
+
+    trendReport["topMovers"] = {
+        "starGrowth": topMovers(starVelocity["change"], repos, moversCount),
+        "starsPerDay": topMovers(starVelocity["perDay"], repos, moversCount),
+        "recentStarsPerDay": topMovers(recentStarRate, repos, moversCount),
+        "issuesOpenedPerDay": topMovers(windowVelocity(stats["totalIssues"], window["runIds"])["perDay"], repos, moversCount),
+        "issuesClosedPerDay": topMovers(windowVelocity(stats["closedIssues"], window["runIds"])["perDay"], repos, moversCount),
+        "pullRequestsOpenedPerDay": topMovers(windowVelocity(pullRequests, window["runIds"])["perDay"], repos, moversCount),
+        "pullRequestsClosedPerDay": topMovers(windowVelocity(stats["closedPRs"], window["runIds"])["perDay"], repos, moversCount),
+        "pullRequestsMergedPerDay": topMovers(windowVelocity(stats["mergedPRs"], window["runIds"])["perDay"], repos, moversCount)
+    }
+
+    return trendReport
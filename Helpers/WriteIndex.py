@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+
+from typing import Dict, List
+from Helpers.RepoChangeIndex import isIncrementalRunEnabled
+
+
+# Most repos have the same stats night after night, writing a full document for each of them every run
+# costs RU and storage for nothing. With diff writes enabled the upload compares a hash of the stats of each repo
+# with the write index, the hash and run of the last full document written for the repo, kept in run info container
+# Only repos whose stats moved get a full document, the others are recorded in the run info as unchanged since
+# the run of their last full document, so the full state of any run can be rebuilt with point reads
+
+# Fields that are not stats, they differ every run even when the stats don't
+
+nonStatsFields = ("id", "carriedForwardFromRunId", "unchangedSinceRunId")
+
+
+def isDiffWritesEnabled() -> bool:
+    """
+    Returns True if only repos whose stats changed are written to data container, as per 'DiffWrites_Enabled' setting
+    Incremental runs always write this way, otherwise the stats they carry forward would be written again in full every run
+    """
+
+    return os.environ.get("DiffWrites_Enabled", "false").lower() == "true" or isIncrementalRunEnabled()
+
+
+def statsHash(stats: Dict) -> str:
+    """
+    Takes in the parsed stats of a repo
+    Returns a hash of its stats, the same for two runs only if every stat is the same
+    """
+
+    statsTuple = {field: value for field, value in stats.items() if field not in nonStatsFields}
+
+    return hashlib.sha256(json.dumps(statsTuple, sort_keys= True).encode('utf-8')).hexdigest()[:32]
+
+
+def writeIndexId(repo: str) -> str:
+    """
+    Takes in a repo with owner (Eg: octokit/octokit.rb)
+    Returns id of the write index document of the repo in run info container
+    """
+
+    return "writeIndex." + repo.replace('/', '.')
+
+
+def writeIndexPartition(repo: str) -> str:
+    """
+    Takes in a repo with owner (Eg: octokit/octokit.rb)
+    Returns the partition of run info container the write index document of the repo is in, one per owner (Eg: writeIndex.octokit)
+    Upload batches hold the repos of an owner together, so a batch reads and writes few partitions
+    while the index of all owners is spread across partitions
+    """
+
+    return "writeIndex." + repo.split('/')[0]
+
+
+def statsRunId(stats: Dict) -> int:
+    """
+    Takes in the parsed stats of a repo
+    Returns the run id the stats are for, the last part of the document id, Eg: octokit.octokit.rb.1611127298
+    """
+
+    return int(stats["id"].rsplit(".", 1)[1])
+
+
+def readWriteIndex(container, repos: List) -> Dict:
+    """
+    Takes in the run info container and a list of repos
+    Returns the write index documents of the repos that have one, in one query per owner
+
+        Parameters
+            container (ContainerProxy) - Run info container
+            repos (List) - List of repos with owner
+
+        Returns
+            Dict with repo as key and its write index document as value
+    """
+
+    reposByPartition = {}
+
+    for repo in repos:
+        reposByPartition.setdefault(writeIndexPartition(repo), []).append(repo)
+
+    indexEntriesByRepo = {}
+
+    for partition, partitionRepos in reposByPartition.items():
+        indexEntries = container.query_items(
+            query= "SELECT * FROM c WHERE ARRAY_CONTAINS(@ids, c.id)",
+            parameters= [{"name": "@ids", "value": [writeIndexId(repo) for repo in partitionRepos]}],
+            partition_key= partition)
+
+        indexEntriesByRepo.update((indexEntry["repo"], indexEntry) for indexEntry in indexEntries)
+
+    return indexEntriesByRepo
+
+
+def splitChangedStats(stats: List, indexEntriesByRepo: Dict) -> Dict:
+    """
+    Takes in the parsed stats of a batch and the write index documents of its repos
+    Returns the stats that need a full document and the repos whose stats didn't move
+
+    Full documents are written again after 'DiffWrites_MaxUnchangedDays' days even if nothing changed,
+    so the full document of a repo is never too old to have been archived
+
+        Parameters
+            stats (List) - Parsed stats of the repos in the batch
+            indexEntriesByRepo (Dict) - Write index documents by repo as returned by readWriteIndex
+
+        Returns
+            Dict containing stats to write, their hashes by repo and unchanged repos with the run of their last full document
+    """
+
+    maxUnchangedSeconds = float(os.environ.get("DiffWrites_MaxUnchangedDays", 30)) * 86400
+
+    statsSplit = {
+        "changedStats": [],
+        "hashes": {},
+        "unchangedList": []
+    }
+
+    for repoStats in stats:
+        repoHash = statsHash(repoStats)
+        indexEntry = indexEntriesByRepo.get(repoStats["repo"])
+
+        # Run ids are UTC timestamps
+
+        if (indexEntry is not None
+                and indexEntry["statsHash"] == repoHash
+                and statsRunId(repoStats) - int(indexEntry["runId"]) <= maxUnchangedSeconds):
+            statsSplit["unchangedList"].append({
+                "repo": repoStats["repo"],
+                "unchangedSinceRunId": int(indexEntry["runId"])
+            })
+
+        else:
+            statsSplit["changedStats"].append(repoStats)
+            statsSplit["hashes"][repoStats["repo"]] = repoHash
+
+    return statsSplit
+
+
+def createWriteIndexEntries(writtenStats: List, hashes: Dict) -> List:
+    """
+    Takes in the stats whose full documents were written and their hashes by repo
+    Returns the write index documents recording the written stats as the last full document of each repo
+    """
+
+    return [{
+        "id": writeIndexId(repoStats["repo"]),
+        "date": writeIndexPartition(repoStats["repo"]),
+        "repo": repoStats["repo"],
+        "statsHash": hashes[repoStats["repo"]],
+        "runId": statsRunId(repoStats)
+    } for repoStats in writtenStats]
+
+
+def readRunStats(dataContainer, runInfoContainer, runId: int):
+    """
+    Takes in the data and run info containers and a run id
+    Yields the full stats of every repo created in the run, rebuilding the stats of unchanged repos
+    from their last full document
+
+        Parameters
+            dataContainer (ContainerProxy) - Data container
+            runInfoContainer (ContainerProxy) - Run info container
+            runId (int) - Run id to rebuild
+
+        Returns
+            Generator of stats documents with the id for the run, unchanged ones carry unchangedSinceRunId
+    """
+
+    from Helpers.RunInfoStore import readRunDetailRepos
+
+    for repo in readRunDetailRepos(runInfoContainer, runId, "created"):
+        yield dataContainer.read_item(repo.replace('/', '.') + "." + str(runId), partition_key= repo)
+
+    for unchangedRepo in readRunDetailRepos(runInfoContainer, runId, "unchanged"):
+        repo = unchangedRepo["repo"]
+        stats = dataContainer.read_item(repo.replace('/', '.') + "." + str(unchangedRepo["unchangedSinceRunId"]), partition_key= repo)
+
+        stats["id"] = repo.replace('/', '.') + "." + str(runId)
+        stats["unchangedSinceRunId"] = unchangedRepo["unchangedSinceRunId"]
+
+        yield stats
@@ -1,55 +1,54 @@
 import logging
-import functools
-import operator
 
-from typing import Dict, List
+from typing import Dict
 from Helpers.SendEmails import sendEmail
+from Helpers.PayloadStore import loadPayload, storePayload
+from Helpers.RunReport import mergeRunSummaries, renderRunReport, runStatusFromSummary
+from Helpers.RunProfile import newRunProfile, addCosmosSummary
+from Helpers.Telemetry import recordStageDuration
 
 
-def main(cosmosDBResult: List) -> Dict:
+def main(runResults: Dict) -> Dict:
     """
-    Takes in a list of cosmos DB create item results to generate report 
-    Returns html string containing the report to send email
+    Takes in the current run id and list of cosmos DB create item results to generate report 
+    Returns html string containing the report to send email and status of the run
 
         Parameters
-            cosmosDBResult (List) - List containing result of cosmos DB create item operation
+            runResults (Dict) - Dict containing current run id, list of upload results, one list of partial summaries per upload batch or lane,
+                                and optionally the profile of the run so far
             
         Returns
-            Html string containing the report to send email
+            Dict containing html string with the report to send email and status of the run
     """
 
     try:
-        cosmosDBResults = functools.reduce(operator.iconcat, cosmosDBResult, [])
+        # Merge the partial summary of each upload batch as it comes, without flattening the results first
         
-        totalReceived = 0
-        totalProcessed = 0
-        totalCreatedCount = 0
-        totalFailedCount = 0
-        createdList = ''
-        failedList = ''
+        runSummary = mergeRunSummaries(partialSummary 
+                                       for uploadResults in runResults["uploadResults"] 
+                                       for partialSummary in loadPayload(uploadResults))
         
-        # Parse the incoming list and form html string
+        # Email report is size bounded, full lists are in run detail documents written by each upload batch
         
-        for result in cosmosDBResults:
-            totalReceived += result["received"]
-            totalProcessed += result["processed"]
-            totalCreatedCount += result["createdCount"]
-            totalFailedCount += result["failedCount"]
-            createdList += ",".join(result["createdList"]) + ","
-            failedList += ",".join(result["failedList"]) + "," 
+        # Status is size bounded, it is still offloaded to the payload store if it is large
+        
+        runStatus = runStatusFromSummary(runSummary)
+        runStatus["id"] = runResults["currentRunId"]
+        
+        # Complete the run profile with the Cosmos DB totals, it is saved next to the run info
+        # Stage durations are exported here as the orchestrator can't export them without repeating them on replay
+        
+        runProfile = addCosmosSummary(runResults.get("profile") or newRunProfile(), runSummary)
+        
+        for stage, seconds in runProfile["stages"].items():
+            recordStageDuration(stage, seconds)
+        
+        runStatus["profile"] = runProfile
         
         runDetails = {
-            "emailBody" : "<b>Total received: {0} <br>Total processed: {1}<br>Total created: {2}<br>Total failed: {3} <br>Failed List: {4}<br></b>".format(totalReceived, totalProcessed, totalCreatedCount, totalFailedCount, failedList),
-            "status" : {
-                "totalReceived" : totalReceived,
-                "totalProcessed" : totalProcessed,
-                "totalCreatedCount" : totalCreatedCount,
-                "totalFailedCount" : totalFailedCount,
-                "createdList" : createdList,
-                "failedList" : failedList
-            }
+            "emailBody" : renderRunReport(runSummary, runResults["currentRunId"]),
+            "status" : storePayload(runStatus)
         }
-        
            
         return runDetails
         
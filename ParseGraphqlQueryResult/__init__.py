@@ -1,53 +1,27 @@
 import logging
 
-from typing import Dict, List
+from typing import Dict
 from Helpers.SendEmails import sendEmail
+from Helpers.PayloadStore import loadPayload, storePayload
+from Helpers.RepoStatsBatch import newRepoStatsBatch, appendRepoStats
 
 
-def main(gqlResult: Dict) -> List:
+def main(gqlResult: Dict) -> Dict:
     """
     Takes in Dict of executed graphql result 
-    Returns parsed list of repo results ready for creating in cosmos db
+    Returns batch of parsed repo results, expanded to documents when creating in cosmos db
 
         Parameters
-            gqlResult (Dict) - Dict containing executed graphql results
+            gqlResult (Dict) - Dict containing executed graphql results or a reference to them in the payload store
             
         Returns
-            List of repo results ready for creating in cosmos db
+            Batch of repo results, or a reference to it in the payload store if it is large
     """
 
     try:
-        parsedResults = []
+        queryResults = loadPayload(gqlResult["result"])["data"]
         
-        currentRunId = gqlResult["currentRunId"]
-        queryResults = gqlResult["result"]["data"]
-        numberOfResults = len(queryResults)
-        
-        # Go through the dict, parse each result and make a list of parsed results for creating in cosmos db
-        # Add current run id to repo nameWithOwner property to form unique id
-        
-        for index in range(numberOfResults):
-            currentRepo = "r" + str(index)
-            currentRepoStats = queryResults[currentRepo]
-            
-            stats = {
-                "id": currentRepoStats["nameWithOwner"].replace('/', '.') + "." + str(currentRunId),
-                "repo": currentRepoStats["nameWithOwner"],
-                "isArchived": currentRepoStats["isArchived"],
-                "isTemplate": currentRepoStats["isTemplate"],
-                "repoUpdatedAt": currentRepoStats["updatedAt"],
-                "openIssues": currentRepoStats["openIssues"]["totalCount"],
-                "closedIssues": currentRepoStats["closedIssues"]["totalCount"],
-                "totalIssues": currentRepoStats["Issues"]["totalCount"],
-                "openPRs": currentRepoStats["openPRs"]["totalCount"],
-                "closedPRs": currentRepoStats["closedPRs"]["totalCount"],
-                "mergedPRs": currentRepoStats["mergedPRs"]["totalCount"],
-                "totalPRs": currentRepoStats["PRs"]["totalCount"],
-                "stars": currentRepoStats["stars"]["totalCount"]
-            }
-            parsedResults.append(stats)
-            
-        return parsedResults
+        return storePayload(parseQueryResults(queryResults, gqlResult["currentRunId"]))
             
     except:
         # Log error and send email in case of exception
@@ -56,4 +30,47 @@ def main(gqlResult: Dict) -> List:
         logging.error(gqlResult)
         
         sendEmail("Parsing failed for" + str(gqlResult))
-        raise
\ No newline at end of file
+        raise
+
+
+def parseQueryResults(queryResults: Dict, currentRunId: int) -> Dict:
+    """
+    Takes in the data of an executed graphql query, keyed by repo alias, and current run id
+    Returns batch of parsed repo results, expanded to documents when creating in cosmos db
+    Used by this activity and by ExecuteGraphqlQuery when it parses the result in the same call
+
+        Parameters
+            queryResults (Dict) - Data of executed graphql query
+            currentRunId (int) - Current run id
+            
+        Returns
+            Batch of repo results, see Helpers/RepoStatsBatch.py
+    """
+
+    parsedResults = newRepoStatsBatch(currentRunId)
+
+    # Go through the dict, parse each result and add it to the batch
+    # Repos that failed in the query are left out of the result, so go by the aliases present
+    # Document ids, repo nameWithOwner with current run id, are formed when the batch is expanded
+    
+    for currentRepoStats in queryResults.values():
+        if currentRepoStats is None:
+            continue
+        
+        stats = {
+            "repo": currentRepoStats["nameWithOwner"],
+            "isArchived": currentRepoStats["isArchived"],
+            "isTemplate": currentRepoStats["isTemplate"],
+            "repoUpdatedAt": currentRepoStats["updatedAt"],
+            "openIssues": currentRepoStats["openIssues"]["totalCount"],
+            "closedIssues": currentRepoStats["closedIssues"]["totalCount"],
+            "totalIssues": currentRepoStats["Issues"]["totalCount"],
+            "openPRs": currentRepoStats["openPRs"]["totalCount"],
+            "closedPRs": currentRepoStats["closedPRs"]["totalCount"],
+            "mergedPRs": currentRepoStats["mergedPRs"]["totalCount"],
+            "totalPRs": currentRepoStats["PRs"]["totalCount"],
+            "stars": currentRepoStats["stars"]["totalCount"]
+        }
+        appendRepoStats(parsedResults, stats)
+        
+    return parsedResults
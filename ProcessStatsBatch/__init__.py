@@ -0,0 +1,62 @@
+import azure.durable_functions as df
+
+from Helpers.SnapshotStore import snapshotStoreType
+
+
+def orchestrator_function(context: df.DurableOrchestrationContext):
+    """
+    Sub orchestrator function that takes one batch of repos from github result to Cosmos DB
+    Lanes start one for each batch as soon as the batch is fetched, so uploads overlap with the next github queries
+    Everything the run needs from the batch is saved here, the repos in run detail documents while uploading,
+    the change index in incremental runs and the snapshot part when snapshots are saved, so only a summary goes back to the lane
+
+    Input
+        Dict containing current run id and either the github stats data of the batch or stats already parsed,
+        Eg: stats carried forward for unchanged repos. Both can be a reference to the payload store
+        Along with the fingerprints of the changed repos in the batch, if any
+
+    Returns
+        Summary of the upload of the batch, with counts and a sample of failed repos
+    """
+
+    batchInput = context.get_input()
+
+    # Parse the result obtained from executing the graphql query and create documents for cosmosdb
+
+    if "githubStatsData" in batchInput:
+        parsedResults = yield context.call_activity("ParseGraphqlQueryResult", {
+            "currentRunId": batchInput["currentRunId"],
+            "result": batchInput["githubStatsData"]
+        })
+
+    else:
+        parsedResults = batchInput["stats"]
+
+    # Create items in cosmos db, in provisioned mode the activity paces its writes to the RU Cosmos DB reports
+
+    uploadStatus = yield context.call_activity("UploadQueryResultsToCosmosDB", parsedResults)
+
+    # Save fingerprints and stats of the repos queried and created from this batch
+    # Next incremental run skips these repos until they change
+
+    if len(batchInput.get("fingerprints", {})) > 0:
+        yield context.call_activity("UpdateRepoChangeIndex", {
+            "currentRunId": batchInput["currentRunId"],
+            "fingerprints": batchInput["fingerprints"],
+            "parsedResults": parsedResults,
+            "uploadResults": uploadStatus["uploadResults"]
+        })
+
+    # Save the stats of the created repos as a part of the snapshot of the run, parts are joined at the end of the run
+
+    if snapshotStoreType() != "none":
+        yield context.call_activity("SaveRunSnapshotPart", {
+            "currentRunId": batchInput["currentRunId"],
+            "parsedResults": parsedResults,
+            "uploadResults": uploadStatus["uploadResults"]
+        })
+
+    return uploadStatus["summary"]
+
+
+main = df.Orchestrator.create(orchestrator_function)
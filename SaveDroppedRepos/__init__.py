@@ -0,0 +1,64 @@
+import logging
+import os
+
+from typing import Dict
+from Helpers.SendEmails import sendEmail
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.CosmosBulkWriter import bulkUpsertItems
+from Helpers.CosmosRateController import getRuRateController
+from Helpers.RunInfoStore import createRunDetailDocuments, runDetailBatchKey
+from Helpers.RunReport import droppedReposSummary
+
+
+def main(droppedRepos: Dict) -> Dict:
+    """
+    Takes in repos given up on before upload, Eg: repos not found on github or orgs that failed discovery
+    Writes them as failed repos to run detail documents in run info container
+    Returns their partial summary for the run report
+
+        Parameters
+            droppedRepos (Dict) - Dict containing current run id and list of dicts containing repo and reason
+
+        Returns
+            Partial summary of the dropped repos along with the number of detail documents written
+    """
+
+    try:
+        endpoint = os.environ["CosmosDB_Endpoint"]
+        key = os.environ["CosmosDB_PrimaryKey"]
+        databaseName = os.environ["CosmosDB_DBName"]
+        containerName = os.environ["CosmosDB_RunInfoContainerName"]
+        container  = cosmosDbContainer(endpoint, key, databaseName, containerName, throttleRetries= False)
+
+        rateController = None
+
+        if os.environ["CosmosDB_ServerlessMode"].lower() != "true":
+            rateController = getRuRateController(containerName)
+
+        droppedSummary = droppedReposSummary(droppedRepos["droppedRepos"])
+
+        # Keyed by the dropped repos, a retried call overwrites the documents it wrote earlier
+
+        failedDocuments = createRunDetailDocuments(droppedRepos["currentRunId"],
+                                                   "failed",
+                                                   droppedSummary["failedList"],
+                                                   runDetailBatchKey([droppedRepo["repo"] for droppedRepo in droppedRepos["droppedRepos"]]))
+
+        detailStatuses = bulkUpsertItems(container, failedDocuments, rateController= rateController)
+        failedDetailStatuses = [detailStatus for detailStatus in detailStatuses if not detailStatus["success"]]
+
+        if len(failedDetailStatuses) > 0:
+            raise Exception("Unable to write " + str(len(failedDetailStatuses)) + " run detail documents")
+
+        droppedSummary["failedDocumentCount"] = len(failedDocuments)
+
+        return droppedSummary
+
+    except:
+        # Log error and send email in case of exception
+
+        logging.error("Error- Unable to save dropped repos")
+        logging.error(droppedRepos["droppedRepos"])
+
+        sendEmail("Error- Unable to save dropped repos" + str(droppedRepos["droppedRepos"]))
+        raise
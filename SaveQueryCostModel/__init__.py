@@ -0,0 +1,46 @@
+import logging
+import os
+
+from typing import Dict
+from Helpers.SendEmails import sendEmail
+from Helpers.CosmosDBClient import cosmosDbContainer
+
+
+def main(costModel: Dict) -> str:
+    """
+    Takes in the graphql query cost model learned in current run and saves it for next runs
+    Returns status of the operation
+
+        Parameters
+            costModel (Dict) - Per repo cost estimates for a graphql query
+
+        Returns
+            Status of the operation
+    """
+
+    try:
+        endpoint = os.environ["CosmosDB_Endpoint"]
+        key = os.environ["CosmosDB_PrimaryKey"]
+        databaseName = os.environ["CosmosDB_DBName"]
+        containerName = os.environ["CosmosDB_RunInfoContainerName"]
+        container  = cosmosDbContainer(endpoint, key, databaseName, containerName)
+
+        costModelDocument = {
+            "id": "queryCostModel",
+            "date": "queryCostModel",
+            "costModel": costModel
+        }
+
+        container.upsert_item(costModelDocument)
+
+        return "Saved graphql query cost model"
+
+    except:
+        # Log error and send email in case of exception
+        # Next run starts from the previously saved model, so don't fail the run
+
+        logging.error("Error- Unable to save graphql query cost model")
+        logging.error(costModel)
+
+        sendEmail("Error- Unable to save graphql query cost model")
+        return "Failed to save graphql query cost model"
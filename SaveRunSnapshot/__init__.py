@@ -0,0 +1,49 @@
+import logging
+
+from typing import Dict
+from Helpers.SendEmails import sendEmail
+from Helpers.SnapshotStore import loadRepoDictionary, saveRepoDictionary, createSnapshotFromBatches, saveSnapshot
+from Helpers.SnapshotStore import listSnapshotParts, loadSnapshotPart, deleteSnapshotFile
+
+
+def main(runSnapshot: Dict) -> str:
+    """
+    Takes in current run id
+    Joins the snapshot parts saved by the batches of current run into one columnar snapshot of the run
+    Returns status of the operation
+
+        Parameters
+            runSnapshot (Dict) - Dict containing current run id
+
+        Returns
+            Status of the operation
+    """
+
+    try:
+        # Each uploaded batch saved the stats of its created repos as a part
+
+        partNames = listSnapshotParts(runSnapshot["currentRunId"])
+        batches = [loadSnapshotPart(partName) for partName in partNames]
+
+        # Save the dictionary before the snapshot, so a snapshot never refers to a repo id that isn't saved
+
+        repoDictionary = loadRepoDictionary()
+        snapshot = createSnapshotFromBatches(batches, repoDictionary)
+
+        saveRepoDictionary(repoDictionary)
+        sizeInBytes = saveSnapshot(runSnapshot["currentRunId"], snapshot)
+
+        # Parts are only needed until the snapshot is saved
+
+        for partName in partNames:
+            deleteSnapshotFile(partName)
+
+        return "Saved snapshot of " + str(len(snapshot["repoId"])) + " repos in " + str(sizeInBytes) + " bytes"
+
+    except:
+        # Log error and send email in case of exception
+
+        logging.error("Error- Unable to save run snapshot")
+
+        sendEmail("Error- Unable to save run snapshot")
+        raise
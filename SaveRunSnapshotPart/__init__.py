@@ -0,0 +1,49 @@
+import logging
+
+from typing import Dict
+from Helpers.SendEmails import sendEmail
+from Helpers.PayloadStore import loadPayload
+from Helpers.RepoStatsBatch import expandRepoStatsBatch, createRepoStatsBatch
+from Helpers.RunInfoStore import runDetailBatchKey
+from Helpers.SnapshotStore import saveSnapshotPart
+
+
+def main(snapshotPart: Dict) -> str:
+    """
+    Takes in the parsed and upload results of a batch
+    Saves the stats of the repos of the batch created in current run as a part of the snapshot of the run
+    Returns status of the operation
+
+        Parameters
+            snapshotPart (Dict) - Dict containing current run id, parsed results and upload results of the batch,
+                                  each can be a reference to the payload store
+
+        Returns
+            Status of the operation
+    """
+
+    try:
+        # Only repos whose stats were created in this run, or left unchanged by diff writes, are in the snapshot
+
+        createdRepos = set()
+
+        for uploadResult in loadPayload(snapshotPart["uploadResults"]):
+            createdRepos.update(uploadResult["createdList"])
+            createdRepos.update(unchangedRepo["repo"] for unchangedRepo in uploadResult.get("unchangedList", []))
+
+        statsBatch = loadPayload(snapshotPart["parsedResults"])
+        stats = [repoStats for repoStats in expandRepoStatsBatch(statsBatch) if repoStats["repo"] in createdRepos]
+
+        # Part is keyed by the repos of the batch, a retried batch overwrites its part
+
+        saveSnapshotPart(snapshotPart["currentRunId"], runDetailBatchKey(statsBatch["repos"]), createRepoStatsBatch(snapshotPart["currentRunId"], stats))
+
+        return "Saved snapshot part of " + str(len(stats)) + " repos"
+
+    except:
+        # Log error and send email in case of exception
+
+        logging.error("Error- Unable to save run snapshot part")
+
+        sendEmail("Error- Unable to save run snapshot part")
+        raise
@@ -0,0 +1,81 @@
+import logging
+import os
+
+from typing import Dict
+from Helpers.SendEmails import sendEmail
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.CosmosBulkWriter import bulkUpsertItems
+from Helpers.CosmosRateController import getRuRateController
+from Helpers.RepoChangeIndex import repoIndexId, repoIndexPartition
+from Helpers.PayloadStore import loadPayload
+from Helpers.RepoStatsBatch import expandRepoStatsBatch
+
+
+def main(indexUpdate: Dict) -> str:
+    """
+    Takes in the fingerprints of the repos of a batch whose stats were fetched in current run along with the parsed and upload results of the batch
+    Updates the change index used to skip unchanged repos in next runs
+    Returns status of the operation
+
+        Parameters
+            indexUpdate (Dict) - Dict containing current run id, fingerprints of changed repos in the batch,
+                                 parsed results and upload results of the batch, each can be a reference to the payload store
+
+        Returns
+            Status of the operation
+    """
+
+    try:
+        endpoint = os.environ["CosmosDB_Endpoint"]
+        key = os.environ["CosmosDB_PrimaryKey"]
+        databaseName = os.environ["CosmosDB_DBName"]
+        containerName = os.environ["CosmosDB_RunInfoContainerName"]
+        container  = cosmosDbContainer(endpoint, key, databaseName, containerName, throttleRetries= False)
+
+        # Only repos whose stats were created in this run, or left unchanged by diff writes, are indexed
+
+        fingerprints = indexUpdate["fingerprints"]
+        createdRepos = set()
+
+        for uploadResult in loadPayload(indexUpdate["uploadResults"]):
+            createdRepos.update(uploadResult["createdList"])
+            createdRepos.update(unchangedRepo["repo"] for unchangedRepo in uploadResult.get("unchangedList", []))
+
+        # Index documents live in a partition per owner of run info container
+        # A missing index entry only means the repo is queried again in next run
+
+        indexEntries = []
+
+        for stats in expandRepoStatsBatch(loadPayload(indexUpdate["parsedResults"])):
+            if stats["repo"] in fingerprints and stats["repo"] in createdRepos:
+                indexEntries.append({
+                    "id": repoIndexId(stats["repo"]),
+                    "date": repoIndexPartition(stats["repo"]),
+                    "repo": stats["repo"],
+                    "fingerprint": fingerprints[stats["repo"]],
+                    "runId": indexUpdate["currentRunId"],
+                    "stats": stats
+                })
+
+        # In provisioned mode pace the writes like the stats upload, run info container has its own rate controller
+
+        rateController = None
+
+        if os.environ["CosmosDB_ServerlessMode"].lower() != "true":
+            rateController = getRuRateController(containerName)
+
+        itemStatuses = bulkUpsertItems(container, indexEntries, rateController= rateController)
+        failedCount = len([itemStatus for itemStatus in itemStatuses if not itemStatus["success"]])
+
+        if failedCount > 0:
+            logging.error("Error- Unable to update change index for " + str(failedCount) + " repos")
+
+        return "Updated change index for " + str(len(indexEntries) - failedCount) + " repos"
+
+    except:
+        # Log error and send email in case of exception
+
+        logging.error("Error- Unable to update change index")
+
+        sendEmail("Error- Unable to update change index")
+        raise
@@ -1,11 +1,14 @@
+import json
 import logging
 import os
-import time
 from typing import Dict
 
-from datetime import datetime
 from Helpers.SendEmails import sendEmail
-from Helpers.CosmosDBClient import cosmosDbContainer, partitionDataForThrottling
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.CosmosBulkWriter import bulkUpsertItems
+from Helpers.CosmosRateController import getRuRateController, pacedCosmosOperation
+from Helpers.RunInfoStore import createRunSummaryDocument, createRunProfileDocument
+from Helpers.PayloadStore import loadPayload
 
 def main(runStatus: Dict) -> str:
     """
@@ -25,46 +28,50 @@ def main(runStatus: Dict) -> str:
         key = os.environ["CosmosDB_PrimaryKey"]
         databaseName = os.environ["CosmosDB_DBName"]
         containerName = os.environ["CosmosDB_RunInfoContainerName"]
-        container  = cosmosDbContainer(endpoint, key, databaseName, containerName)
+        container  = cosmosDbContainer(endpoint, key, databaseName, containerName, throttleRetries= False)
         
-        currentUtcDateTime = datetime.utcnow()
-        date = currentUtcDateTime.strftime("%Y%m%d")
+        # Status of large runs comes as a reference to the payload store
         
-        # Get current run info
+        runStatus = loadPayload(runStatus)
+        
+        rateController = None
+        
+        if os.environ["CosmosDB_ServerlessMode"].lower() != "true":
+            rateController = getRuRateController(containerName)
+        
+        # Upload batches and SaveDroppedRepos wrote the detail documents of the repos
+        # Upsert makes a retried update overwrite the documents it wrote earlier
         
         itemId = runStatus["id"]
         
-        runinfo = container.read_item(item= str(itemId), partition_key= date)
+        # Profile of the run is saved along with the detail documents, in the same partition
+        
+        profileDocuments = []
         
-        # Update runinfo with status
+        if runStatus.get("profile") is not None:
+            profileDocuments.append(createRunProfileDocument(itemId, runStatus["profile"]))
         
-        runinfo["totalReceived"] = runStatus["totalReceived"]
-        runinfo["totalProcessed"] = runStatus["totalProcessed"]
-        runinfo["totalCreatedCount"] = runStatus["totalCreatedCount"]
-        runinfo["totalFailedCount"] = runStatus["totalFailedCount"]
-        runinfo["createdList"] = ""
-        runinfo["failedList"] = ""
+        detailStatuses = bulkUpsertItems(container, profileDocuments, rateController= rateController)
+        failedDetailStatuses = [detailStatus for detailStatus in detailStatuses if not detailStatus["success"]]
         
-        container.replace_item(item=runinfo, body=runinfo)
+        if len(failedDetailStatuses) > 0:
+            raise Exception("Unable to write " + str(len(failedDetailStatuses)) + " run detail documents")
         
-        time.sleep(1)
+        # Update the run info document with the totals and number of detail documents, its size doesn't grow with the repos
         
-        createdRepos = runStatus["createdList"].split(',')
-        createdReposPartitonedForThrottling =  partitionDataForThrottling(createdRepos)
+        runSummary = createRunSummaryDocument(itemId, 
+                                              runStatus, 
+                                              runStatus["createdDocumentCount"], 
+                                              runStatus["failedDocumentCount"], 
+                                              runStatus["unchangedDocumentCount"])
         
-        failedRepos = runStatus["failedList"]
-        failedReposPartitonedForThrottling =  partitionDataForThrottling(failedRepos)
+        summaryStatus = pacedCosmosOperation(rateController,
+                                             lambda captureResponse: container.upsert_item(runSummary, response_hook= captureResponse),
+                                             len(json.dumps(runSummary).encode('utf-8')),
+                                             containerName)
         
-        for createdReposList in createdReposPartitonedForThrottling:
-             runinfo["createdList"] += ",".join(createdReposList)
-             container.replace_item(item=runinfo, body=runinfo)
-             time.sleep(1)
-             
-               
-        for failedReposList in failedReposPartitonedForThrottling:
-            runinfo["failedList"] += ",".join(failedReposList)
-            container.replace_item(item=runinfo, body=runinfo)
-            time.sleep(1)
+        if not summaryStatus["success"]:
+            raise Exception("Unable to update run info, status " + str(summaryStatus["statusCode"]))
             
         return "Updated current run info status"
         
@@ -1,25 +1,38 @@
 import logging
 import os
-import time
-import azure.cosmos.cosmos_client as cosmos_client
 
-from typing import List
+from typing import Dict, List
 from Helpers.SendEmails import sendEmail
-from Helpers.CosmosDBClient import cosmosDbContainer, partitionDataForThrottling
+from Helpers.CosmosDBClient import cosmosDbContainer
+from Helpers.CosmosRateController import getRuRateController
+from Helpers.CosmosBulkWriter import bulkUpsertItems, summarizeItemStatuses
+from Helpers.PayloadStore import loadPayload, storePayload
+from Helpers.RepoStatsBatch import expandRepoStatsBatch
+from Helpers.RunInfoStore import createRunDetailDocuments, runDetailBatchKey
+from Helpers.RunReport import mergeRunSummaries
+from Helpers.Telemetry import timedSpan
+from Helpers.WriteIndex import isDiffWritesEnabled, readWriteIndex, splitChangedStats, createWriteIndexEntries
 
-def main(ghStats: List) -> List:
+def main(ghStats: Dict) -> Dict:
     """
-    Takes in a list of repo stats that come after parsing the graphql results 
-    Returns list of dicts containing the status of uploading to cosmos DB
+    Takes in a batch of repo stats that come after parsing the graphql results 
+    Returns list of dicts containing the status of uploading to cosmos DB along with their summary
 
         Parameters
-            ghStats (List) - List of repo stats that come after parsing the graphql results 
+            ghStats (Dict) - Batch of repo stats that come after parsing the graphql results, can be a reference to the payload store
             
         Returns
-            List of dicts containing the status of uploading to cosmos DB
+            Dict containing list of dicts with the status of uploading to cosmos DB, which can be a reference to the payload store,
+            and their summary, which holds counts and a sample of failed repos, so lanes add it to their totals without loading the list
     """
 
     try:
+        # Parsed results of large batches come as a reference to the payload store
+        # Batches are expanded to documents only here, where they are written
+
+        statsBatch = loadPayload(ghStats)
+        ghStats = expandRepoStatsBatch(statsBatch)
+
         # Check if cosnmos db is in serverless mode 
         # so we can process all data at once without worrying about throughput
         
@@ -30,26 +43,20 @@ def main(ghStats: List) -> List:
         if isCosmoDbInServerlessMode == "true":
             if(len(ghStats) > 0):
                 uploadedResults = createCosmosDBItem(ghStats)
-                return uploadedResults
+                writeRunDetails(uploadedResults, statsBatch["runId"], statsBatch["repos"])
             
-        # If cosmos DB not in serverless mode make requests as per provisioned throughput
+        # If cosmos DB not in serverless mode pace the writes to the provisioned throughput
+        # The rate controller learns RU per write from the charges Cosmos DB reports and backs off when throttled
         
         else:
-            # Partition data for Cosmos DB throttling
-            
-            ghStatsPartionedForThrottling = partitionDataForThrottling(ghStats)
-         
-            # Process the data chunks each one by  one
-            # Call the create function below and add status to list
-            # Cooldown for a second before sending next chunk of data
-            
-            for ghStats in ghStatsPartionedForThrottling:
-                result = createCosmosDBItem(ghStats)
-                uploadedResults.append(result)
-                
-                time.sleep(1)
+            rateController = getRuRateController(os.environ["CosmosDB_DataContainerName"])
+            uploadedResults = createCosmosDBItem(ghStats, rateController)
+            writeRunDetails(uploadedResults, statsBatch["runId"], statsBatch["repos"], True)
                 
-        return uploadedResults
+        return {
+            "uploadResults": storePayload(uploadedResults),
+            "summary": mergeRunSummaries(uploadedResults)
+        }
 
     except:
         # Log error and send email in case of exception
@@ -61,43 +68,136 @@ def main(ghStats: List) -> List:
         raise
 
 
-def createCosmosDBItem(ghStats: List) -> List :
+def createCosmosDBItem(ghStats: List, rateController: Dict = None) -> List :
+    """
+    Takes in a list of repo stats
+    Writes them to Cosmos DB data container with 'CosmosDB_WriteConcurrency' writes in flight
+    With diff writes enabled only repos whose stats changed since their last full document are written
+    Returns list of dicts containing the status of uploading to cosmos DB
+
+        Parameters
+            ghStats (List) - List of repo stats to write
+            rateController (Dict) - RU rate controller pacing the writes, None in serverless mode
+            
+        Returns
+            List of dicts containing the status of uploading to cosmos DB
+    """
     
     uploadResults = []
-    uploadedCount = 0;
-    createdList = []
-    failedList = []
 
     if(len(ghStats) > 0):
         
-        # Create an instance of cosmos DB client and create items
+        # Create an instance of cosmos DB client and upsert items
+        # Upsert makes a retried upload overwrite the items it created earlier instead of failing on them
+
         endpoint = os.environ["CosmosDB_Endpoint"]
         key = os.environ["CosmosDB_PrimaryKey"]
         databaseName = os.environ["CosmosDB_DBName"]
         containerName = os.environ["CosmosDB_DataContainerName"]
-        container  = cosmosDbContainer(endpoint, key, databaseName, containerName)
+        container  = cosmosDbContainer(endpoint, key, databaseName, containerName, throttleRetries= False)
 
-        # If item is created successfully add it to created list
-        # Else add it to failed list in case of exception 
+        # If item is written successfully it is added to created list
+        # Else it is added to failed list 
         # Create a dict of status and append to list for sending report
         
-        for index, repostat in enumerate(ghStats):
-            try:
-                result = container.create_item(repostat)
-                uploadedCount = index + 1
-                createdList.append(result["repo"])
-
-            except:
-                failedList.append(repostat["repo"])
-
-        uploadResults.append({
-            "success": True if len(ghStats) % len(createdList) == 0 else False,
-            "received": len(ghStats),
-            "processed": uploadedCount,
-            "createdCount": len(createdList),
-            "failedCount": len(failedList),
-            "createdList": createdList,
-            "failedList": failedList
-        })
-
-    return uploadResults
\ No newline at end of file
+        # Each write is measured on its own, the span covers the whole batch
+
+        with timedSpan("cosmos.upload", {"container": containerName, "documents": len(ghStats)}) as span:
+            if isDiffWritesEnabled():
+                uploadResult = writeChangedStats(ghStats, container, rateController)
+
+            else:
+                itemStatuses = bulkUpsertItems(container, ghStats, rateController= rateController)
+                uploadResult = summarizeItemStatuses(itemStatuses)
+
+            span["requestCharge"] = uploadResult["requestCharge"]
+            span["throttledCount"] = uploadResult["throttledCount"]
+            span["failedCount"] = uploadResult["failedCount"]
+
+        uploadResults.append(uploadResult)
+
+    return uploadResults
+
+
+def writeChangedStats(ghStats: List, container, rateController: Dict = None) -> Dict:
+    """
+    Takes in a list of repo stats, the data container and the rate controller pacing its writes
+    Writes full documents only for repos whose stats changed and records them in the write index
+    Returns the status of uploading to cosmos DB, with the unchanged repos and the run of their last full document
+
+        Parameters
+            ghStats (List) - List of repo stats to write
+            container (ContainerProxy) - Data container
+            rateController (Dict) - RU rate controller pacing the writes, None in serverless mode
+
+        Returns
+            Dict containing the status of uploading to cosmos DB
+    """
+
+    runInfoContainerName = os.environ["CosmosDB_RunInfoContainerName"]
+    runInfoContainer = cosmosDbContainer(os.environ["CosmosDB_Endpoint"], os.environ["CosmosDB_PrimaryKey"], os.environ["CosmosDB_DBName"], runInfoContainerName)
+
+    # Index is read with SDK throttle retries, index writes go through the bulk writer which retries and paces them itself
+
+    statsSplit = splitChangedStats(ghStats, readWriteIndex(runInfoContainer, [repoStats["repo"] for repoStats in ghStats]))
+    runInfoContainer = cosmosDbContainer(os.environ["CosmosDB_Endpoint"], os.environ["CosmosDB_PrimaryKey"], os.environ["CosmosDB_DBName"], runInfoContainerName, throttleRetries= False)
+
+    itemStatuses = bulkUpsertItems(container, statsSplit["changedStats"], rateController= rateController)
+
+    # Index only the documents that were written, a repo missing from the index is written in full next run
+
+    writtenStats = [itemStatus["item"] for itemStatus in itemStatuses if itemStatus["success"]]
+
+    indexStatuses = bulkUpsertItems(runInfoContainer, 
+                                    createWriteIndexEntries(writtenStats, statsSplit["hashes"]), 
+                                    rateController= None if rateController is None else getRuRateController(runInfoContainerName))
+
+    failedIndexCount = len([indexStatus for indexStatus in indexStatuses if not indexStatus["success"]])
+
+    if failedIndexCount > 0:
+        logging.error("Error- Unable to update write index for " + str(failedIndexCount) + " repos")
+
+    uploadResult = summarizeItemStatuses(itemStatuses)
+
+    uploadResult["received"] += len(statsSplit["unchangedList"])
+    uploadResult["processed"] += len(statsSplit["unchangedList"])
+    uploadResult["unchangedCount"] = len(statsSplit["unchangedList"])
+    uploadResult["unchangedList"] = statsSplit["unchangedList"]
+    uploadResult["requestCharge"] += sum(indexStatus["requestCharge"] for indexStatus in indexStatuses)
+
+    return uploadResult
+
+
+def writeRunDetails(uploadResults: List, runId: int, repos: List, paced: bool = False):
+    """
+    Takes in the upload results of a batch, current run id and the repos of the batch
+    Writes the created, failed and unchanged repos of the batch to run detail documents in run info container
+    and adds the number of documents written per status to the upload results, so the run summary only needs counts
+
+        Parameters
+            uploadResults (List) - Upload results of the batch, updated in place
+            runId (int) - Current run id
+            repos (List) - Repos of the batch, identify its detail documents
+            paced (bool) - Whether to pace the writes to the provisioned throughput of run info container
+    """
+
+    runInfoContainerName = os.environ["CosmosDB_RunInfoContainerName"]
+    runInfoContainer = cosmosDbContainer(os.environ["CosmosDB_Endpoint"], os.environ["CosmosDB_PrimaryKey"], os.environ["CosmosDB_DBName"], runInfoContainerName, throttleRetries= False)
+
+    batchKey = runDetailBatchKey(repos)
+    detailDocuments = []
+
+    for uploadResult in uploadResults:
+        for status in ["created", "failed", "unchanged"]:
+            statusDocuments = createRunDetailDocuments(runId, status, uploadResult.get(status + "List", []), batchKey)
+
+            uploadResult[status + "DocumentCount"] = len(statusDocuments)
+            detailDocuments.extend(statusDocuments)
+
+    detailStatuses = bulkUpsertItems(runInfoContainer, detailDocuments, rateController= getRuRateController(runInfoContainerName) if paced else None)
+    failedDetailStatuses = [detailStatus for detailStatus in detailStatuses if not detailStatus["success"]]
+
+    # Readers find the repos of the run only through detail documents, so a missing one fails the run like a failed run info update
+
+    if len(failedDetailStatuses) > 0:
+        raise Exception("Unable to write " + str(len(failedDetailStatuses)) + " run detail documents")
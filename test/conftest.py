@@ -0,0 +1,7 @@
+import os
+import sys
+
+
+# Functions import each other and the helpers from the function app root, as they do when the app runs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,72 @@
+import threading
+
+from Helpers import ClientRegistry
+from Helpers.ClientRegistry import getClient
+
+
+def test_getClient_creates_client_once():
+    createdClients = []
+
+    def createClient():
+        createdClients.append(object())
+        return createdClients[-1]
+
+    client = getClient("test", ("once",), createClient)
+
+    assert getClient("test", ("once",), createClient) is client
+    assert len(createdClients) == 1
+
+
+def test_getClient_allows_factories_to_get_other_clients():
+    # Container factories get the account client from the registry while being created
+
+    def createOuterClient():
+        return ("outer", getClient("test", ("inner",), lambda: "inner"))
+
+    createThread = threading.Thread(target= lambda: getClient("test", ("outer",), createOuterClient), daemon= True)
+    createThread.start()
+    createThread.join(timeout= 5)
+
+    assert not createThread.is_alive()
+    assert getClient("test", ("outer",), None) == ("outer", "inner")
+
+
+def test_getClient_keeps_first_registered_client_when_created_at_once():
+    startTogether = threading.Barrier(4)
+    clients = []
+
+    def createClient():
+        return object()
+
+    def getSharedClient():
+        startTogether.wait()
+        clients.append(getClient("test", ("shared",), createClient))
+
+    threads = [threading.Thread(target= getSharedClient) for index in range(4)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert all(client is clients[0] for client in clients)
+    assert ClientRegistry.registeredClients
+
+
+def test_getCosmosClient_turns_off_throttle_retries_for_paced_writes(monkeypatch):
+    # Paced writes retry 429s themselves, the SDK must not retry them first
+
+    createdClients = []
+
+    def createCosmosClient(endpoint, key, **kwargs):
+        createdClients.append(kwargs)
+        return kwargs
+
+    monkeypatch.setattr(ClientRegistry.cosmos_client, "CosmosClient", createCosmosClient)
+
+    ClientRegistry.getCosmosClient("https://paced.local:443/", "key", throttleRetries= False)
+    ClientRegistry.getCosmosClient("https://paced.local:443/", "key")
+
+    assert createdClients[0]["connection_policy"].RetryOptions.MaxRetryAttemptCount == 0
+    assert createdClients[1] == {}
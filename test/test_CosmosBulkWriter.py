@@ -0,0 +1,71 @@
+import os
+
+from types import SimpleNamespace
+from azure.cosmos import documents
+from azure.cosmos.exceptions import CosmosHttpResponseError
+from Helpers.CosmosBulkWriter import bulkUpsertItems, summarizeItemStatuses, hasSdkThrottleRetries
+from Helpers.CosmosRateController import newRuRateController
+
+
+class ThrottlingContainer:
+    """
+    Container that throttles (429) the first writes of each item, like Cosmos DB does for a client without SDK throttle retries
+    """
+
+    def __init__(self, throttlesPerItem: int):
+        self.id = "stats"
+        self.throttlesPerItem = throttlesPerItem
+        self.attempts = {}
+        self.items = {}
+
+    def upsert_item(self, body, response_hook= None, **kwargs):
+        self.attempts[body["id"]] = self.attempts.get(body["id"], 0) + 1
+
+        if self.attempts[body["id"]] <= self.throttlesPerItem:
+            error = CosmosHttpResponseError(status_code= 429, message= "Request rate is large")
+            error.headers = {"x-ms-retry-after-ms": "1", "x-ms-request-charge": "0"}
+            raise error
+
+        self.items[body["id"]] = body
+        response_hook({"x-ms-request-charge": "5"}, body)
+
+        return body
+
+
+def test_bulkUpsertItems_reports_each_throttle_to_the_rate_controller(monkeypatch):
+    monkeypatch.setitem(os.environ, "CosmosDB_ProvisionedThroughput", "1000")
+
+    container = ThrottlingContainer(throttlesPerItem= 2)
+    controller = newRuRateController()
+    items = [{"id": "repo" + str(index), "repo": "org/repo" + str(index)} for index in range(3)]
+
+    uploadResult = summarizeItemStatuses(bulkUpsertItems(container, items, concurrency= 1, rateController= controller))
+
+    assert uploadResult["createdCount"] == 3
+    assert uploadResult["throttledCount"] == 6
+    assert controller["throttledCount"] == 6
+    assert controller["targetRuPerSecond"] < controller["maxRuPerSecond"]
+
+
+def test_bulkUpsertItems_fails_items_throttled_past_the_retry_limit(monkeypatch):
+    monkeypatch.setitem(os.environ, "CosmosDB_MaxThrottleRetries", "1")
+
+    container = ThrottlingContainer(throttlesPerItem= 5)
+
+    uploadResult = summarizeItemStatuses(bulkUpsertItems(container, [{"id": "repo", "repo": "org/repo"}]))
+
+    assert uploadResult["failedList"] == ["org/repo"]
+    assert uploadResult["failureReasons"] == {"COSMOS_429": 1}
+
+
+def test_hasSdkThrottleRetries_reads_the_retry_options_of_the_client():
+    connectionPolicy = documents.ConnectionPolicy()
+    retryingContainer = SimpleNamespace(client_connection= SimpleNamespace(connection_policy= connectionPolicy))
+
+    connectionPolicy = documents.ConnectionPolicy()
+    connectionPolicy.RetryOptions = documents.RetryOptions(max_retry_attempt_count= 0)
+    pacedContainer = SimpleNamespace(client_connection= SimpleNamespace(connection_policy= connectionPolicy))
+
+    assert hasSdkThrottleRetries(retryingContainer)
+    assert not hasSdkThrottleRetries(pacedContainer)
+    assert not hasSdkThrottleRetries(ThrottlingContainer(0))
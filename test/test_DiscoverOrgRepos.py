@@ -0,0 +1,25 @@
+from graphql import parse
+from DiscoverOrgRepos import createDiscoveryQuery
+
+
+def test_createDiscoveryQuery_passes_logins_and_cursors_as_variables():
+    orgs = [{"orgName": 'quote"org', "cursor": None}, {"orgName": "other-org", "cursor": "Y3Vyc29yOjEwMA=="}]
+
+    discoveryQuery = createDiscoveryQuery(orgs)
+
+    parse(discoveryQuery["query"])
+
+    assert 'quote"org' not in discoveryQuery["query"]
+    assert discoveryQuery["variables"] == {
+        "login0": 'quote"org',
+        "after0": None,
+        "login1": "other-org",
+        "after1": "Y3Vyc29yOjEwMA=="
+    }
+
+
+def test_createDiscoveryQuery_text_only_depends_on_number_of_orgs():
+    firstPage = createDiscoveryQuery([{"orgName": "first", "cursor": None}])
+    nextPage = createDiscoveryQuery([{"orgName": "second", "cursor": "Y3Vyc29y"}])
+
+    assert firstPage["query"] is nextPage["query"]
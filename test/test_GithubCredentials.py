@@ -0,0 +1,83 @@
+import os
+import time
+import pytest
+
+from datetime import datetime, timedelta
+from Helpers import GithubCredentials
+from Helpers.GithubCredentials import githubCredentialIds, getGithubToken, githubTokens
+from Helpers.RateGovernor import githubTokenId
+
+
+def setCredentials(monkeypatch, tokens= "", token= "", installationIds= ""):
+    monkeypatch.setitem(os.environ, "Github_Tokens", tokens)
+    monkeypatch.setitem(os.environ, "Github_Token", token)
+    monkeypatch.setitem(os.environ, "Github_AppInstallationIds", installationIds)
+
+
+def test_githubTokens_reads_csv_and_falls_back_to_single_token(monkeypatch):
+    setCredentials(monkeypatch, tokens= " first, second ,,", token= "single")
+
+    assert githubTokens() == ["first", "second"]
+
+    setCredentials(monkeypatch, tokens= " ", token= "single")
+
+    assert githubTokens() == ["single"]
+
+
+def test_githubCredentialIds_pools_tokens_and_app_installations(monkeypatch):
+    setCredentials(monkeypatch, tokens= "first,second", installationIds= "11, 12")
+
+    credentialIds = githubCredentialIds()
+
+    assert credentialIds == [githubTokenId("first"), githubTokenId("second"), "app-11", "app-12"]
+    assert "first" not in credentialIds[0]
+    assert getGithubToken(credentialIds[1]) == "second"
+
+    with pytest.raises(KeyError):
+        getGithubToken(githubTokenId("removed"))
+
+
+def test_githubCredentialIds_raises_without_credentials(monkeypatch):
+    setCredentials(monkeypatch)
+
+    with pytest.raises(ValueError, match= "No github credential configured"):
+        githubCredentialIds()
+
+
+class FakeGithubIntegration:
+    """
+    Github app integration handing out installation tokens that expire after the given time
+    """
+
+    issuedTokens = []
+
+    def __init__(self, appId, privateKey):
+        self.expiresIn = timedelta(hours= 1)
+
+    def get_access_token(self, installationId):
+        FakeGithubIntegration.issuedTokens.append(installationId)
+
+        authorization = type("Authorization", (), {})()
+        authorization.token = "token-" + str(len(FakeGithubIntegration.issuedTokens))
+        authorization.expires_at = datetime.utcnow() + self.expiresIn
+
+        return authorization
+
+
+def test_getInstallationToken_caches_tokens_until_they_are_about_to_expire(monkeypatch):
+    monkeypatch.setitem(os.environ, "Github_AppId", "1001")
+    monkeypatch.setitem(os.environ, "Github_AppPrivateKey", "test-key-caching")
+    monkeypatch.setattr(GithubCredentials, "GithubIntegration", FakeGithubIntegration)
+    monkeypatch.setattr(GithubCredentials, "installationTokens", {})
+    FakeGithubIntegration.issuedTokens = []
+
+    assert getGithubToken("app-11") == "token-1"
+    assert getGithubToken("app-11") == "token-1"
+    assert getGithubToken("app-12") == "token-2"
+
+    # Tokens within 5 minutes of expiry are refreshed
+
+    GithubCredentials.installationTokens["11"]["expiresAt"] = time.time() + 60
+
+    assert getGithubToken("app-11") == "token-3"
+    assert FakeGithubIntegration.issuedTokens == [11, 12, 11]
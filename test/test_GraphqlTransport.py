@@ -0,0 +1,124 @@
+import asyncio
+import os
+import socket
+import threading
+import pytest
+
+import ExecuteGraphqlQuery
+
+from Benchmarks.FakeGithubServer import newFakeGithubSettings, startFakeGithubServer
+from CreateGraphqlQuery import main as createStatsQuery
+from Helpers.GraphqlTransport import postGraphql, postGraphqlAsync, createGraphqlResult
+from ExecuteGraphqlQuery import isTimeout, getRetryAfterSeconds, executeGraphqlQuery
+from Helpers.QueryRetry import planRetry
+from Helpers.RateGovernor import githubTokenId
+
+
+@pytest.fixture(params= ["requests", "httpx"])
+def transport(request, monkeypatch):
+    monkeypatch.setenv("Github_Transport", request.param)
+    return request.param
+
+
+def startServer(**settings):
+    fakeGithub = startFakeGithubServer(newFakeGithubSettings(baseLatencyMs= 0, perRepoLatencyMs= 0, **settings))
+    return fakeGithub
+
+
+def test_postGraphql_returns_data_and_response_size(transport):
+    fakeGithub = startServer()
+    query = createStatsQuery(["octokit/octokit.rb", "octokit/octokit.net"])
+
+    response = postGraphql(fakeGithub["url"], "token", query["query"], query["variables"])
+
+    assert response["result"]["data"]["r0"]["nameWithOwner"] == "octokit/octokit.rb"
+    assert response["result"]["data"]["r1"]["nameWithOwner"] == "octokit/octokit.net"
+    assert response["responseBytes"] > 0
+
+    fakeGithub["server"].shutdown()
+
+
+def test_postGraphqlAsync_runs_queries_at_once(transport):
+    fakeGithub = startServer()
+    query = createStatsQuery(["octokit/octokit.rb"])
+
+    async def postQueries():
+        return await asyncio.gather(*[postGraphqlAsync(fakeGithub["url"], "token", query["query"], query["variables"]) for index in range(4)])
+
+    responses = asyncio.run(postQueries())
+
+    assert all(response["result"]["data"]["r0"]["nameWithOwner"] == "octokit/octokit.rb" for response in responses)
+    assert fakeGithub["counters"]["requests"] == 4
+
+    fakeGithub["server"].shutdown()
+
+
+def test_http_errors_are_returned_as_graphql_errors(transport):
+    fakeGithub = startServer(error429Rate= 1, retryAfterSeconds= 7)
+    query = createStatsQuery(["octokit/octokit.rb"])
+
+    result = postGraphql(fakeGithub["url"], "token", query["query"], query["variables"])["result"]
+
+    assert result["errors"][0]["status"] == 429
+    assert getRetryAfterSeconds(result) == 7
+
+    fakeGithub["server"].shutdown()
+
+
+def test_slow_queries_are_returned_as_timeouts(transport, monkeypatch):
+    monkeypatch.setenv("Github_RequestTimeoutSeconds", "0.2")
+
+    fakeGithub = startFakeGithubServer(newFakeGithubSettings(baseLatencyMs= 1000))
+    query = createStatsQuery(["octokit/octokit.rb"])
+
+    result = postGraphql(fakeGithub["url"], "token", query["query"], query["variables"])["result"]
+
+    assert isTimeout(result)
+
+    fakeGithub["server"].shutdown()
+
+
+def test_createGraphqlResult_lower_cases_headers():
+    result = createGraphqlResult(502, {"Retry-After": "3"}, b"")
+
+    assert result["errors"][0]["headers"] == {"retry-after": "3"}
+    assert isTimeout(result)
+
+
+def startDroppingServer():
+    """
+    Starts a server that accepts connections and closes them without answering
+    Returns its url
+    """
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+
+    def dropConnections():
+        while True:
+            connection, address = listener.accept()
+            connection.recv(65536)
+            connection.close()
+
+    threading.Thread(target= dropConnections, daemon= True).start()
+
+    return "http://127.0.0.1:" + str(listener.getsockname()[1]) + "/graphql"
+
+
+def test_dropped_connections_are_returned_as_failed_queries(transport, monkeypatch):
+    monkeypatch.setitem(os.environ, "Github_Tokens", "token")
+    monkeypatch.setitem(os.environ, "Github_GraphqlUrl", startDroppingServer())
+    monkeypatch.setattr(ExecuteGraphqlQuery, "sendEmail", lambda text: pytest.fail("Email sent for a dropped connection"))
+
+    repos = ["octokit/octokit.rb", "octokit/octokit.net"]
+    query = dict(createStatsQuery(repos), credentialId= githubTokenId("token"))
+
+    for queryResult in [executeGraphqlQuery(query), asyncio.run(ExecuteGraphqlQuery.main(query))]:
+        assert queryResult["executionFailed"]
+        assert not queryResult["timedOut"]
+        assert queryResult["failedAliases"] == []
+
+        # The lane splits the batch instead of failing
+
+        assert planRetry(repos, queryResult, {})["batchesToRetry"] == [repos[:1], repos[1:]]
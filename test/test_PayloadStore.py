@@ -0,0 +1,26 @@
+import os
+import time
+
+from Helpers.PayloadStore import storePayload, loadPayload, deleteExpiredPayloads, isPayloadReference
+
+
+def test_deleteExpiredPayloads_keeps_payloads_within_retention(monkeypatch, tmp_path):
+    monkeypatch.setitem(os.environ, "PayloadStore_Type", "local")
+    monkeypatch.setitem(os.environ, "PayloadStore_LocalPath", str(tmp_path))
+    monkeypatch.setitem(os.environ, "PayloadStore_ThresholdBytes", "10")
+
+    oldReference = storePayload({"repos": ["org/old"] * 10})
+    newReference = storePayload({"repos": ["org/new"] * 10})
+
+    assert isPayloadReference(oldReference) and isPayloadReference(newReference)
+
+    # Loading a payload doesn't delete it, a replay loads it again
+
+    assert loadPayload(oldReference) == loadPayload(oldReference)
+
+    threeDaysAgo = time.time() - 3 * 86400
+    os.utime(tmp_path / oldReference["claimCheck"]["name"], (threeDaysAgo, threeDaysAgo))
+
+    assert deleteExpiredPayloads(48) == 1
+    assert not (tmp_path / oldReference["claimCheck"]["name"]).exists()
+    assert loadPayload(newReference) == {"repos": ["org/new"] * 10}
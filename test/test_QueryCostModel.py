@@ -0,0 +1,65 @@
+import os
+
+from Helpers.QueryCostModel import defaultQueryCostModel, nextBatchSize, updateQueryCostModel, mergeQueryCostModels
+
+
+def setBatchSettings(monkeypatch):
+    monkeypatch.setitem(os.environ, "NumberOfReposToQueryPerCall", "20")
+    monkeypatch.setitem(os.environ, "MinNumberOfReposToQueryPerCall", "1")
+    monkeypatch.setitem(os.environ, "MaxNumberOfReposToQueryPerCall", "100")
+    monkeypatch.setitem(os.environ, "GraphqlQueryTargetSeconds", "6")
+
+
+def test_defaultQueryCostModel_starts_at_the_configured_batch_size(monkeypatch):
+    setBatchSettings(monkeypatch)
+
+    assert nextBatchSize(defaultQueryCostModel(), {}, 1000) == 20
+
+
+def test_nextBatchSize_converges_to_the_target_time(monkeypatch):
+    setBatchSettings(monkeypatch)
+
+    # Github takes 0.1 seconds per repo, so 55 repos fit in the target after the overhead
+
+    costModel = defaultQueryCostModel()
+
+    for _ in range(30):
+        batchSize = nextBatchSize(costModel, {}, 1000)
+        costModel = updateQueryCostModel(costModel, batchSize, batchSize, 0.5 + 0.1 * batchSize, False)
+
+    assert nextBatchSize(costModel, {}, 1000) in (54, 55)
+    assert abs(costModel["pointsPerRepo"] - 1.0) < 0.01
+    assert costModel["samples"] == 30
+
+
+def test_nextBatchSize_limits(monkeypatch):
+    setBatchSettings(monkeypatch)
+
+    costModel = {"pointsPerRepo": 1.0, "secondsPerRepo": 0.01, "overheadSeconds": 0.5, "samples": 1}
+
+    assert nextBatchSize(costModel, {}, 1000) == 100
+    assert nextBatchSize(costModel, {"remaining": 7}, 1000) == 7
+    assert nextBatchSize(costModel, {"remaining": 0}, 1000) == 1
+    assert nextBatchSize(costModel, {}, 3) == 3
+
+
+def test_updateQueryCostModel_halves_the_batch_on_failure(monkeypatch):
+    setBatchSettings(monkeypatch)
+
+    costModel = defaultQueryCostModel()
+    failedModel = updateQueryCostModel(costModel, 20, 0, 10, True)
+
+    assert nextBatchSize(failedModel, {}, 1000) == 10
+    assert failedModel["samples"] == costModel["samples"]
+
+
+def test_mergeQueryCostModels_weighs_by_samples():
+    mergedModel = mergeQueryCostModels([
+        {"pointsPerRepo": 1.0, "secondsPerRepo": 0.1, "overheadSeconds": 0.5, "samples": 3},
+        {"pointsPerRepo": 2.0, "secondsPerRepo": 0.5, "overheadSeconds": 0.5, "samples": 1},
+        {"pointsPerRepo": 9.0, "secondsPerRepo": 9.0, "overheadSeconds": 0.5, "samples": 0}
+    ])
+
+    assert mergedModel["pointsPerRepo"] == 1.25
+    assert abs(mergedModel["secondsPerRepo"] - 0.2) < 1e-9
+    assert mergedModel["samples"] == 4
@@ -0,0 +1,48 @@
+import os
+
+from Helpers.QueryRetry import planRetry
+
+
+def queryResult(executionFailed= False, retryAfterSeconds= 0, timedOut= False, failedAliases= None):
+    return {
+        "executionFailed": executionFailed,
+        "retryAfterSeconds": retryAfterSeconds,
+        "timedOut": timedOut,
+        "failedAliases": failedAliases or []
+    }
+
+
+def test_planRetry_bisects_failed_batches():
+    retryPlan = planRetry(["a/1", "a/2", "a/3"], queryResult(executionFailed= True), {})
+
+    assert retryPlan == {"batchesToRetry": [["a/1"], ["a/2", "a/3"]], "droppedRepos": []}
+
+
+def test_planRetry_retries_rate_limited_batches_as_is():
+    retryCounts = {}
+    retryPlan = planRetry(["a/1", "a/2"], queryResult(executionFailed= True, retryAfterSeconds= 60), retryCounts)
+
+    assert retryPlan["batchesToRetry"] == [["a/1", "a/2"]]
+    assert retryCounts == {}
+
+
+def test_planRetry_drops_single_repos_out_of_retry_budget(monkeypatch):
+    monkeypatch.setitem(os.environ, "Github_MaxRetriesPerRepo", "2")
+
+    retryCounts = {}
+    failedResult = queryResult(executionFailed= True, timedOut= True)
+
+    assert planRetry(["a/1"], failedResult, retryCounts)["batchesToRetry"] == [["a/1"]]
+    assert planRetry(["a/1"], failedResult, retryCounts)["batchesToRetry"] == [["a/1"]]
+    assert planRetry(["a/1"], failedResult, retryCounts) == {"batchesToRetry": [], "droppedRepos": [{"repo": "a/1", "reason": "TIMEOUT"}]}
+
+
+def test_planRetry_drops_not_found_and_retries_other_failed_aliases(monkeypatch):
+    monkeypatch.setitem(os.environ, "Github_MaxRetriesPerRepo", "3")
+
+    retryPlan = planRetry(["a/1", "a/2", "a/3"], queryResult(failedAliases= [
+        {"alias": "r0", "type": "NOT_FOUND"},
+        {"alias": "r2", "type": "SERVICE_UNAVAILABLE"}
+    ]), {})
+
+    assert retryPlan == {"batchesToRetry": [["a/3"]], "droppedRepos": [{"repo": "a/1", "reason": "NOT_FOUND"}]}
@@ -0,0 +1,149 @@
+import os
+
+from datetime import datetime, timezone
+from Helpers.RateGovernor import newGovernorState, acquireCapacity, releaseCapacity, reportRateLimit, waitForGithubCapacity
+from Helpers.RateGovernor import credentialHeadroom, retryBackoffSeconds
+
+
+class GovernorContext:
+    """
+    Orchestration context whose entity calls run on governor states kept in memory
+    Tasks are the results themselves, the test sends them back into the generator
+    """
+
+    def __init__(self, governorStates):
+        self.governorStates = governorStates
+        self.current_utc_datetime = datetime(2024, 1, 1)
+        self.signals = []
+
+    def call_entity(self, entityId, operationName, operationInput= None):
+        if operationName == "acquire":
+            return acquireCapacity(self.governorStates[entityId.key], operationInput)
+
+        return self.governorStates[entityId.key]
+
+    def signal_entity(self, entityId, operationName, operationInput= None):
+        self.signals.append((entityId.key, operationName))
+
+        if operationName == "release":
+            releaseCapacity(self.governorStates[entityId.key], operationInput)
+
+    def task_all(self, tasks):
+        return tasks
+
+    def create_timer(self, fireAt):
+        return None
+
+
+def runGenerator(generator):
+    result = None
+
+    try:
+        while True:
+            result = generator.send(result)
+
+    except StopIteration as stop:
+        return stop.value
+
+
+def test_acquireCapacity_makes_owners_wait_in_line_once_the_burst_is_spent(monkeypatch):
+    monkeypatch.setitem(os.environ, "Github_RequestBurstPerOwner", "2")
+    monkeypatch.setitem(os.environ, "Github_RequestsPerSecondPerOwner", "1")
+
+    state = newGovernorState()
+    request = {"owners": ["org"], "resource": "graphql", "cost": 1, "now": 0}
+
+    waits = [acquireCapacity(state, request)["waitSeconds"] for _ in range(4)]
+
+    assert waits == [0, 0, 1, 2]
+
+    # Tokens refill with time
+
+    assert acquireCapacity(state, dict(request, now= 10))["waitSeconds"] == 0
+
+
+def test_acquireCapacity_waits_for_reset_and_pauses(monkeypatch):
+    state = newGovernorState()
+    reportRateLimit(state, {"resource": "graphql", "rateLimit": {"remaining": 5, "resetAt": 100}, "now": 0})
+
+    acquireResult = acquireCapacity(state, {"owners": [], "resource": "graphql", "cost": 10, "now": 0})
+
+    assert acquireResult == {"waitSeconds": 100, "reservedPoints": 0}
+    assert state["resources"]["graphql"]["remaining"] == 5
+
+    # Secondary rate limits pause the credential, past the reset the points are unknown again
+
+    reportRateLimit(state, {"resource": "graphql", "retryAfterSeconds": 60, "now": 100})
+
+    assert acquireCapacity(state, {"owners": [], "resource": "graphql", "cost": 10, "now": 100})["waitSeconds"] == 60
+    assert state["resources"]["graphql"]["remaining"] is None
+
+
+def test_reportRateLimit_reads_iso_reset_times():
+    state = reportRateLimit(newGovernorState(), {"resource": "core", "rateLimit": {"remaining": 10, "resetAt": "1970-01-01T00:01:40Z"}, "now": 0})
+
+    assert state["resources"]["core"] == {"remaining": 10, "resetAt": 100}
+
+
+def test_credentialHeadroom(monkeypatch):
+    monkeypatch.setitem(os.environ, "Github_PointsPerHour", "5000")
+
+    state = newGovernorState()
+
+    assert credentialHeadroom(state, "graphql", 0) == 5000
+
+    reportRateLimit(state, {"resource": "graphql", "rateLimit": {"remaining": 42, "resetAt": 100}, "now": 0})
+
+    assert credentialHeadroom(state, "graphql", 0) == 42
+    assert credentialHeadroom(state, "graphql", 100) == 5000
+
+    reportRateLimit(state, {"resource": "graphql", "retryAfterSeconds": 30, "now": 0})
+
+    assert credentialHeadroom(state, "graphql", 10) == 0
+
+
+def test_retryBackoffSeconds_doubles_up_to_the_limit(monkeypatch):
+    monkeypatch.setitem(os.environ, "Github_RetryBackoffSeconds", "30")
+    monkeypatch.setitem(os.environ, "Github_MaxRetryBackoffSeconds", "600")
+
+    assert [retryBackoffSeconds(failures) for failures in range(1, 7)] == [30, 60, 120, 240, 480, 600]
+
+
+def test_releaseCapacity_gives_back_points_and_owner_tokens(monkeypatch):
+    monkeypatch.setitem(os.environ, "Github_RequestBurstPerOwner", "5")
+
+    state = newGovernorState()
+    reportRateLimit(state, {"resource": "graphql", "rateLimit": {"remaining": 100, "resetAt": 1000}, "now": 0})
+
+    acquireRequest = {"owners": ["org"], "resource": "graphql", "cost": 30, "now": 0}
+    acquireResult = acquireCapacity(state, acquireRequest)
+
+    assert acquireResult["reservedPoints"] == 30
+    assert state["resources"]["graphql"]["remaining"] == 70
+
+    releaseCapacity(state, dict(acquireRequest, reservedPoints= acquireResult["reservedPoints"]))
+
+    assert state["resources"]["graphql"]["remaining"] == 100
+    assert state["owners"]["org"]["tokens"] == 5
+
+
+def test_waitForGithubCapacity_releases_the_credential_it_switches_from(monkeypatch):
+    monkeypatch.setitem(os.environ, "Github_RequestBurstPerOwner", "1")
+    monkeypatch.setitem(os.environ, "Github_RequestsPerSecondPerOwner", "1")
+
+    governorStates = {"first": newGovernorState(), "second": newGovernorState()}
+    now = datetime(2024, 1, 1, tzinfo= timezone.utc).timestamp()
+
+    # First credential is paused by a secondary rate limit but still has points, it is charged for the owner on acquire
+
+    reportRateLimit(governorStates["first"], {"resource": "graphql", "rateLimit": {"remaining": 500, "resetAt": now + 3600}, "now": now})
+    reportRateLimit(governorStates["first"], {"resource": "graphql", "retryAfterSeconds": 60, "now": now})
+
+    context = GovernorContext(governorStates)
+
+    credentialId = runGenerator(waitForGithubCapacity(context, "first", ["first", "second"], ["org"], "graphql", 10))
+
+    assert credentialId == "second"
+    assert context.signals == [("first", "release")]
+    assert governorStates["first"]["resources"]["graphql"]["remaining"] == 500
+    assert governorStates["first"]["owners"]["org"]["tokens"] == 1
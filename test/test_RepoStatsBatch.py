@@ -0,0 +1,38 @@
+import json
+
+from Helpers.RepoStatsBatch import createRepoStatsBatch, expandRepoStatsBatch, repoStatsCount, flagBits
+
+
+def repoStats(repo, runId, stars, isArchived= False, isTemplate= False, repoUpdatedAt= "2021-01-19T20:44:18Z"):
+    return {
+        "id": repo.replace('/', '.') + "." + str(runId),
+        "repo": repo,
+        "isArchived": isArchived,
+        "isTemplate": isTemplate,
+        "repoUpdatedAt": repoUpdatedAt,
+        "openIssues": 1,
+        "closedIssues": 2,
+        "totalIssues": 3,
+        "openPRs": 4,
+        "closedPRs": 5,
+        "mergedPRs": 6,
+        "totalPRs": 15,
+        "stars": stars
+    }
+
+
+def test_expandRepoStatsBatch_round_trips_documents():
+    statsList = [
+        repoStats("octokit/octokit.rb", 1611127298, 10, isArchived= True),
+        repoStats("octokit/rest.js", 1611127298, 20, isTemplate= True, repoUpdatedAt= None),
+        dict(repoStats("github/docs", 1611127298, 30, isArchived= True, isTemplate= True), carriedForwardFromRunId= 1611040898)
+    ]
+
+    batch = createRepoStatsBatch(1611127298, statsList)
+
+    assert repoStatsCount(batch) == 3
+    assert batch["flags"] == [flagBits["isArchived"], flagBits["isTemplate"], flagBits["isArchived"] | flagBits["isTemplate"]]
+
+    # Batches pass through orchestration history as json
+
+    assert expandRepoStatsBatch(json.loads(json.dumps(batch))) == statsList
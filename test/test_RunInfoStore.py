@@ -0,0 +1,23 @@
+import os
+
+from Helpers.RunInfoStore import createLaneReposDocuments, readLaneRepos, runInfoDate
+
+
+class RunInfoContainer:
+
+    def __init__(self, documents):
+        self.documents = {(document["date"], document["id"]): document for document in documents}
+
+    def read_item(self, item, partition_key):
+        return self.documents[(partition_key, item)]
+
+
+def test_lane_repos_are_read_back_page_by_page(monkeypatch):
+    monkeypatch.setitem(os.environ, "RunInfo_ReposPerDetailDocument", "2")
+
+    laneDocuments = createLaneReposDocuments(1611127298, 1, ["a/1", "a/2", "a/3", "b/1", "b/2"])
+    container = RunInfoContainer(laneDocuments)
+
+    assert [laneDocument["id"] for laneDocument in laneDocuments] == ["1611127298.lane1.repos.0", "1611127298.lane1.repos.1", "1611127298.lane1.repos.2"]
+    assert all(laneDocument["date"] == runInfoDate(1611127298) for laneDocument in laneDocuments)
+    assert [readLaneRepos(container, 1611127298, 1, page) for page in range(len(laneDocuments))] == [["a/1", "a/2"], ["a/3", "b/1"], ["b/2"]]
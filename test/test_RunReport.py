@@ -0,0 +1,73 @@
+import os
+
+from Helpers.RunReport import newRunSummary, mergeRunSummary, mergeRunSummaries, droppedReposSummary, renderRunReport, runStatusFromSummary
+
+
+def uploadSummary(created, failed):
+    return {
+        "success": len(failed) == 0,
+        "received": len(created) + len(failed),
+        "processed": len(created) + len(failed),
+        "createdCount": len(created),
+        "failedCount": len(failed),
+        "failedList": failed,
+        "createdDocumentCount": 1,
+        "requestCharge": 10.0
+    }
+
+
+def test_mergeRunSummary_adds_counters_and_caps_failed_sample(monkeypatch):
+    monkeypatch.setitem(os.environ, "RunReport_MaxFailuresInEmail", "3")
+
+    runSummary = mergeRunSummaries([
+        uploadSummary(["a/1"], ["a/2", "a/3"]),
+        uploadSummary(["b/1", "b/2"], ["b/3", "b/4"]),
+        droppedReposSummary([{"repo": "c/1", "reason": "NOT_FOUND"}])
+    ])
+
+    assert runSummary["success"] is False
+    assert runSummary["received"] == 8
+    assert runSummary["processed"] == 7
+    assert runSummary["createdCount"] == 3
+    assert runSummary["failedCount"] == 5
+    assert runSummary["failedSample"] == ["a/2", "a/3", "b/3"]
+    assert runSummary["failureReasons"] == {"UPLOAD_FAILED": 4, "NOT_FOUND": 1}
+    assert runSummary["createdDocumentCount"] == 2
+    assert runSummary["requestCharge"] == 20.0
+
+
+def test_mergeRunSummary_is_associative(monkeypatch):
+    monkeypatch.setitem(os.environ, "RunReport_MaxFailuresInEmail", "20")
+
+    partialSummaries = [uploadSummary(["a/1"], ["a/2"]), uploadSummary([], ["b/1"]), uploadSummary(["c/1"], [])]
+
+    laneSummary = mergeRunSummaries(partialSummaries[:2])
+
+    assert mergeRunSummary(mergeRunSummary(newRunSummary(), laneSummary), partialSummaries[2]) == mergeRunSummaries(partialSummaries)
+
+
+def test_droppedReposSummary():
+    droppedSummary = droppedReposSummary([{"repo": "a/1", "reason": "NOT_FOUND"}, {"repo": "a/2", "reason": "TIMEOUT"}])
+
+    assert droppedSummary["failedList"] == ["a/1 (NOT_FOUND)", "a/2 (TIMEOUT)"]
+    assert droppedSummary["failureReasons"] == {"NOT_FOUND": 1, "TIMEOUT": 1}
+    assert droppedReposSummary([])["success"] is True
+
+
+def test_renderRunReport_points_to_run_details_beyond_the_sample(monkeypatch):
+    monkeypatch.setitem(os.environ, "RunReport_MaxFailuresInEmail", "1")
+
+    runSummary = mergeRunSummaries([uploadSummary(["a/1"], ["a/2", "a/3"])])
+    report = renderRunReport(runSummary, 1611127298)
+
+    assert "Failed List: a/2 and 1 more" in report
+    assert "documents 1611127298.failed.*" in report
+
+
+def test_runStatusFromSummary():
+    runStatus = runStatusFromSummary(mergeRunSummaries([uploadSummary(["a/1"], ["a/2"])]))
+
+    assert runStatus["totalReceived"] == 2
+    assert runStatus["totalCreatedCount"] == 1
+    assert runStatus["totalFailedCount"] == 1
+    assert runStatus["createdDocumentCount"] == 1
@@ -0,0 +1,100 @@
+import os
+import numpy as np
+
+from Helpers import SnapshotStore
+from Helpers.RepoStatsBatch import createRepoStatsBatch, encodeTimestamp
+from Helpers.SnapshotStore import createSnapshotFromBatches, saveSnapshot, loadSnapshot, listSnapshotRunIds
+from Helpers.SnapshotStore import loadRepoDictionary, saveRepoDictionary, saveSnapshotPart, listSnapshotParts, loadSnapshotPart
+from Helpers.SnapshotStore import deleteSnapshotFile, snapshotFileExists, snapshotColumns
+from test_RepoStatsBatch import repoStats
+
+
+def useLocalStore(monkeypatch, tmp_path):
+    monkeypatch.setitem(os.environ, "Snapshot_StoreType", "local")
+    monkeypatch.setitem(os.environ, "Snapshot_LocalPath", str(tmp_path))
+
+
+def test_snapshot_round_trips_through_the_local_store(monkeypatch, tmp_path):
+    useLocalStore(monkeypatch, tmp_path)
+
+    stats = [repoStats("b/2", 100, 20, isArchived= True), repoStats("a/1", 100, 10)]
+
+    repoDictionary = loadRepoDictionary()
+    snapshot = createSnapshotFromBatches([createRepoStatsBatch(100, stats)], repoDictionary)
+
+    saveRepoDictionary(repoDictionary)
+    saveSnapshot(100, snapshot)
+
+    loadedSnapshot = loadSnapshot(100)
+
+    assert listSnapshotRunIds() == [100]
+    assert loadRepoDictionary()["repos"] == ["b/2", "a/1"]
+    assert set(loadedSnapshot) == set(snapshotColumns) | {"repoId"}
+    assert loadedSnapshot["repoId"].tolist() == [0, 1]
+    assert loadedSnapshot["stars"].tolist() == [20, 10]
+    assert loadedSnapshot["isArchived"].tolist() == [True, False]
+
+
+def test_createSnapshotFromBatches_sorts_columns_by_repo_id():
+    stats = [repoStats("b/2", 100, 20, isTemplate= True), repoStats("a/1", 100, 10, repoUpdatedAt= None), repoStats("c/3", 100, 30)]
+    batches = [createRepoStatsBatch(100, stats[:1]), createRepoStatsBatch(100, stats[1:])]
+
+    repoDictionary = {"repos": ["c/3"], "repoIds": {"c/3": 0}}
+
+    snapshot = createSnapshotFromBatches(batches, repoDictionary)
+
+    assert repoDictionary["repos"] == ["c/3", "b/2", "a/1"]
+    assert snapshot["repoId"].tolist() == [0, 1, 2]
+    assert snapshot["stars"].tolist() == [30, 20, 10]
+    assert snapshot["isTemplate"].tolist() == [False, True, False]
+    assert snapshot["repoUpdatedAt"].tolist() == [encodeTimestamp("2021-01-19T20:44:18Z"), encodeTimestamp("2021-01-19T20:44:18Z"), 0]
+
+    for column, columnType in snapshotColumns.items():
+        assert snapshot[column].dtype == columnType
+
+
+def test_snapshot_parts_are_listed_per_run_and_deleted(monkeypatch, tmp_path):
+    useLocalStore(monkeypatch, tmp_path)
+
+    batch = createRepoStatsBatch(100, [repoStats("a/1", 100, 10)])
+
+    saveSnapshotPart(100, "b", batch)
+    saveSnapshotPart(100, "a", batch)
+    saveSnapshotPart(1000, "a", batch)
+
+    partNames = listSnapshotParts(100)
+
+    assert partNames == ["100.part.a.json.gz", "100.part.b.json.gz"]
+    assert loadSnapshotPart(partNames[0]) == batch
+
+    for partName in partNames:
+        deleteSnapshotFile(partName)
+
+    assert listSnapshotParts(100) == []
+    assert listSnapshotParts(1000) == ["1000.part.a.json.gz"]
+
+
+class PrefixBlobContainer:
+    """
+    Blob container that fails if the whole container is listed
+    """
+
+    def __init__(self, blobNames):
+        self.blobNames = blobNames
+
+    def list_blobs(self, name_starts_with= None):
+        assert name_starts_with, "Snapshot container listed without a prefix"
+
+        return [type("Blob", (), {"name": blobName})() for blobName in self.blobNames if blobName.startswith(name_starts_with)]
+
+    def get_blob_client(self, blobName):
+        return type("BlobClient", (), {"exists": lambda client: blobName in self.blobNames})()
+
+
+def test_blob_store_lookups_read_only_the_files_they_need(monkeypatch):
+    monkeypatch.setitem(os.environ, "Snapshot_StoreType", "blob")
+    monkeypatch.setattr(SnapshotStore, "snapshotContainer", lambda: PrefixBlobContainer(["100.npz", "100.part.a.json.gz", "1000.part.a.json.gz", "repos.json.gz"]))
+
+    assert listSnapshotParts(100) == ["100.part.a.json.gz"]
+    assert snapshotFileExists("repos.json.gz")
+    assert not snapshotFileExists("200.npz")
@@ -0,0 +1,103 @@
+import os
+import numpy as np
+
+from graphql import parse
+from CreateGraphqlQuery import repoStatsSelection
+from Helpers.RepoStatsBatch import createRepoStatsBatch
+from Helpers.SnapshotStore import createSnapshotFromBatches, saveSnapshot, loadRepoDictionary, saveRepoDictionary
+from Helpers.TrendAnalytics import dailyRates, rollingMean, windowVelocity, topMovers, computeTrendReport, secondsPerDay
+from test_RepoStatsBatch import repoStats
+
+
+nan = np.nan
+
+
+def test_dailyRates_divides_by_days_between_runs():
+    runIds = np.array([0, secondsPerDay, 3 * secondsPerDay])
+    stars = np.array([[10, nan], [12, 5], [20, 9]], dtype= np.float32)
+
+    rates = dailyRates(stars, runIds)
+
+    assert np.allclose(rates, [[2, nan], [4, 2]], equal_nan= True)
+
+
+def test_rollingMean_skips_missing_values():
+    matrix = np.array([[1, nan], [3, nan], [5, 4]])
+
+    assert np.allclose(rollingMean(matrix, 2), [[2, nan], [4, 4]], equal_nan= True)
+    assert rollingMean(matrix, 4).shape == (0, 2)
+
+
+def test_windowVelocity_uses_first_and_last_run_of_each_repo():
+    runIds = np.array([0, secondsPerDay, 2 * secondsPerDay])
+    stars = np.array([[nan, 10, 7], [5, nan, nan], [9, 16, nan]], dtype= np.float32)
+
+    velocity = windowVelocity(stars, runIds)
+
+    assert np.allclose(velocity["change"], [4, 6, nan], equal_nan= True)
+    assert np.allclose(velocity["perDay"], [4, 3, nan], equal_nan= True)
+
+
+def test_topMovers_orders_highest_first_and_leaves_out_nan():
+    values = np.array([1.0, nan, 3.0, 2.0])
+
+    assert topMovers(values, ["a", "b", "c", "d"], 2) == [{"repo": "c", "value": 3.0}, {"repo": "d", "value": 2.0}]
+    assert topMovers(np.array([nan]), ["a"], 2) == []
+    assert topMovers(values, ["a", "b", "c", "d"], 0) == []
+
+
+def test_query_counts_pull_requests_for_totalPRs():
+    fields = parse("{" + repoStatsSelection + "}").definitions[0].selection_set.selections
+
+    assert {field.alias.value: field.name.value for field in fields if field.alias}["PRs"] == "pullRequests"
+
+
+def test_computeTrendReport_counts_pull_requests_opened_from_pull_requests(monkeypatch, tmp_path):
+    monkeypatch.setitem(os.environ, "Snapshot_StoreType", "local")
+    monkeypatch.setitem(os.environ, "Snapshot_LocalPath", str(tmp_path))
+    monkeypatch.setitem(os.environ, "Trends_TopMovers", "1")
+
+    # totalPRs of a/1 grows like an issue count would, only a/2 gets new pull requests
+
+    for day, (totalPRs, openPRs) in enumerate([(10, 1), (50, 1)], start= 1):
+        repoDictionary = loadRepoDictionary()
+        stats = [dict(repoStats("a/1", 0, 1), totalPRs= totalPRs), dict(repoStats("a/2", 0, 1), openPRs= openPRs * day)]
+        snapshot = createSnapshotFromBatches([createRepoStatsBatch(0, stats)], repoDictionary)
+
+        saveRepoDictionary(repoDictionary)
+        saveSnapshot(day * secondsPerDay, snapshot)
+
+    assert computeTrendReport(2 * secondsPerDay)["topMovers"]["pullRequestsOpenedPerDay"] == [{"repo": "a/2", "value": 1.0}]
+
+
+def test_computeTrendReport_on_saved_snapshots(monkeypatch, tmp_path):
+    monkeypatch.setitem(os.environ, "Snapshot_StoreType", "local")
+    monkeypatch.setitem(os.environ, "Snapshot_LocalPath", str(tmp_path))
+    monkeypatch.setitem(os.environ, "Trends_WindowRuns", "90")
+    monkeypatch.setitem(os.environ, "Trends_RollingRuns", "7")
+    monkeypatch.setitem(os.environ, "Trends_TopMovers", "1")
+
+    # a/1 gains 10 stars a day, a/2 gains 1, a/3 only shows up in the last run
+
+    runs = {
+        secondsPerDay: [repoStats("a/1", 0, 100), repoStats("a/2", 0, 50)],
+        2 * secondsPerDay: [repoStats("a/1", 0, 110), repoStats("a/2", 0, 51)],
+        3 * secondsPerDay: [repoStats("a/1", 0, 120), repoStats("a/2", 0, 52), repoStats("a/3", 0, 500)]
+    }
+
+    for runId, stats in runs.items():
+        repoDictionary = loadRepoDictionary()
+        snapshot = createSnapshotFromBatches([createRepoStatsBatch(runId, stats)], repoDictionary)
+
+        saveRepoDictionary(repoDictionary)
+        saveSnapshot(runId, snapshot)
+
+    trendReport = computeTrendReport(3 * secondsPerDay)
+
+    assert trendReport["runIds"] == list(runs)
+    assert trendReport["repoCount"] == 3
+    assert trendReport["topMovers"]["starGrowth"] == [{"repo": "a/1", "value": 20.0}]
+    assert trendReport["topMovers"]["starsPerDay"] == [{"repo": "a/1", "value": 10.0}]
+    assert trendReport["topMovers"]["recentStarsPerDay"] == [{"repo": "a/1", "value": 10.0}]
+
+    assert computeTrendReport(secondsPerDay)["topMovers"] == {}
@@ -0,0 +1,75 @@
+import os
+
+from Helpers.WriteIndex import isDiffWritesEnabled, statsHash, splitChangedStats, createWriteIndexEntries, readWriteIndex
+from test_RepoStatsBatch import repoStats
+
+
+def test_statsHash_ignores_fields_that_are_not_stats():
+    stats = repoStats("a/1", 100, 10)
+
+    assert statsHash(stats) == statsHash(dict(repoStats("a/1", 200, 10), carriedForwardFromRunId= 100))
+    assert statsHash(stats) != statsHash(repoStats("a/1", 100, 11))
+
+
+def test_splitChangedStats(monkeypatch):
+    monkeypatch.setitem(os.environ, "DiffWrites_MaxUnchangedDays", "1")
+
+    writtenStats = [repoStats("a/1", 100, 10), repoStats("a/2", 100, 20), repoStats("a/3", 100, 30)]
+    indexEntriesByRepo = {indexEntry["repo"]: indexEntry for indexEntry in
+                          createWriteIndexEntries(writtenStats, {stats["repo"]: statsHash(stats) for stats in writtenStats})}
+
+    # a/1 didn't move, a/2 gained a star, a/3 didn't move for longer than allowed, a/4 is new
+
+    statsSplit = splitChangedStats([
+        repoStats("a/1", 100 + 86400, 10),
+        repoStats("a/2", 100 + 86400, 21),
+        repoStats("a/3", 101 + 86400, 30),
+        repoStats("a/4", 100 + 86400, 40)
+    ], indexEntriesByRepo)
+
+    assert statsSplit["unchangedList"] == [{"repo": "a/1", "unchangedSinceRunId": 100}]
+    assert [stats["repo"] for stats in statsSplit["changedStats"]] == ["a/2", "a/3", "a/4"]
+    assert sorted(statsSplit["hashes"]) == ["a/2", "a/3", "a/4"]
+
+
+def test_incremental_runs_record_carried_forward_stats_as_unchanged(monkeypatch):
+    monkeypatch.setitem(os.environ, "DiffWrites_Enabled", "false")
+    monkeypatch.setitem(os.environ, "IncrementalRun_Enabled", "true")
+    monkeypatch.setitem(os.environ, "DiffWrites_MaxUnchangedDays", "30")
+
+    assert isDiffWritesEnabled()
+
+    writtenStats = [repoStats("a/1", 100, 10)]
+    indexEntries = createWriteIndexEntries(writtenStats, {"a/1": statsHash(writtenStats[0])})
+
+    carriedForwardStats = dict(repoStats("a/1", 200, 10), carriedForwardFromRunId= 100)
+
+    assert splitChangedStats([carriedForwardStats], {"a/1": indexEntries[0]})["unchangedList"] == [{"repo": "a/1", "unchangedSinceRunId": 100}]
+
+
+class PartitionedContainer:
+    """
+    Run info container holding documents by partition, queries must name their partition
+    """
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.queriedPartitions = []
+
+    def query_items(self, query, parameters, partition_key):
+        self.queriedPartitions.append(partition_key)
+
+        return [document for document in self.documents
+                if document["date"] == partition_key and document["id"] in parameters[0]["value"]]
+
+
+def test_write_index_is_partitioned_and_read_by_owner():
+    writtenStats = [repoStats("a/1", 100, 10), repoStats("b/1", 100, 20), repoStats("a/2", 100, 30)]
+    indexEntries = createWriteIndexEntries(writtenStats, {stats["repo"]: statsHash(stats) for stats in writtenStats})
+
+    assert [indexEntry["date"] for indexEntry in indexEntries] == ["writeIndex.a", "writeIndex.b", "writeIndex.a"]
+
+    container = PartitionedContainer(indexEntries)
+
+    assert sorted(readWriteIndex(container, ["a/1", "a/2", "b/1", "c/1"])) == ["a/1", "a/2", "b/1"]
+    assert container.queriedPartitions == ["writeIndex.a", "writeIndex.b", "writeIndex.c"]